@@ -0,0 +1,280 @@
+"""
+Offline end-to-end throughput benchmark for the ayurlekha pipeline.
+
+Runs the real process_patients against FakeLM / FakeSupabase / FakeMemory for a grid of
+patient counts, records per patient and patient concurrency. Each scenario runs in a fresh
+process so peak RSS is per scenario. Results are written as JSON for comparison between commits:
+
+    python -m processing_engine.benchmarks.bench_ayurlekha --patients 10,50 --workers 1,4
+    python -m processing_engine.benchmarks.bench_ayurlekha --corpus corpus --workers 1,8
+    python -m processing_engine.benchmarks.bench_ayurlekha --compare old.json new.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+STAGES = ("download", "analysis", "mem0", "metadata", "upload", "summary", "db")
+
+
+def _run_scenario(scenario: dict, result_queue):
+    """Child process: point all local state at a temp dir, wire the fakes in, run the pipeline."""
+    workdir = tempfile.mkdtemp(prefix="ayurlekha-bench-")
+    os.chdir(workdir)
+    os.environ.update(
+        {
+            "LOG_FILE": os.path.join(workdir, "bench.log"),
+            "LOG_LEVEL": "WARNING",
+            "UPLOAD_DEBUG_DIR": "",
+            "SUMMARY_MODE": scenario.get("summary_mode", "single"),
+            # Judge calls would be counted as pipeline tokens
+            "QUALITY_EVAL_SAMPLE_RATE": "0",
+        }
+    )
+
+    import dspy
+    from processing_engine.benchmarks.fakes import (
+        FakeLM,
+        FakeMemory,
+        FakeSupabase,
+        seed_corpus,
+    )
+    from processing_engine.benchmarks.corpus import load_corpus
+    from processing_engine.common import supabase_io
+    from processing_engine.common.metrics import metrics, percentile
+    from processing_engine.usecases.ayurlekha import processor
+
+    if scenario.get("corpus"):
+        client = load_corpus(
+            scenario["corpus"],
+            db_latency=scenario["db_latency"],
+            storage_latency=scenario["storage_latency"],
+        )
+    else:
+        client = FakeSupabase(
+            db_latency=scenario["db_latency"],
+            storage_latency=scenario["storage_latency"],
+        )
+        seed_corpus(
+            client,
+            scenario["patients"],
+            scenario["records"],
+            image_size=(scenario["image_px"], scenario["image_px"]),
+        )
+    supabase_io.set_client(client)
+    processor.mem0_memory = FakeMemory(latency=scenario["mem0_latency"])
+    dspy.configure(
+        lm=FakeLM(
+            latency=scenario["lm_latency"],
+            jitter=scenario["lm_latency"] * 0.2,
+            output_tokens=scenario["output_tokens"],
+        )
+    )
+    metrics.reset()
+
+    start = time.perf_counter()
+    progress = processor.process_patients(
+        supabase=client, patient_workers=scenario["workers"]
+    )
+    wall = time.perf_counter() - start
+
+    stage_latency = {}
+    for key, hist in metrics.histograms.get("stage_seconds", {}).items():
+        stage = dict(key)["stage"]
+        samples = list(hist.samples)
+        stage_latency[stage] = {
+            "count": hist.count,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+        }
+    tokens = {
+        name: sum(metrics.counters.get(name, {}).values())
+        for name in ("lm_prompt_tokens_total", "lm_completion_tokens_total")
+    }
+    result_queue.put(
+        {
+            "scenario": scenario,
+            "wall_seconds": wall,
+            "records": progress["records"],
+            "patients": progress["done"],
+            "records_per_sec": progress["records"] / wall if wall else 0.0,
+            "stage_latency": stage_latency,
+            "tokens": tokens,
+            "analysis_routes": processor.analysis_routes(),
+            "duplicates": processor.duplicate_stats(),
+            "prefilter": processor.prefilter_stats(),
+            # ru_maxrss is KiB on Linux
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+    )
+
+
+def run_scenario(scenario: dict) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    proc = ctx.Process(target=_run_scenario, args=(scenario, result_queue))
+    proc.start()
+    while True:
+        try:
+            result = result_queue.get(timeout=1)
+            break
+        except queue.Empty:
+            if not proc.is_alive():
+                raise RuntimeError(
+                    f"Benchmark scenario crashed (exit code {proc.exitcode}): {scenario}"
+                )
+    proc.join()
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def _ints(text: str):
+    return [int(x) for x in text.split(",") if x]
+
+
+def format_results(results) -> str:
+    header = (
+        f"{'patients':>8} {'records':>7} {'workers':>7} {'rec/s':>8} {'rss_mb':>7}  "
+        + " ".join(f"{stage + '_p95':>12}" for stage in STAGES)
+    )
+    lines = [header]
+    for r in results:
+        s = r["scenario"]
+        lines.append(
+            f"{s['patients']:>8} {s['records']:>7} {s['workers']:>7} {r['records_per_sec']:>8.2f} {r['peak_rss_mb']:>7.1f}  "
+            + " ".join(
+                f"{r['stage_latency'].get(stage, {}).get('p95', 0.0):>12.4f}"
+                for stage in STAGES
+            )
+        )
+    return "\n".join(lines)
+
+
+def compare(old_path: str, new_path: str) -> str:
+    """Print records/sec and peak RSS deltas for scenarios present in both result files."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(result):
+        s = result["scenario"]
+        return (s["patients"], s["records"], s["workers"])
+
+    old_by_key = {key(r): r for r in old["results"]}
+    lines = [f"{old['commit']} -> {new['commit']}"]
+    for r in new["results"]:
+        base = old_by_key.get(key(r))
+        if base is None:
+            continue
+        speedup = (
+            r["records_per_sec"] / base["records_per_sec"]
+            if base["records_per_sec"]
+            else 0.0
+        )
+        lines.append(
+            f"patients={key(r)[0]} records={key(r)[1]} workers={key(r)[2]}: "
+            f"{base['records_per_sec']:.2f} -> {r['records_per_sec']:.2f} rec/s ({speedup:.2f}x), "
+            f"rss {base['peak_rss_mb']:.0f} -> {r['peak_rss_mb']:.0f} MB"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--patients", default="10,50", help="Comma-separated patient counts"
+    )
+    parser.add_argument(
+        "--records", default="3", help="Comma-separated records per patient"
+    )
+    parser.add_argument(
+        "--workers", default="1,4", help="Comma-separated patient concurrency"
+    )
+    parser.add_argument(
+        "--lm-latency", type=float, default=0.05, help="Seconds per LM call"
+    )
+    parser.add_argument("--output-tokens", type=int, default=200)
+    parser.add_argument("--mem0-latency", type=float, default=0.005)
+    parser.add_argument("--db-latency", type=float, default=0.002)
+    parser.add_argument("--storage-latency", type=float, default=0.005)
+    parser.add_argument("--image-px", type=int, default=256)
+    parser.add_argument(
+        "--summary-mode", choices=("single", "sections"), default="single"
+    )
+    parser.add_argument(
+        "--corpus",
+        default=None,
+        help="Generated corpus directory (benchmarks.corpus); replaces --patients/--records",
+    )
+    parser.add_argument("--out", default=None, help="Result JSON path")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print(compare(*args.compare))
+        return
+
+    if args.corpus:
+        # Label corpus scenarios by directory name so --compare matches them across runs
+        sizes = [(os.path.basename(os.path.normpath(args.corpus)), "corpus")]
+    else:
+        sizes = itertools.product(_ints(args.patients), _ints(args.records))
+    results = []
+    for (patients, records), workers in itertools.product(sizes, _ints(args.workers)):
+        scenario = {
+            "patients": patients,
+            "records": records,
+            "corpus": args.corpus,
+            "workers": workers,
+            "lm_latency": args.lm_latency,
+            "output_tokens": args.output_tokens,
+            "mem0_latency": args.mem0_latency,
+            "db_latency": args.db_latency,
+            "storage_latency": args.storage_latency,
+            "image_px": args.image_px,
+            "summary_mode": args.summary_mode,
+        }
+        results.append(run_scenario(scenario))
+        print(format_results(results[-1:]).splitlines()[-1], file=sys.stderr)
+
+    commit = _git_commit()
+    out = args.out or os.path.join(
+        "benchmark_results",
+        f"ayurlekha_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{commit}.json",
+    )
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(format_results(results))
+    print(f"Saved {out}")
+
+
+if __name__ == "__main__":
+    main()
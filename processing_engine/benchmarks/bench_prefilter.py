@@ -0,0 +1,105 @@
+"""
+Precision and recall of the non-medical pre-filter (usecases/ayurlekha/prefilter.py) on a labelled sample.
+
+Samples are JSON lines, one image per line; "ocr_text" stands in for the OCR pre-pass when given:
+
+    {"path": "sample/selfie_01.jpg", "label": "non_medical"}
+    {"path": "sample/rx_17.jpg", "label": "medical", "ocr_text": "Tab Metformin 500 mg BD ..."}
+
+"Positive" is a rejection: precision is the share of rejected uploads that really were non-medical (a
+miss there drops a real document), recall the share of non-medical uploads caught.
+
+    python -m processing_engine.benchmarks.bench_prefilter --samples labelled.jsonl [--ocr]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from processing_engine.common.ocr import OcrPool
+from processing_engine.usecases.ayurlekha.prefilter import MedicalPrefilter
+
+LABELS = ("medical", "non_medical")
+
+
+def score(rows) -> dict:
+    """Confusion counts, precision and recall from rows of {"label", "rejected"}."""
+    tp = sum(1 for r in rows if r["rejected"] and r["label"] == "non_medical")
+    fp = sum(1 for r in rows if r["rejected"] and r["label"] == "medical")
+    fn = sum(1 for r in rows if not r["rejected"] and r["label"] == "non_medical")
+    tn = sum(1 for r in rows if not r["rejected"] and r["label"] == "medical")
+    return {
+        "samples": len(rows),
+        "true_positive": tp,
+        "false_positive": fp,
+        "false_negative": fn,
+        "true_negative": tn,
+        "precision": tp / (tp + fp) if tp + fp else 1.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+    }
+
+
+def run(samples, ocr_pool=None):
+    prefilter = MedicalPrefilter()
+    base = os.getcwd()
+    rows = []
+    for sample in samples:
+        path = os.path.join(base, sample["path"])
+        ocr = None
+        if sample.get("ocr_text") is not None:
+            text = sample["ocr_text"]
+            ocr = {"text": text, "words": len(text.split()), "confidence": 1.0}
+        elif ocr_pool is not None:
+            ocr = ocr_pool.run(path)
+        start = time.perf_counter()
+        reason = prefilter.check(path, ocr, file_name=sample.get("file_name") or path)
+        rows.append(
+            {
+                "path": sample["path"],
+                "label": sample["label"],
+                "rejected": reason is not None,
+                "reason": reason,
+                "seconds": time.perf_counter() - start,
+            }
+        )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--samples", required=True, help="Labelled samples (JSONL)")
+    parser.add_argument(
+        "--ocr",
+        action="store_true",
+        help="Run the Tesseract pre-pass for samples without ocr_text",
+    )
+    parser.add_argument("--out", default=None, help="Per-sample results JSON path")
+    args = parser.parse_args(argv)
+
+    with open(args.samples) as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+    unknown = [s for s in samples if s.get("label") not in LABELS]
+    if unknown:
+        sys.exit(f"Labels must be one of {LABELS}: {unknown[0]}")
+    ocr_pool = OcrPool() if args.ocr else None
+    rows = run(samples, ocr_pool)
+    if ocr_pool is not None:
+        ocr_pool.close()
+    result = score(rows)
+    seconds = sorted(r["seconds"] for r in rows)
+    print(
+        f"samples={result['samples']} precision={result['precision']:.3f} recall={result['recall']:.3f} "
+        f"(tp={result['true_positive']} fp={result['false_positive']} fn={result['false_negative']} "
+        f"tn={result['true_negative']}) median {seconds[len(seconds) // 2] * 1000 if seconds else 0:.1f} ms/image"
+    )
+    for row in rows:
+        if row["rejected"] and row["label"] == "medical":
+            print(f"  rejected medical document {row['path']}: {row['reason']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"score": result, "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
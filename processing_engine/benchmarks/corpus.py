@@ -0,0 +1,370 @@
+"""
+Synthetic patient/document corpus for scale testing.
+
+Writes a local stand-in for the Supabase `patients` and `medical_records` tables (SQLite) plus a storage
+directory of placeholder prescription and lab-report images, with configurable distributions:
+
+    python -m processing_engine.benchmarks.corpus --out corpus --patients 20000 --records-mean 6
+    python -m processing_engine.benchmarks.bench_ayurlekha --corpus corpus --workers 1,8
+
+Every record has its own image: the page body (table or prescription text) comes from one of `variants`
+templates per (kind, resolution), compressed once, and each record stamps its own header lines (patient
+and report details) over it, so generating a record costs one small deflate instead of a full render.
+Unrelated records that share a template look alike, as real reports on one lab's letterhead do, but
+are never byte-identical. Duplicate uploads are byte-identical re-uploads of an earlier record of the
+same patient, hard-linked to it; `duplicate_of` records the original for evaluating dedupe.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from processing_engine.benchmarks.fakes import FakeSupabase, encode_png
+
+DB_FILE = "corpus.sqlite"
+STORAGE_DIR = "storage"
+BUCKET = "medical-documents"
+KINDS = ("prescription", "lab")
+# Common scan/phone-photo sizes: small thumbnail, phone photo, A4 at 300 dpi
+DEFAULT_RESOLUTIONS = ((640, 905), (1240, 1754), (2480, 3508))
+STORAGE_URL = "https://example.supabase.co/storage/v1/object/public"
+# Lines above the table or prescription body: the per-record header
+HEADER_LINES = 7
+
+
+def _line_height(height: int) -> int:
+    return max(4, height // 60)
+
+
+def _document_rows(kind: str, width: int, height: int, seed=0):
+    """
+    Pixel rows of a placeholder scan: off-white paper noise with dark word-like bars. Prescriptions get
+    a header and free text; lab reports get a ruled table.
+    """
+    rng = random.Random(seed)
+    paper = bytes(235 + rng.getrandbits(4) for _ in range(width + 7))
+    margin = width // 12
+    line_height = _line_height(height)
+    ink_height = max(2, line_height // 2)
+    columns = [margin + (width - 2 * margin) * i // 4 for i in range(5)]
+
+    lines = {}
+    for line in range(height // line_height):
+        segments = []
+        if kind == "lab" and line > 6:
+            # One value per table cell
+            for left, right in zip(columns, columns[1:]):
+                length = rng.randint((right - left) // 4, (right - left) * 3 // 4)
+                segments.append((left + 4, min(right - 4, left + 4 + length)))
+        elif line > 1 and rng.random() > 0.15:
+            x = margin + (width // 8 if kind == "prescription" and line > 6 else 0)
+            end = margin + rng.randint((width - 2 * margin) // 3, width - 2 * margin)
+            while x < end:
+                word = rng.randint(width // 40 + 1, width // 12 + 2)
+                segments.append((x, min(end, x + word)))
+                x += word + max(2, width // 80)
+        elif line == 0:
+            segments.append((margin, width - margin))
+        lines[line] = segments
+
+    def rows():
+        for y in range(height):
+            row = bytearray(paper[y % 7 : y % 7 + width])
+            line, offset = divmod(y, line_height)
+            if offset < ink_height:
+                for left, right in lines.get(line, ()):
+                    row[left:right] = bytes(right - left)
+            if kind == "lab" and line > 6:
+                for x in columns:
+                    row[x] = 0
+            yield row
+
+    return rows()
+
+
+def render_document_png(kind: str, width: int, height: int, seed=0) -> bytes:
+    """A whole placeholder scan as a PNG."""
+    return encode_png(width, height, _document_rows(kind, width, height, seed))
+
+
+def _adler32_combine(adler1: int, adler2: int, len2: int) -> int:
+    """Adler-32 of a concatenation from the checksums of its parts (zlib's adler32_combine)."""
+    base = 65521
+    rem = len2 % base
+    sum1 = adler1 & 0xFFFF
+    sum2 = rem * sum1 % base
+    sum1 += (adler2 & 0xFFFF) + base - 1
+    sum2 += ((adler1 >> 16) & 0xFFFF) + ((adler2 >> 16) & 0xFFFF) + base - rem
+    return (sum1 % base) | ((sum2 % base) << 16)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+
+class PageTemplate:
+    """
+    The body of a page, deflated once into `path`; stamp() writes a PNG with a record's own header
+    lines on top. The IDAT stream is the header's deflate blocks (ending in a full flush, so no
+    back-reference crosses into the body) followed by the body's, with the Adler-32 of both.
+    """
+
+    def __init__(self, path: str, kind: str, width: int, height: int, seed):
+        self.path = path
+        self.kind = kind
+        self.width = width
+        self.height = height
+        self.header_rows = min(height, _line_height(height) * HEADER_LINES)
+        rows = _document_rows(kind, width, height, seed)
+        for _ in range(self.header_rows):
+            next(rows)
+        body = b"".join(b"\x00" + bytes(row) for row in rows)
+        self.body_length = len(body)
+        self.body_adler = zlib.adler32(body)
+        deflate = zlib.compressobj(6, zlib.DEFLATED, -15)
+        with open(path, "wb") as f:
+            f.write(deflate.compress(body) + deflate.flush())
+
+    def stamp(self, seed) -> bytes:
+        rows = _document_rows(self.kind, self.width, self.height, seed)
+        header = b"".join(b"\x00" + bytes(next(rows)) for _ in range(self.header_rows))
+        deflate = zlib.compressobj(6, zlib.DEFLATED, -15)
+        with open(self.path, "rb") as f:
+            body = f.read()
+        adler = _adler32_combine(
+            zlib.adler32(header), self.body_adler, self.body_length
+        )
+        idat = (
+            b"\x78\x9c"
+            + deflate.compress(header)
+            + deflate.flush(zlib.Z_FULL_FLUSH)
+            + body
+            + struct.pack(">I", adler)
+        )
+        ihdr = struct.pack(">IIBBBBB", self.width, self.height, 8, 0, 0, 0, 0)
+        return (
+            b"\x89PNG\r\n\x1a\n"
+            + _png_chunk(b"IHDR", ihdr)
+            + _png_chunk(b"IDAT", idat)
+            + _png_chunk(b"IEND", b"")
+        )
+
+
+def _records_for_patient(rng, mean: float, maximum: int, skew: float) -> int:
+    """Pareto-distributed count with the given mean (heavier tail for smaller `skew`), clamped to [1, maximum]."""
+    # Pareto(alpha) has mean alpha / (alpha - 1) for x_m = 1
+    scale = mean * (skew - 1) / skew
+    return max(1, min(maximum, int(round(scale * rng.paretovariate(skew)))))
+
+
+def _link_or_copy(src: str, dst: str):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def generate_corpus(
+    out_dir: str,
+    patients: int,
+    records_mean: float = 5.0,
+    records_max: int = 200,
+    skew: float = 1.8,
+    processed_share: float = 0.0,
+    duplicate_share: float = 0.05,
+    resolutions=DEFAULT_RESOLUTIONS,
+    variants: int = 16,
+    users: int = None,
+    seed: int = 0,
+) -> dict:
+    """
+    Fill `out_dir` with a SQLite DB and storage tree. Returns summary stats.
+    `users` defaults to roughly two patients per account (family members share a user_id).
+    """
+    if skew <= 1:
+        raise ValueError("skew must be > 1 for the records-per-patient mean to exist")
+    rng = random.Random(seed)
+    users = users or max(1, patients // 2)
+    storage_root = os.path.join(out_dir, STORAGE_DIR)
+    templates_dir = os.path.join(out_dir, "_templates")
+    os.makedirs(templates_dir, exist_ok=True)
+
+    templates = {}
+    for kind in KINDS:
+        for width, height in resolutions:
+            for variant in range(variants):
+                templates[(kind, width, height, variant)] = PageTemplate(
+                    os.path.join(
+                        templates_dir,
+                        f"{kind}_{width}x{height}_s{seed}_{variant:03d}.deflate",
+                    ),
+                    kind,
+                    width,
+                    height,
+                    seed=f"{seed}-{kind}-{width}x{height}-{variant}",
+                )
+
+    db_path = os.path.join(out_dir, DB_FILE)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE patients (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            ayurlekha_generated_at TEXT
+        );
+        CREATE TABLE medical_records (
+            id TEXT PRIMARY KEY,
+            patient_id TEXT NOT NULL,
+            file_url TEXT NOT NULL,
+            processed INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            kind TEXT,
+            width INTEGER,
+            height INTEGER,
+            duplicate_of TEXT
+        );
+        CREATE INDEX idx_records_patient ON medical_records (patient_id, processed);
+        """)
+
+    now = datetime.now(timezone.utc)
+    stats = {"patients": patients, "records": 0, "processed": 0, "duplicates": 0}
+    for p in range(patients):
+        patient_id = f"patient-{p:06d}"
+        user_id = f"user-{rng.randrange(users):06d}"
+        count = _records_for_patient(rng, records_mean, records_max, skew)
+        created = now - timedelta(days=rng.randint(0, 3650))
+        originals = []
+        rows = []
+        for r in range(count):
+            record_id = f"{patient_id}-rec-{r:04d}"
+            remote_path = f"{user_id}/{patient_id}/{record_id}.png"
+            created += timedelta(days=rng.expovariate(1 / 30))
+            local_path = os.path.join(storage_root, BUCKET, remote_path)
+            if originals and rng.random() < duplicate_share:
+                duplicate_of, original_path, kind, (width, height) = rng.choice(
+                    originals
+                )
+                _link_or_copy(original_path, local_path)
+                stats["duplicates"] += 1
+            else:
+                kind = rng.choice(KINDS)
+                width, height = rng.choice(resolutions)
+                template = templates[(kind, width, height, rng.randrange(variants))]
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                with open(local_path, "wb") as f:
+                    f.write(template.stamp(seed=f"{seed}-{record_id}"))
+                duplicate_of = None
+                originals.append((record_id, local_path, kind, (width, height)))
+            processed = rng.random() < processed_share
+            stats["processed"] += processed
+            rows.append(
+                (
+                    record_id,
+                    patient_id,
+                    f"{STORAGE_URL}/{BUCKET}/{remote_path}",
+                    int(processed),
+                    min(created, now).isoformat(),
+                    kind,
+                    width,
+                    height,
+                    duplicate_of,
+                )
+            )
+        stats["records"] += count
+        generated_at = now.isoformat() if any(row[3] for row in rows) else None
+        conn.execute(
+            "INSERT INTO patients VALUES (?, ?, ?)", (patient_id, user_id, generated_at)
+        )
+        conn.executemany(
+            "INSERT INTO medical_records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+    conn.commit()
+    conn.close()
+    return stats
+
+
+def load_corpus(
+    corpus_dir: str, db_latency: float = 0.0, storage_latency: float = 0.0
+) -> FakeSupabase:
+    """FakeSupabase whose tables are the generated rows and whose storage reads the generated files."""
+    client = FakeSupabase(
+        db_latency=db_latency,
+        storage_latency=storage_latency,
+        storage_root=os.path.join(corpus_dir, STORAGE_DIR),
+    )
+    conn = sqlite3.connect(os.path.join(corpus_dir, DB_FILE))
+    conn.row_factory = sqlite3.Row
+    client.tables["patients"] = [
+        dict(row) for row in conn.execute("SELECT * FROM patients")
+    ]
+    client.tables["medical_records"] = [
+        {**dict(row), "processed": bool(row["processed"])}
+        for row in conn.execute("SELECT * FROM medical_records")
+    ]
+    conn.close()
+    return client
+
+
+def _resolutions(text: str):
+    return tuple(
+        tuple(int(v) for v in item.lower().split("x"))
+        for item in text.split(",")
+        if item
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--out", required=True, help="Corpus directory")
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--records-mean", type=float, default=5.0)
+    parser.add_argument("--records-max", type=int, default=200)
+    parser.add_argument(
+        "--skew",
+        type=float,
+        default=1.8,
+        help="Pareto shape; closer to 1 is more skewed",
+    )
+    parser.add_argument("--processed-share", type=float, default=0.0)
+    parser.add_argument("--duplicate-share", type=float, default=0.05)
+    parser.add_argument(
+        "--resolutions",
+        default=",".join(f"{w}x{h}" for w, h in DEFAULT_RESOLUTIONS),
+        help="Comma-separated WIDTHxHEIGHT list",
+    )
+    parser.add_argument("--variants", type=int, default=16)
+    parser.add_argument("--users", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    stats = generate_corpus(
+        args.out,
+        args.patients,
+        records_mean=args.records_mean,
+        records_max=args.records_max,
+        skew=args.skew,
+        processed_share=args.processed_share,
+        duplicate_share=args.duplicate_share,
+        resolutions=_resolutions(args.resolutions),
+        variants=args.variants,
+        users=args.users,
+        seed=args.seed,
+    )
+    print(
+        f"Wrote {stats['patients']} patients, {stats['records']} records "
+        f"({stats['processed']} processed, {stats['duplicates']} duplicates) to {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
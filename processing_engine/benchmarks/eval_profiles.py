@@ -0,0 +1,257 @@
+"""
+Latency-vs-quality evaluation of inference profiles on a labelled sample set.
+
+Each candidate is a set of per-module profiles (see common/inference_profiles.py). Every candidate runs
+over the same samples; latency, tokens and cost come from the LM metrics callback, and quality from the
+judge modules compare_with_expected_data (against the labelled output) and accurate_analyser.
+
+Samples are JSON lines, one task per line:
+
+    {"id": "rx-1", "task": "metadata", "input": "<detailed analysis>", "expected": {...}}
+    {"id": "rx-1", "task": "analysis", "input": "path/to/scan.png", "expected": "<analysis>"}
+    {"id": "p-1", "task": "summary", "input": "<medical history>", "expected": {...}}
+
+Candidates are a JSON object of name -> profiles, e.g.
+{"baseline": {}, "predict-metadata": {"DocumentMetadataModule": {"strategy": "predict"}}}
+
+    python -m processing_engine.benchmarks.eval_profiles --samples samples.jsonl --candidates candidates.json
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import dspy
+from processing_engine.common.dspy_callbacks import MetricsCallback
+from processing_engine.common.dspy_modules import (
+    accurate_analyser,
+    compare_with_expected_data,
+)
+from processing_engine.common.inference_profiles import override_profiles, profile_lm
+from processing_engine.common.metrics import metrics, percentile
+from processing_engine.common.quality_eval import (
+    ANALYSER_FIELDS,
+    as_text,
+    parse_score,
+)
+from processing_engine.usecases.ayurlekha.modules import (
+    DocumentMetadataModule,
+    DocumentProcessor,
+    PatientDemographics,
+    SectionalPatientDemographics,
+)
+from processing_engine.usecases.ayurlekha.signatures import DocumentMetadataSignature
+
+SUMMARY_FIELDS = (
+    "patient",
+    "summary",
+    "primaryAlert",
+    "chronicConditions",
+    "historyTimeline",
+    "labTests",
+    "medications",
+    "doctors",
+    "emergencyContacts",
+)
+
+
+def _build_tasks():
+    """Task name -> callable(input) returning the output to score; modules are built under the active profiles."""
+    metadata_module = DocumentMetadataModule()
+    document_processor = DocumentProcessor()
+    summary_module = PatientDemographics()
+    sectional_module = SectionalPatientDemographics()
+
+    def metadata(text):
+        prediction = metadata_module(detailed_analysis=text)
+        return {
+            field: getattr(prediction, field, None)
+            for field in DocumentMetadataSignature.output_fields
+        }
+
+    def analysis(path):
+        prediction = document_processor(document_image=dspy.Image.from_file(path))
+        return prediction.detailed_analysis
+
+    def summary_with(module):
+        def run(text):
+            prediction = module(medical_history=text)
+            return {field: getattr(prediction, field, None) for field in SUMMARY_FIELDS}
+
+        return run
+
+    return {
+        "metadata": metadata,
+        "analysis": analysis,
+        "summary": summary_with(summary_module),
+        "summary_sections": summary_with(sectional_module),
+    }
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def _counter_total(name: str) -> float:
+    return sum(metrics.counters.get(name, {}).values())
+
+
+def run_candidate(samples, profiles: dict, threads: int = 4):
+    """Run every sample under `profiles`; returns per-sample outputs/latencies plus token and cost totals."""
+    metrics.reset()
+    with override_profiles(profiles):
+        tasks = _build_tasks()
+
+    def run(sample):
+        start = time.perf_counter()
+        try:
+            output, error = tasks[sample["task"]](sample["input"]), None
+        except Exception as e:
+            output, error = None, str(e)
+        return {
+            "id": sample.get("id"),
+            "task": sample["task"],
+            "latency_s": time.perf_counter() - start,
+            "output": output,
+            "error": error,
+        }
+
+    # Contexts are copied in the caller so dspy.context settings reach the workers
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, run, sample)
+            for sample in samples
+        ]
+        results = [future.result() for future in futures]
+    return results, {
+        "prompt_tokens": _counter_total("lm_prompt_tokens_total"),
+        "completion_tokens": _counter_total("lm_completion_tokens_total"),
+        "cost_usd": _counter_total("lm_cost_usd_total"),
+    }
+
+
+def judge(samples, results, judge_profiles: dict, threads: int = 4):
+    """Attach compare_with_expected_data and accurate_analyser scores to each result."""
+    with override_profiles(judge_profiles):
+        comparer = compare_with_expected_data()
+        analyser = accurate_analyser()
+
+    def score(pair):
+        sample, result = pair
+        if result["output"] is None:
+            return
+        output = as_text(result["output"])
+        try:
+            comparison = comparer.predictor(
+                existing_data=as_text(sample["expected"]), new_data=output
+            )
+            result["quality"] = parse_score(getattr(comparison, "quality", None))
+            result["feedback"] = comparison.feedback
+            analysis = analyser(data=output)
+            result["analyser"] = {
+                field: parse_score(getattr(analysis, field, None))
+                for field in ANALYSER_FIELDS
+            }
+        except Exception as e:
+            result["judge_error"] = str(e)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, score, pair)
+            for pair in zip(samples, results)
+        ]
+        for future in futures:
+            future.result()
+
+
+def summarize(name: str, results, usage: dict) -> dict:
+    latencies = [r["latency_s"] for r in results if r["error"] is None]
+    return {
+        "candidate": name,
+        "samples": len(results),
+        "errors": sum(r["error"] is not None for r in results),
+        "quality": _mean(r.get("quality") for r in results),
+        "analyser": _mean(_mean((r.get("analyser") or {}).values()) for r in results),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        **usage,
+    }
+
+
+def format_report(rows) -> str:
+    header = f"{'candidate':<24} {'n':>4} {'err':>4} {'quality':>8} {'analyser':>8} {'p50_s':>7} {'p95_s':>7} {'tokens':>9} {'cost_usd':>9}"
+    lines = [header]
+    for row in rows:
+        quality = f"{row['quality']:.3f}" if row["quality"] is not None else "-"
+        analyser = f"{row['analyser']:.3f}" if row["analyser"] is not None else "-"
+        lines.append(
+            f"{row['candidate']:<24} {row['samples']:>4} {row['errors']:>4} {quality:>8} {analyser:>8} "
+            f"{row['latency_p50']:>7.2f} {row['latency_p95']:>7.2f} "
+            f"{row['prompt_tokens'] + row['completion_tokens']:>9.0f} {row['cost_usd']:>9.4f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--samples", required=True, help="Labelled samples (JSONL)")
+    parser.add_argument(
+        "--candidates", required=True, help="JSON file of candidate name -> profiles"
+    )
+    parser.add_argument(
+        "--model", default="gemini", help="Default LM for modules without a model"
+    )
+    parser.add_argument(
+        "--judge-model", default="gemini", help="LM for the judge modules"
+    )
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument(
+        "--fake", action="store_true", help="Use the offline fake LM (smoke test)"
+    )
+    parser.add_argument("--out", default=None, help="Result JSON path")
+    args = parser.parse_args(argv)
+
+    with open(args.samples) as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+    with open(args.candidates) as f:
+        candidates = json.load(f)
+
+    if args.fake:
+        from processing_engine.benchmarks.fakes import FakeLM
+
+        lm = FakeLM()
+        judge_profiles = {}
+    else:
+        lm = profile_lm({"model": args.model})
+        judge_profiles = {
+            "compare_with_expected_data": {"model": args.judge_model},
+            "accurate_analyser": {"model": args.judge_model},
+        }
+    rows, details = [], {}
+    with dspy.context(lm=lm, callbacks=[MetricsCallback()]):
+        for name, profiles in candidates.items():
+            results, usage = run_candidate(samples, profiles, threads=args.threads)
+            judge(samples, results, judge_profiles, threads=args.threads)
+            rows.append(summarize(name, results, usage))
+            details[name] = {"profiles": profiles, "results": results}
+            print(format_report(rows[-1:]).splitlines()[-1], file=sys.stderr)
+
+    out = args.out or os.path.join(
+        "benchmark_results",
+        f"profiles_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"summary": rows, "candidates": details}, f, indent=2, default=str)
+    print(format_report(rows))
+    print(f"Saved {out}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
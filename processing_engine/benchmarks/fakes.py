@@ -0,0 +1,334 @@
+"""
+Offline stand-ins for the services the ayurlekha pipeline talks to: a fake LM with configurable latency and
+output size, an in-memory Supabase (tables + storage), an in-memory mem0, and a tiny synthetic corpus.
+"""
+
+import json
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+import dspy
+
+# One value per output field of every signature the pipeline uses. The chat adapter ignores fields a
+# signature does not ask for, so a single response shape satisfies every predictor (ReAct finishes at once).
+FAKE_ANSWER_FIELDS = {
+    "reasoning": "Synthetic reasoning.",
+    "next_thought": "The medicine is known.",
+    "next_tool_name": "finish",
+    "next_tool_args": {},
+    "verification_result": "Verified",
+    "correct_medicine": "Paracetamol",
+    "if_medicine": "yes",
+    "detailed_analysis": "",
+    "extracted_medicines": [],
+    "intelligent_name": "Prescription - General Medicine",
+    "category": "Prescription",
+    "date": "2024-03-01",
+    "department": "General Medicine",
+    "doctor_name": "Dr. Rao",
+    "patient_name": "Test Patient",
+    "insights": ["Hypertension"],
+    "actions": [{"description": "Follow-up", "start_date": "2024-03-01"}],
+    "medications": [{"name": "Paracetamol", "dosage": "500mg", "frequency": "BD"}],
+    "lab_tests": [
+        {"date": "2024-03-01", "investigation": "HbA1c", "result": "6.1", "unit": "%"}
+    ],
+    "urgency": "Low",
+    "summary": "Routine prescription.",
+    "is_medical_document": True,
+    "reason": "",
+    # Judge outputs (compare_with_expected_data, accurate_analyser)
+    "quality": "0.9",
+    "feedback": "Matches the expected data.",
+    "authenticity": "0.9",
+    "completeness": "0.8",
+    "clarity": "0.9",
+    "uncertainty": "0.7",
+    "relevance": "0.9",
+    "attribution": "0.8",
+    "temporal_ordering": "0.9",
+    "explainability": "0.7",
+    "patient": {"name": "Test Patient", "age": 40},
+    "id": "",
+    "name": "Test Patient",
+    "dob": "1984-01-01",
+    "age": 40,
+    "bloodGroup": "O+",
+    "alert": "",
+    "specialCare": "",
+    "primaryAlert": {"alert": "", "specialCare": ""},
+    "chronicConditions": [{"name": "Hypertension", "since": "2019"}],
+    "historyTimeline": [{"date": "2024-03-01", "event": "Consultation"}],
+    "labTests": [{"date": "2024-03-01", "investigation": "CBC", "result": "Normal"}],
+    "doctors": [{"type": "Physician", "name": "Dr. Rao", "contact": ""}],
+    "emergencyContacts": [],
+    "footer": {"generatedBy": "Ayurlekha App"},
+    "meta": {"version": "1.0"},
+    # selfImprovingModule
+    "prediction": "Paracetamol",
+    "confidence": "0.8",
+    "score": "0.7",
+    "improved_strategy": "Prefer generic names.",
+}
+
+
+class FakeLM(dspy.BaseLM):
+    """
+    LM that answers every call with FAKE_ANSWER_FIELDS after `latency` seconds (+/- `jitter`).
+    `output_tokens` pads detailed_analysis to roughly that many tokens; usage is estimated at 4 chars/token.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        output_tokens: int = 200,
+        medicines: int = 1,
+        model: str = "fake/fake-lm",
+        seed: int = 0,
+    ):
+        super().__init__(
+            model=model,
+            model_type="chat",
+            temperature=0.0,
+            max_tokens=4000,
+            cache=False,
+        )
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        fields = dict(FAKE_ANSWER_FIELDS)
+        fields["detailed_analysis"] = " ".join(
+            f"finding{i % 50}" for i in range(output_tokens)
+        )
+        fields["extracted_medicines"] = [f"Medicine{i}" for i in range(medicines)]
+        self._text = (
+            "".join(
+                f"[[ ## {name} ## ]]\n{value if isinstance(value, str) else json.dumps(value)}\n\n"
+                for name, value in fields.items()
+            )
+            + "[[ ## completed ## ]]"
+        )
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, delay))
+        prompt_chars = len(str(prompt or "")) + sum(
+            len(str(m.get("content", ""))) for m in (messages or [])
+        )
+        message = SimpleNamespace(
+            role="assistant",
+            content=self._text,
+            tool_calls=None,
+            reasoning_content=None,
+        )
+        return SimpleNamespace(
+            id="fake",
+            model=self.model,
+            object="chat.completion",
+            choices=[SimpleNamespace(index=0, finish_reason="stop", message=message)],
+            usage={
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(self._text) // 4,
+                "total_tokens": (prompt_chars + len(self._text)) // 4,
+            },
+        )
+
+
+class _FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.values = None
+        self.rows = None
+
+    def select(self, *columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def update(self, values):
+        self.values = values
+        return self
+
+    def insert(self, rows):
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def execute(self):
+        time.sleep(self.db.latency)
+        with self.db.lock:
+            table = self.db.tables.setdefault(self.table, [])
+            if self.rows is not None:
+                table.extend(dict(row) for row in self.rows)
+                return SimpleNamespace(data=self.rows)
+            matched = [
+                row
+                for row in table
+                if all(row.get(column) == value for column, value in self.filters)
+            ]
+            if self.values is not None:
+                for row in matched:
+                    row.update(self.values)
+            return SimpleNamespace(data=[dict(row) for row in matched])
+
+
+class _FakeBucket:
+    def __init__(self, storage, bucket):
+        self.storage = storage
+        self.bucket = bucket
+
+    def download(self, path):
+        time.sleep(self.storage.latency)
+        return self.storage.read(self.bucket, path)
+
+    def upload(self, path, file, file_options=None):
+        time.sleep(self.storage.latency)
+        data = file if isinstance(file, bytes) else file.read()
+        upsert = (file_options or {}).get("upsert") == "true"
+        with self.storage.lock:
+            if (self.bucket, path) in self.storage.objects and not upsert:
+                raise ValueError(f"The resource already exists: {path}")
+            self.storage.objects[(self.bucket, path)] = data
+            self.storage.file_options[(self.bucket, path)] = dict(file_options or {})
+
+
+class _FakeStorage:
+    def __init__(self, latency, root=None):
+        self.latency = latency
+        self.root = root
+        self.lock = threading.Lock()
+        self.objects = {}
+        # file_options of the last upload of each object
+        self.file_options = {}
+
+    def read(self, bucket, path):
+        """Object bytes from memory, falling back to `root/bucket/path` on disk for generated corpora."""
+        with self.lock:
+            data = self.objects.get((bucket, path))
+        if data is not None:
+            return data
+        if self.root is None:
+            raise KeyError((bucket, path))
+        with open(os.path.join(self.root, bucket, path), "rb") as f:
+            return f.read()
+
+    def from_(self, bucket):
+        return _FakeBucket(self, bucket)
+
+
+class FakeSupabase:
+    """
+    In-memory stand-in for the subset of the Supabase client the pipeline uses.
+    With `storage_root`, downloads of objects not uploaded in-process are read from that directory.
+    """
+
+    def __init__(
+        self,
+        db_latency: float = 0.0,
+        storage_latency: float = 0.0,
+        storage_root: str = None,
+    ):
+        self.latency = db_latency
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.storage = _FakeStorage(storage_latency, root=storage_root)
+
+    def table(self, name):
+        return _FakeQuery(self, name)
+
+
+class FakeMemory:
+    """In-memory stand-in for mem0's Memory with add/get_all/search."""
+
+    def __init__(self, latency: float = 0.0, search_limit: int = 100):
+        self.latency = latency
+        self.search_limit = search_limit
+        self.lock = threading.Lock()
+        self.memories = {}
+
+    def add(self, text, user_id=None, metadata=None):
+        time.sleep(self.latency)
+        with self.lock:
+            self.memories.setdefault(user_id, []).append(
+                {"memory": text, "metadata": metadata or {}}
+            )
+
+    def get_all(self, user_id=None):
+        with self.lock:
+            return {"results": list(self.memories.get(user_id, []))}
+
+    def search(self, query, user_id=None, limit=None):
+        time.sleep(self.latency)
+        with self.lock:
+            results = self.memories.get(user_id, [])
+            return {"results": list(results[: limit or self.search_limit])}
+
+
+def encode_png(width: int, height: int, rows) -> bytes:
+    """Encode `height` rows of `width` 8-bit greyscale pixels as a PNG."""
+    raw = b"".join(b"\x00" + bytes(row) for row in rows)
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def make_png(width: int, height: int, seed: int = 0) -> bytes:
+    """Render a valid greyscale PNG of the given size (noise rows, so it does not compress to nothing)."""
+    rng = random.Random(seed)
+    row = bytes(rng.getrandbits(8) for _ in range(width))
+    return encode_png(
+        width, height, (row[i % 7 :] + row[: i % 7] for i in range(height))
+    )
+
+
+def seed_corpus(
+    client: FakeSupabase,
+    patients: int,
+    records_per_patient: int,
+    image_size=(256, 256),
+    bucket: str = "medical-documents",
+):
+    """
+    Fill `patients` and `medical_records` rows and the matching storage objects. Every record gets its
+    own image, so near-duplicate detection finds nothing it should not.
+    """
+    for p in range(patients):
+        patient_id = f"patient-{p:06d}"
+        user_id = f"user-{p % 97:04d}"
+        client.table("patients").insert(
+            {"id": patient_id, "user_id": user_id}
+        ).execute()
+        for r in range(records_per_patient):
+            remote_path = f"{user_id}/{patient_id}/record-{r:04d}.png"
+            client.storage.objects[(bucket, remote_path)] = make_png(
+                *image_size, seed=p * records_per_patient + r
+            )
+            client.table("medical_records").insert(
+                {
+                    "id": f"{patient_id}-rec-{r:04d}",
+                    "patient_id": patient_id,
+                    "file_url": f"https://example.supabase.co/storage/v1/object/public/{bucket}/{remote_path}",
+                    "processed": False,
+                }
+            ).execute()
@@ -0,0 +1,153 @@
+"""
+Durable per-record, per-stage checkpoint journal (SQLite) with optional sync to Supabase Storage,
+plus SIGTERM handling so spot preemptions drain cleanly instead of losing in-flight work.
+"""
+
+import os
+import signal
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from processing_engine.common.logger import get_logger
+
+logger = get_logger("common.checkpoint")
+
+STAGES = ("download", "analysis", "mem0", "metadata", "upload", "summary")
+
+_stop_event = threading.Event()
+
+
+class CheckpointJournal:
+    """
+    Records which stages have completed for each record (or patient, for the summary stage).
+    Stage payloads (e.g. analysis text) are kept in the journal so a resumed run does not depend on local temp files.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        bucket: str = None,
+        remote_path: str = None,
+        sync_interval: float = 60.0,
+    ):
+        self.path = path
+        self.bucket = bucket
+        self.remote_path = remote_path
+        self.sync_interval = sync_interval
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                key TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                payload TEXT,
+                completed_at TEXT NOT NULL,
+                PRIMARY KEY (key, stage)
+            )
+            """)
+        self._conn.commit()
+
+    def is_done(self, key: str, stage: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM checkpoints WHERE key = ? AND stage = ?", (key, stage)
+            ).fetchone()
+        return row is not None
+
+    def get(self, key: str, stage: str):
+        """Return the payload stored for a completed stage, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM checkpoints WHERE key = ? AND stage = ?",
+                (key, stage),
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark(self, key: str, stage: str, payload: str = None):
+        """Mark a stage as completed. Committed immediately so a crash loses at most the current stage."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown checkpoint stage: {stage}")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (key, stage, payload, completed_at) VALUES (?, ?, ?, ?)",
+                (key, stage, payload, datetime.now(timezone.utc).isoformat()),
+            )
+            self._conn.commit()
+
+    def reset(self):
+        """Forget all completed stages (used when a run is not resuming)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints")
+            self._conn.commit()
+
+    def restore(self):
+        """Pull the journal from Supabase Storage if one was synced by a previous (preempted) node."""
+        if not self.bucket or not self.remote_path:
+            return False
+        from processing_engine.common.supabase_io import download_file_from_supabase
+
+        tmp_path = self.path + ".restore"
+        try:
+            download_file_from_supabase(self.bucket, self.remote_path, tmp_path)
+        except Exception as e:
+            logger.info(f"[checkpoint] No remote journal at {self.remote_path}: {e}")
+            return False
+        with self._lock:
+            self._conn.close()
+            os.replace(tmp_path, self.path)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        logger.info(f"[checkpoint] Restored journal from {self.remote_path}")
+        return True
+
+    def maybe_flush(self):
+        """Flush if more than `sync_interval` seconds have passed since the last flush."""
+        if time.monotonic() - self._last_flush >= self.sync_interval:
+            self.flush()
+
+    def flush(self):
+        """Commit and, if configured, sync the journal file to Supabase Storage."""
+        self._last_flush = time.monotonic()
+        with self._lock:
+            self._conn.commit()
+            if not self.bucket or not self.remote_path:
+                return
+            snapshot_path = self.path + ".snapshot"
+            snapshot = sqlite3.connect(snapshot_path)
+            self._conn.backup(snapshot)
+            snapshot.close()
+        from processing_engine.common.supabase_io import upload_file_to_supabase
+
+        try:
+            upload_file_to_supabase(
+                self.bucket, self.remote_path, snapshot_path, upsert=True
+            )
+            logger.info(f"[checkpoint] Synced journal to {self.remote_path}")
+        except Exception as e:
+            logger.error(f"[checkpoint] Failed to sync journal: {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def install_stop_handlers():
+    """Turn SIGTERM/SIGINT into a stop request so the pipeline can drain and flush its journal."""
+
+    def _handler(signum, frame):
+        logger.warning(f"[checkpoint] Received signal {signum}, draining")
+        _stop_event.set()
+
+    signal.signal(signal.SIGTERM, _handler)
+    signal.signal(signal.SIGINT, _handler)
+
+
+def stop_requested() -> bool:
+    return _stop_event.is_set()
+
+
+def wait_for_stop(timeout: float = None) -> bool:
+    """Sleep until a stop is requested or `timeout` passes; returns stop_requested()."""
+    return _stop_event.wait(timeout)
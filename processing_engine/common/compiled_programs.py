@@ -0,0 +1,137 @@
+"""
+Compiled (distilled) dspy programs: teacher example capture, saving, and loading at startup.
+
+A compiled program is the optimized state (demos, instructions) of one module's predictor, saved as
+`{COMPILED_PROGRAMS_DIR}/{program}.json` with a `{program}.meta.json` recording the student model,
+predictor strategy and the quality-gate score it passed. Modules call apply_compiled() on construction;
+when a program exists its state is loaded and the predictor is pointed at the student model.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from processing_engine.common.config import load_config
+from processing_engine.common.inference_profiles import STRATEGIES, profile_lm
+from processing_engine.common.logger import get_logger
+
+logger = get_logger("common.compiled_programs")
+
+config = load_config()
+_lock = threading.Lock()
+# program -> (state, meta), or None once a lookup found nothing
+_loaded = {}
+
+
+def program_paths(program: str, root: str = None):
+    root = root or config["COMPILED_PROGRAMS_DIR"]
+    return (
+        os.path.join(root, f"{program}.json"),
+        os.path.join(root, f"{program}.meta.json"),
+    )
+
+
+def save_compiled(program: str, predictor, meta: dict, root: str = None):
+    """Write a predictor's optimized state and its metadata atomically."""
+    state_path, meta_path = program_paths(program, root)
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    state = predictor.dump_state()
+    # The student LM is chosen at load time from meta["model"]; never persist client settings
+    # Predict state is flat; ChainOfThought nests it under "predict"
+    for predictor_state in [state] if "demos" in state else state.values():
+        predictor_state["lm"] = None
+    for path, data in ((state_path, state), (meta_path, meta)):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+    with _lock:
+        _loaded.pop(program, None)
+    logger.info(f"[distill] Saved compiled program {program} to {state_path}")
+
+
+def load_compiled(program: str, root: str = None):
+    """(state, meta) for a compiled program, or None. Cached, so per-record module construction is cheap."""
+    with _lock:
+        if program in _loaded and root is None:
+            return _loaded[program]
+    state_path, meta_path = program_paths(program, root)
+    result = None
+    if os.path.exists(state_path) and os.path.exists(meta_path):
+        with open(state_path) as f:
+            state = json.load(f)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        result = (state, meta)
+        logger.info(
+            f"[distill] Loaded compiled program {program} for {meta.get('model')} (score {meta.get('score')})"
+        )
+    if root is None:
+        with _lock:
+            _loaded[program] = result
+    return result
+
+
+def clear_cache():
+    """Forget loaded programs, so newly saved ones are picked up by modules built afterwards."""
+    with _lock:
+        _loaded.clear()
+
+
+def apply_compiled(module, program: str, signature, attribute: str = "predictor"):
+    """
+    Swap `module.<attribute>` for the compiled student predictor if one exists.
+    Returns True when a compiled program was applied.
+    """
+    loaded = load_compiled(program)
+    if loaded is None:
+        return False
+    state, meta = loaded
+    predictor = STRATEGIES[meta.get("strategy", "cot")](signature)
+    predictor.load_state(state)
+    lm = profile_lm({"model": meta["model"]})
+    if lm is not None:
+        predictor.set_lm(lm)
+    setattr(module, attribute, predictor)
+    return True
+
+
+def capture_example(program: str, inputs: dict, outputs: dict):
+    """
+    Append a teacher (input, output) pair to `{DISTILL_CAPTURE_DIR}/{program}.jsonl` for later distillation.
+    Image inputs are given as file paths and copied next to the dataset, since the document cache may evict them.
+    No-op unless DISTILL_CAPTURE_DIR is set.
+    """
+    root = config["DISTILL_CAPTURE_DIR"]
+    if not root:
+        return
+    try:
+        record = {}
+        for name, value in inputs.items():
+            if name.endswith("_image"):
+                with open(value, "rb") as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()
+                image_path = os.path.join(
+                    root, "images", digest + os.path.splitext(value)[1]
+                )
+                if not os.path.exists(image_path):
+                    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+                    shutil.copyfile(value, image_path)
+                value = image_path
+            record[name] = value
+        line = json.dumps(
+            {
+                "inputs": record,
+                "outputs": outputs,
+                "captured_at": datetime.now(timezone.utc).isoformat(),
+            },
+            default=str,
+        )
+        with _lock:
+            os.makedirs(root, exist_ok=True)
+            with open(os.path.join(root, f"{program}.jsonl"), "a") as f:
+                f.write(line + "\n")
+    except Exception as e:
+        logger.error(f"[distill] Failed to capture {program} example: {e}")
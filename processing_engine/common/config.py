@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -11,6 +12,83 @@ def load_config():
         "SUPABASE_SERVICE_ROLE": os.getenv("SUPABASE_SERVICE_ROLE"),
         "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY"),
         "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY"),
+        # Local OpenAI-compatible server; the server ignores the model id but dspy requires one
+        "MEDGEMMA_MODEL": os.getenv("MEDGEMMA_MODEL", "openai/medgemma"),
+        "MEDGEMMA_API_BASE": os.getenv("MEDGEMMA_API_BASE", "http://127.0.0.1:8081/v1"),
+        "CHECKPOINT_DIR": os.getenv("CHECKPOINT_DIR", "checkpoints"),
+        "CHECKPOINT_BUCKET": os.getenv("CHECKPOINT_BUCKET"),
+        "CACHE_DIR": os.getenv("CACHE_DIR", "temp_medical_docs"),
+        "CACHE_MAX_BYTES": int(os.getenv("CACHE_MAX_BYTES", str(2 * 1024**3))),
+        "METRICS_FILE": os.getenv("METRICS_FILE", "metrics/ayurlekha.prom"),
+        "LM_TRACE_PATH": os.getenv("LM_TRACE_PATH", "traces/lm_calls.sqlite"),
+        "LM_TRACE_SAMPLE_RATE": float(os.getenv("LM_TRACE_SAMPLE_RATE", "0.05")),
+        "PATIENT_WORKERS": int(os.getenv("PATIENT_WORKERS", "1")),
+        # Fact-level dedupe of a patient's analyses before the summary prompt
+        "SUMMARY_DEDUPE": os.getenv("SUMMARY_DEDUPE", "true").lower()
+        in ("1", "true", "yes"),
+        "SUMMARY_DEDUPE_THRESHOLD": float(os.getenv("SUMMARY_DEDUPE_THRESHOLD", "0.8")),
+        "ENTITY_STORE_DIR": os.getenv("ENTITY_STORE_DIR", "entities"),
+        "ENTITY_STORE_PARTITIONS": int(os.getenv("ENTITY_STORE_PARTITIONS", "16")),
+        # "single": one AyurlekhaSummarySignature call; "sections": per-section predictors in parallel
+        "SUMMARY_MODE": os.getenv("SUMMARY_MODE", "single"),
+        # Per-module predictor/model/limits, see common/inference_profiles.py
+        "INFERENCE_PROFILES": os.getenv("INFERENCE_PROFILES"),
+        "INFERENCE_PROFILES_FILE": os.getenv("INFERENCE_PROFILES_FILE"),
+        # Distilled student programs loaded at startup, and where teacher outputs are captured
+        "COMPILED_PROGRAMS_DIR": os.getenv(
+            "COMPILED_PROGRAMS_DIR", "compiled_programs"
+        ),
+        "DISTILL_CAPTURE_DIR": os.getenv("DISTILL_CAPTURE_DIR"),
+        # Background judging of a sampled share of analyses and summaries
+        "QUALITY_EVAL_SAMPLE_RATE": float(
+            os.getenv("QUALITY_EVAL_SAMPLE_RATE", "0.05")
+        ),
+        "QUALITY_EVAL_WORKERS": int(os.getenv("QUALITY_EVAL_WORKERS", "2")),
+        "QUALITY_EVAL_PATH": os.getenv(
+            "QUALITY_EVAL_PATH", "metrics/quality_scores.sqlite"
+        ),
+        # Judge model; defaults to the pipeline LM
+        "QUALITY_EVAL_MODEL": os.getenv("QUALITY_EVAL_MODEL"),
+        # "poll" scans the patients table; "events" processes pushed medical_records inserts
+        "TRIGGER_MODE": os.getenv("TRIGGER_MODE", "poll"),
+        "EVENT_SOURCE": os.getenv("EVENT_SOURCE", "realtime"),
+        "DATABASE_URL": os.getenv("DATABASE_URL"),
+        "NOTIFY_CHANNEL": os.getenv("NOTIFY_CHANNEL", "medical_records_insert"),
+        # Per-patient micro-batching of pushed records
+        "EVENT_DEBOUNCE_SECONDS": float(os.getenv("EVENT_DEBOUNCE_SECONDS", "5")),
+        "EVENT_MAX_WAIT_SECONDS": float(os.getenv("EVENT_MAX_WAIT_SECONDS", "30")),
+        # Urgency pre-pass for scheduling: "heuristic", "lm" (UrgencyTriage profile) or "off"
+        "URGENCY_PREPASS": os.getenv("URGENCY_PREPASS", "heuristic"),
+        # Fair-share weights per user_id (JSON), default 1
+        "SCHEDULER_USER_WEIGHTS": json.loads(
+            os.getenv("SCHEDULER_USER_WEIGHTS") or "{}"
+        ),
+        # Daemon worker (main.py): seconds between poll cycles, health port, LM warm-up at start
+        "WORKER_POLL_INTERVAL": float(os.getenv("WORKER_POLL_INTERVAL", "60")),
+        "HEALTH_PORT": int(os.getenv("HEALTH_PORT", "8080")),
+        "WORKER_WARMUP": os.getenv("WORKER_WARMUP", "true").lower()
+        in ("1", "true", "yes"),
+        # Comma-separated use-case plugins the worker runs (see common/plugins.py)
+        "WORKER_USECASES": os.getenv("WORKER_USECASES", "ayurlekha"),
+        # OCR pre-pass: confidently OCR'd documents are analysed as text instead of by the vision model
+        "OCR_PREPASS": os.getenv("OCR_PREPASS", "false").lower()
+        in ("1", "true", "yes"),
+        "OCR_WORKERS": int(os.getenv("OCR_WORKERS", "2")),
+        "OCR_MIN_CONFIDENCE": float(os.getenv("OCR_MIN_CONFIDENCE", "0.85")),
+        "OCR_MIN_WORDS": int(os.getenv("OCR_MIN_WORDS", "30")),
+        "OCR_LANG": os.getenv("OCR_LANG", "eng"),
+        # Near-duplicate images of a patient reuse the earlier record's analysis and metadata
+        "DUPLICATE_DETECTION": os.getenv("DUPLICATE_DETECTION", "true").lower()
+        in ("1", "true", "yes"),
+        "IMAGE_HASH_PATH": os.getenv("IMAGE_HASH_PATH", "entities/image_hashes.sqlite"),
+        "DUPLICATE_MAX_DHASH": int(os.getenv("DUPLICATE_MAX_DHASH", "10")),
+        "DUPLICATE_MAX_PHASH": int(os.getenv("DUPLICATE_MAX_PHASH", "8")),
+        # A perceptual match also needs the same bytes or OCR texts at least this similar
+        "DUPLICATE_MIN_TEXT_SIMILARITY": float(
+            os.getenv("DUPLICATE_MIN_TEXT_SIMILARITY", "0.9")
+        ),
+        # Local pre-filter that skips obviously non-medical uploads (see ayurlekha/prefilter.py); skipped without OCR_PREPASS
+        "PREFILTER": os.getenv("PREFILTER", "true").lower() in ("1", "true", "yes"),
         # Add more as needed
     }
     return config
@@ -0,0 +1,158 @@
+"""
+Deterministic parsing of the fuzzy dates and durations found in medical documents
+("01/03/2024", "1st Mar 2024", "Oct 2022", "x 2 weeks", "for 3 months").
+Numeric dates are read day-first, as written on Indian prescriptions.
+"""
+
+import calendar
+import re
+from datetime import date, timedelta
+
+MONTHS = {
+    name.lower(): i
+    for i in range(1, 13)
+    for name in (calendar.month_name[i], calendar.month_abbr[i])
+}
+MONTHS["sept"] = 9
+_NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "eleven": 11,
+    "twelve": 12,
+    "fourteen": 14,
+    "fifteen": 15,
+    "thirty": 30,
+}
+_ISO = re.compile(r"\b(\d{4})-(\d{1,2})(?:-(\d{1,2}))?\b")
+_NUMERIC = re.compile(r"\b(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{2,4})\b")
+_MONTH_YEAR_NUMERIC = re.compile(r"\b(\d{1,2})[/.\-](\d{4})\b")
+_DAY_MONTH_YEAR = re.compile(
+    r"\b(\d{1,2})(?:st|nd|rd|th)?(?:\s+of)?[\s\-]+([a-z]{3,9})\.?,?[\s\-]+(\d{2,4})\b"
+)
+_MONTH_DAY_YEAR = re.compile(
+    r"\b([a-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})\b"
+)
+# A 2-digit year needs an apostrophe ("Oct '22"): "May 15" is a day without a year
+_MONTH_YEAR = re.compile(r"\b([a-z]{3,9})\.?,?(?:[\s\-]+(\d{4})|[\s\-]*'(\d{2}))\b")
+_YEAR = re.compile(r"\b(19\d{2}|20\d{2})\b")
+_DURATION = re.compile(
+    r"(\d+(?:\.\d+)?|[a-z]+)\s*[-]?\s*(days?|d|weeks?|wks?|w|months?|mons?|mths?|m|years?|yrs?|y)\b"
+)
+_UNIT_DAYS = {"d": 1, "w": 7}
+_UNIT_MONTHS = {"m": 1, "y": 12}
+
+
+def _year(text: str) -> int:
+    year = int(text)
+    return year + 2000 if year < 100 else year
+
+
+def _safe_date(year: int, month: int, day: int):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_fuzzy_date(text):
+    """
+    Parse a date string into (date, precision) where precision is "day", "month" or "year".
+    Month/year precision dates use the first day of the period. Returns None if no date is found.
+    """
+    if not text or not isinstance(text, str):
+        return None
+    value = text.strip().lower()
+    match = _ISO.search(value)
+    if match:
+        year, month, day = match.groups()
+        parsed = _safe_date(int(year), int(month), int(day or 1))
+        if parsed:
+            return parsed, "day" if day else "month"
+    match = _NUMERIC.search(value)
+    if match:
+        day, month, year = match.groups()
+        parsed = _safe_date(_year(year), int(month), int(day))
+        if parsed is None:
+            # Month-first, e.g. 03/25/2024
+            parsed = _safe_date(_year(year), int(day), int(month))
+        if parsed:
+            return parsed, "day"
+    match = _DAY_MONTH_YEAR.search(value)
+    if match and match.group(2) in MONTHS:
+        day, month, year = match.groups()
+        parsed = _safe_date(_year(year), MONTHS[month], int(day))
+        if parsed:
+            return parsed, "day"
+    match = _MONTH_DAY_YEAR.search(value)
+    if match and match.group(1) in MONTHS:
+        month, day, year = match.groups()
+        parsed = _safe_date(int(year), MONTHS[month], int(day))
+        if parsed:
+            return parsed, "day"
+    for match in _MONTH_YEAR.finditer(value):
+        month, year, short_year = match.groups()
+        year = year or short_year
+        if month in MONTHS:
+            return date(_year(year), MONTHS[month], 1), "month"
+    match = _MONTH_YEAR_NUMERIC.search(value)
+    if match and 1 <= int(match.group(1)) <= 12:
+        return date(int(match.group(2)), int(match.group(1)), 1), "month"
+    match = _YEAR.search(value)
+    if match:
+        return date(int(match.group(1)), 1, 1), "year"
+    return None
+
+
+def format_date(parsed: date, precision: str = "day") -> str:
+    """ISO 8601 at the given precision: 2024-03-01, 2024-03 or 2024."""
+    if precision == "year":
+        return f"{parsed.year:04d}"
+    if precision == "month":
+        return f"{parsed.year:04d}-{parsed.month:02d}"
+    return parsed.isoformat()
+
+
+def normalize_date(text):
+    """Normalize a fuzzy date string to reduced-precision ISO; unparseable values are returned unchanged."""
+    parsed = parse_fuzzy_date(text)
+    return format_date(*parsed) if parsed else text
+
+
+def parse_duration(text):
+    """
+    Parse a course length ("5 days", "x 2 wks", "for three months", "1 year") into (months, days).
+    Returns None for open-ended ("continue", "lifelong", "SOS") or unrecognised durations.
+    """
+    if not text:
+        return None
+    if isinstance(text, (int, float)):
+        return 0, int(text)
+    for match in _DURATION.finditer(str(text).lower()):
+        amount, unit = match.groups()
+        if amount.replace(".", "", 1).isdigit():
+            amount = float(amount)
+        elif amount in _NUMBER_WORDS:
+            amount = _NUMBER_WORDS[amount]
+        else:
+            continue
+        unit = unit[0]
+        if unit in _UNIT_DAYS:
+            return 0, int(round(amount * _UNIT_DAYS[unit]))
+        return int(round(amount * _UNIT_MONTHS[unit])), 0
+    return None
+
+
+def add_duration(start: date, months: int = 0, days: int = 0) -> date:
+    """Add calendar months (clamping the day to the month's length), then days."""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day) + timedelta(days=days)
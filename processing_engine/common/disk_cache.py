@@ -0,0 +1,168 @@
+"""
+Bounded local disk cache for downloaded documents and intermediate artifacts.
+Writes are atomic (temp file + rename) so a partially written entry is never served,
+and the least recently used entries are evicted once the byte cap is exceeded.
+Entries handed out with `hold()` are pinned and never evicted until the block exits.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from processing_engine.common.logger import get_logger
+
+logger = get_logger("common.disk_cache")
+
+
+class DiskCache:
+    """LRU disk cache keyed by arbitrary strings, capped at `max_bytes`."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> size, least recently used first
+        self._pins = {}  # path -> number of holders
+        self._total_bytes = 0
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from file access times left by a previous process."""
+        found = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not os.path.isfile(path):
+                continue
+            if name.startswith(".tmp"):
+                # A write interrupted by a crash
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"[cache] Cannot remove leftover {path}: {e}")
+                continue
+            stat = os.stat(path)
+            found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _path_for(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        ext = os.path.splitext(key)[1]
+        return os.path.join(self.root, digest + ext)
+
+    def path(self, key: str, pin: bool = False):
+        """
+        Return the local path of a cached entry (marking it recently used), or None. Without `pin` the
+        entry may be evicted at any time; pinned paths must be given back with release().
+        """
+        path = self._path_for(key)
+        with self._lock:
+            if path in self._entries and os.path.exists(path):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                os.utime(path)
+                if pin:
+                    self._pins[path] = self._pins.get(path, 0) + 1
+                return path
+            self.misses += 1
+            self._drop(path)
+        return None
+
+    def release(self, path: str):
+        """Unpin a path handed out by path(pin=True) or put(pin=True)."""
+        with self._lock:
+            count = self._pins.pop(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+            self._evict()
+
+    @contextmanager
+    def hold(self, key: str):
+        """Local path of a cached entry (or None), pinned for the duration of the block."""
+        path = self.path(key, pin=True)
+        try:
+            yield path
+        finally:
+            if path is not None:
+                self.release(path)
+
+    def get(self, key: str):
+        """Return the cached bytes for a key, or None."""
+        with self.hold(key) as path:
+            if path is None:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+
+    def get_text(self, key: str):
+        data = self.get(key)
+        return data.decode("utf-8") if data is not None else None
+
+    def put(self, key: str, data, pin: bool = False) -> str:
+        """Atomically store bytes or text under a key and return its local path (pinned with `pin`)."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        path = self._path_for(key)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._drop(path)
+            self._entries[path] = len(data)
+            self._total_bytes += len(data)
+            if pin:
+                self._pins[path] = self._pins.get(path, 0) + 1
+            self._evict(keep=path)
+        return path
+
+    def _drop(self, path: str):
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self, keep: str = None):
+        # Pinned entries stay, even if that leaves the cache over its cap for a while
+        candidates = [
+            path for path in self._entries if path != keep and path not in self._pins
+        ]
+        for path in candidates:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._drop(path)
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def resize(self, max_bytes: int):
+        """Change the cap, evicting least recently used entries at once if it shrank."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
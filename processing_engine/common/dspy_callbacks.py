@@ -0,0 +1,129 @@
+"""
+dspy callbacks: per-module LM metrics and sampled LM call tracing.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from dspy.utils.callback import BaseCallback
+from processing_engine.common.metrics import metrics
+
+_local = threading.local()
+# History entries searched for a call's own entry; concurrent calls can only append a few after it
+_HISTORY_WINDOW = 256
+
+
+def current_module() -> str:
+    """Name of the innermost application module (not a dspy built-in such as Predict) on this thread."""
+    stack = getattr(_local, "modules", None)
+    return stack[-1] if stack else "unknown"
+
+
+def call_history_entry(lm, outputs) -> dict:
+    """
+    The history entry `lm` recorded for the call that returned `outputs`, or {}. The entry holds the
+    very list the call returned, so with concurrent calls on the same LM (PATIENT_WORKERS > 1, section
+    calls) usage is not taken from whichever call happened to finish last.
+    """
+    history = getattr(lm, "history", None) or []
+    for entry in reversed(history[-_HISTORY_WINDOW:]):
+        if entry.get("outputs") is outputs:
+            return entry
+    return {}
+
+
+class MetricsCallback(BaseCallback):
+    """Records per-module latency and per-model/module LM latency and token counts."""
+
+    def __init__(self):
+        self._calls = {}
+
+    def on_module_start(self, call_id, instance, inputs):
+        module = type(instance).__name__
+        # Built-in predictors are attributed to the application module that calls them
+        is_app_module = not type(instance).__module__.startswith("dspy.")
+        if is_app_module:
+            if not hasattr(_local, "modules"):
+                _local.modules = []
+            _local.modules.append(module)
+        self._calls[call_id] = (module, is_app_module, time.perf_counter())
+
+    def on_module_end(self, call_id, outputs, exception=None):
+        module, is_app_module, start = self._calls.pop(call_id, (None, None, None))
+        if module is None:
+            return
+        if is_app_module and getattr(_local, "modules", None):
+            _local.modules.pop()
+        metrics.observe(
+            "dspy_module_seconds", time.perf_counter() - start, module=module
+        )
+        if exception is not None:
+            metrics.inc("dspy_module_errors_total", module=module)
+
+    def on_lm_start(self, call_id, instance, inputs):
+        self._calls[call_id] = (instance, current_module(), time.perf_counter())
+
+    def on_lm_end(self, call_id, outputs, exception=None):
+        lm, module, start = self._calls.pop(call_id, (None, None, None))
+        if lm is None:
+            return
+        model = getattr(lm, "model", "unknown")
+        metrics.observe(
+            "lm_call_seconds", time.perf_counter() - start, model=model, module=module
+        )
+        if exception is not None:
+            metrics.inc("lm_call_errors_total", model=model, module=module)
+            return
+        entry = call_history_entry(lm, outputs)
+        usage = entry.get("usage") or {}
+        metrics.inc(
+            "lm_prompt_tokens_total",
+            usage.get("prompt_tokens") or 0,
+            model=model,
+            module=module,
+        )
+        metrics.inc(
+            "lm_completion_tokens_total",
+            usage.get("completion_tokens") or 0,
+            model=model,
+            module=module,
+        )
+        cost = entry.get("cost")
+        if cost:
+            metrics.inc("lm_cost_usd_total", cost, model=model, module=module)
+
+
+class LMTraceCallback(BaseCallback):
+    """Samples LM calls into an LMTraceStore; the store writes them off the calling thread."""
+
+    def __init__(self, store, sample_rate: float = 0.05):
+        self.store = store
+        self.sample_rate = sample_rate
+        self._calls = {}
+
+    def on_lm_start(self, call_id, instance, inputs):
+        if random.random() >= self.sample_rate:
+            return
+        prompt = inputs.get("messages") or inputs.get("prompt")
+        self._calls[call_id] = (instance, current_module(), prompt, time.perf_counter())
+
+    def on_lm_end(self, call_id, outputs, exception=None):
+        lm, module, prompt, start = self._calls.pop(call_id, (None, None, None, None))
+        if lm is None:
+            return
+        entry = call_history_entry(lm, outputs) if exception is None else {}
+        usage = entry.get("usage") or {}
+        self.store.record(
+            {
+                "ts": datetime.now(timezone.utc).isoformat(),
+                "module": module,
+                "model": getattr(lm, "model", "unknown"),
+                "latency_s": time.perf_counter() - start,
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "completion_tokens": usage.get("completion_tokens"),
+                "prompt": prompt,
+                "response": outputs,
+                "error": str(exception) if exception is not None else None,
+            }
+        )
@@ -1,41 +1,119 @@
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import dspy
-from typing import List, Dict, Optional
+from typing import Any, Deque, List, Dict, Optional
+from processing_engine.common.inference_profiles import make_predictor
+from processing_engine.common.logger import get_logger
+
+logger = get_logger("common.dspy_modules")
 
 
 class selfImprovingModule(dspy.Module):
-    """Self-improving module for iterative prediction and refinement."""
+    """
+    Self-improving module for iterative prediction and refinement.
 
-    def __init__(self):
+    Predictions cost one LM call. Labelled examples go into a bounded history; every `refine_every` of
+    them, a background task evaluates the new batch and refines the strategy, which is then swapped in
+    for later predictions.
+    """
+
+    def __init__(self, history_size: int = 100, refine_every: int = 10):
         super().__init__()
-        self.predict = dspy.ChainOfThought("input -> prediction,confidence")
-        self.evaluate = dspy.ChainOfThought("prediction,actual -> score, feedback")
-        self.refine = dspy.ChainOfThought(
-            "feedback, previous_examples -> improved_strategy"
+        self.predict = make_predictor(
+            "selfImprovingModule.predict", "input, strategy -> prediction,confidence"
+        )
+        self.evaluate = make_predictor(
+            "selfImprovingModule.evaluate", "prediction,actual -> score, feedback"
         )
-        self.history: List[Dict] = []
+        self.refine = make_predictor(
+            "selfImprovingModule.refine",
+            "feedback, previous_examples -> improved_strategy",
+        )
+        self.refine_every = refine_every
+        # Ring buffer of labelled predictions (dspy.Module.history is the LM call log)
+        self.examples: Deque[Dict] = deque(maxlen=history_size)
+        self.strategy = ""
+        self.refinements = 0
+        self._unrefined: List[Dict] = []
+        self._init_refiner()
+
+    def _init_refiner(self):
+        self._lock = threading.Lock()
+        self._refiner = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="self-improving-refine"
+        )
+        self._refining = None
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        for name in ("_lock", "_refiner", "_refining"):
+            state.pop(name, None)
+        return state
 
-    def forward(self, input: str, actual: Optional[str] = None) -> Dict[str, any]:
-        prediction = self.predict(input=input)
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._init_refiner()
+
+    def forward(self, input: str, actual: Optional[str] = None) -> Dict[str, Any]:
+        # One read of the reference, so a concurrent swap cannot mix strategies within a call
+        strategy = self.strategy
+        prediction = self.predict(input=input, strategy=strategy)
         result = {
             "prediction": prediction.prediction,
             "confidence": prediction.confidence,
         }
+        if strategy:
+            result["improvement"] = strategy
         if actual:
-            evaluation = self.evaluate(prediction=prediction.prediction, actual=actual)
-            self.history.append(
-                {
-                    "input": input,
-                    "prediction": prediction.prediction,
-                    "actual": actual,
-                    "evaluation": evaluation,
+            entry = {
+                "input": input,
+                "prediction": prediction.prediction,
+                "actual": actual,
+            }
+            with self._lock:
+                self.examples.append(entry)
+                self._unrefined.append(entry)
+                # While a refinement is in flight the backlog is capped like the history
+                del self._unrefined[: -self.examples.maxlen]
+                if len(self._unrefined) >= self.refine_every and (
+                    self._refining is None or self._refining.done()
+                ):
+                    batch, self._unrefined = self._unrefined, []
+                    self._refining = self._refiner.submit(
+                        contextvars.copy_context().run, self._refine_batch, batch
+                    )
+        return result
+
+    def _refine_batch(self, batch: List[Dict]):
+        """Evaluate a batch of labelled predictions, then refine the strategy from their feedback."""
+        try:
+            feedback = []
+            for entry in batch:
+                evaluation = self.evaluate(
+                    prediction=entry["prediction"], actual=entry["actual"]
+                )
+                entry["evaluation"] = {
+                    "score": evaluation.score,
+                    "feedback": evaluation.feedback,
                 }
-            )
-        if len(self.history) > 0:
+                feedback.append(evaluation.feedback)
+            # The batch itself: newer examples may have arrived while it was evaluated
             improvement = self.refine(
-                feedback=evaluation.feedback, previous_examples=self.history[-2:]
+                feedback="\n".join(str(f) for f in feedback),
+                previous_examples=batch,
             )
-            result["improvement"] = improvement.improved_strategy
-        return result
+            self.strategy = improvement.improved_strategy
+            self.refinements += 1
+        except Exception as e:
+            logger.error(f"[self_improving] Refinement failed: {e}")
+
+    def wait_for_refinement(self, timeout: float = None):
+        """Block until the refinement in flight (if any) has finished."""
+        refining = self._refining
+        if refining is not None:
+            refining.result(timeout=timeout)
 
 
 class compare_with_expected_data(dspy.Module):
@@ -43,8 +121,8 @@ class compare_with_expected_data(dspy.Module):
 
     def __init__(self):
         super().__init__()
-        self.predictor = dspy.ChainOfThought(
-            "existing_data,new_data -> quality,feedback"
+        self.predictor = make_predictor(
+            "compare_with_expected_data", "existing_data,new_data -> quality,feedback"
         )
 
     def forward(self, existing_data, new_data):
@@ -61,8 +139,9 @@ class accurate_analyser(dspy.Module):
 
     def __init__(self):
         super().__init__()
-        self.predictor = dspy.ChainOfThought(
-            "data -> authenticity,completeness,clarity,uncertainty,relevance,attribution,temporal_ordering,explainability"
+        self.predictor = make_predictor(
+            "accurate_analyser",
+            "data -> authenticity,completeness,clarity,uncertainty,relevance,attribution,temporal_ordering,explainability",
         )
 
     def forward(self, data):
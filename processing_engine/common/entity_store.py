@@ -0,0 +1,191 @@
+"""
+Local store of structured per-document entities (documents, medications, lab tests) extracted by
+DocumentMetadataSignature, so cohort queries and deterministic summary sections can scan typed columns
+instead of re-parsing analysis prose with an LM.
+
+Data is partitioned by patient: each patient hashes to one of `partitions` SQLite files, and every table
+is clustered on (patient_id, record_id), so reading one patient touches one file and one key range.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from processing_engine.common.logger import get_logger
+from processing_engine.common.sharding import shard_for
+
+logger = get_logger("common.entity_store")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    patient_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    user_id TEXT,
+    date TEXT,
+    category TEXT,
+    department TEXT,
+    doctor_name TEXT,
+    urgency TEXT,
+    is_medical_document INTEGER,
+    intelligent_name TEXT,
+    extracted_at TEXT NOT NULL,
+    PRIMARY KEY (patient_id, record_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS medications (
+    patient_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    dosage TEXT,
+    frequency TEXT,
+    start_date TEXT,
+    duration TEXT,
+    end_date TEXT,
+    PRIMARY KEY (patient_id, record_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lab_tests (
+    patient_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    date TEXT,
+    investigation TEXT,
+    result TEXT,
+    unit TEXT,
+    reference_range TEXT,
+    PRIMARY KEY (patient_id, record_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_documents_urgency ON documents (urgency);
+CREATE INDEX IF NOT EXISTS idx_medications_name ON medications (name);
+CREATE INDEX IF NOT EXISTS idx_lab_tests_investigation ON lab_tests (investigation);
+"""
+
+TABLES = ("documents", "medications", "lab_tests")
+MEDICATION_COLUMNS = (
+    "name",
+    "dosage",
+    "frequency",
+    "start_date",
+    "duration",
+    "end_date",
+)
+LAB_TEST_COLUMNS = ("date", "investigation", "result", "unit", "reference_range")
+
+
+def _text(value):
+    if value is None or value == "":
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def _items(values, columns):
+    """Coerce an LM list output (dicts, or bare strings naming the first column) into column tuples."""
+    rows = []
+    for value in values or []:
+        if isinstance(value, dict):
+            rows.append(tuple(_text(value.get(column)) for column in columns))
+        elif value:
+            rows.append((_text(value),) + (None,) * (len(columns) - 1))
+    return rows
+
+
+class EntityStore:
+    """Patient-partitioned SQLite store. Thread-safe; one connection and lock per partition."""
+
+    def __init__(self, root: str, partitions: int = 16):
+        self.root = root
+        self.partitions = partitions
+        self._connections = {}
+        self._locks = [threading.Lock() for _ in range(partitions)]
+        self._open_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _partition(self, index: int):
+        with self._open_lock:
+            conn = self._connections.get(index)
+            if conn is None:
+                path = os.path.join(self.root, f"part-{index:03d}.sqlite")
+                conn = sqlite3.connect(path, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.executescript(SCHEMA)
+                self._connections[index] = conn
+        return conn, self._locks[index]
+
+    def _for_patient(self, patient_id: str):
+        return self._partition(shard_for(patient_id, self.partitions))
+
+    def upsert_document(self, patient_id: str, user_id: str, record_id: str, metadata):
+        """Replace everything stored for one record with the entities in its metadata dict."""
+        conn, lock = self._for_patient(patient_id)
+        is_medical = metadata.get("is_medical_document")
+        document = (
+            patient_id,
+            record_id,
+            user_id,
+            _text(metadata.get("date")),
+            _text(metadata.get("category")),
+            _text(metadata.get("department")),
+            _text(metadata.get("doctor_name")),
+            _text(metadata.get("urgency")),
+            None if is_medical is None else int(bool(is_medical)),
+            _text(metadata.get("intelligent_name")),
+            datetime.now(timezone.utc).isoformat(),
+        )
+        medications = _items(metadata.get("medications"), MEDICATION_COLUMNS)
+        lab_tests = _items(metadata.get("lab_tests"), LAB_TEST_COLUMNS)
+        with lock, conn:
+            for table in TABLES:
+                conn.execute(
+                    f"DELETE FROM {table} WHERE patient_id = ? AND record_id = ?",
+                    (patient_id, record_id),
+                )
+            conn.execute(
+                f"INSERT INTO documents VALUES ({', '.join('?' * len(document))})",
+                document,
+            )
+            conn.executemany(
+                f"INSERT INTO medications VALUES (?, ?, ?, {', '.join('?' * len(MEDICATION_COLUMNS))})",
+                [(patient_id, record_id, i, *row) for i, row in enumerate(medications)],
+            )
+            conn.executemany(
+                f"INSERT INTO lab_tests VALUES (?, ?, ?, {', '.join('?' * len(LAB_TEST_COLUMNS))})",
+                [(patient_id, record_id, i, *row) for i, row in enumerate(lab_tests)],
+            )
+        return {"medications": len(medications), "lab_tests": len(lab_tests)}
+
+    def patient_rows(self, table: str, patient_id: str):
+        """All rows of `table` for one patient, in record order."""
+        if table not in TABLES:
+            raise ValueError(f"Unknown entity table: {table}")
+        conn, lock = self._for_patient(patient_id)
+        with lock:
+            rows = conn.execute(
+                f"SELECT * FROM {table} WHERE patient_id = ? ORDER BY record_id",
+                (patient_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def scan(self, sql: str, params=()):
+        """
+        Run a read-only query against every partition and concatenate the rows, e.g.
+        scan("SELECT patient_id, name FROM medications WHERE name LIKE ?", ("%metformin%",)).
+        Aggregates are per partition; combine them in the caller. Each partition is opened read-only,
+        so a caller's UPDATE or DELETE fails instead of changing the store.
+        """
+        rows = []
+        for index in range(self.partitions):
+            path = os.path.join(self.root, f"part-{index:03d}.sqlite")
+            if not os.path.exists(path):
+                continue
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+            try:
+                rows.extend(dict(row) for row in conn.execute(sql, params))
+            finally:
+                conn.close()
+        return rows
+
+    def close(self):
+        with self._open_lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
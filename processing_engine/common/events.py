@@ -0,0 +1,275 @@
+"""
+Push-based ingest of new medical records, as an alternative to scanning the patients table.
+
+An event source calls `on_record(row)` for every inserted `medical_records` row:
+
+- PostgresNotifySource LISTENs on a channel fed by a trigger on the table (requires psycopg2):
+
+      CREATE FUNCTION notify_medical_record() RETURNS trigger AS $$
+      BEGIN
+        PERFORM pg_notify('medical_records_insert', row_to_json(NEW)::text);
+        RETURN NEW;
+      END $$ LANGUAGE plpgsql;
+      CREATE TRIGGER medical_records_notify AFTER INSERT ON medical_records
+        FOR EACH ROW EXECUTE FUNCTION notify_medical_record();
+
+- SupabaseRealtimeSource subscribes to INSERTs through Supabase Realtime (the `realtime` package that
+  ships with supabase-py); the table must be in the `supabase_realtime` publication.
+- LocalEventSource is an in-process stand-in for tests and benchmarks.
+
+PatientDebouncer groups the records of one patient that arrive within a short window into a single
+batch, so a burst of uploads produces one summary.
+"""
+
+import asyncio
+import heapq
+import json
+import queue
+import threading
+import time
+from processing_engine.common.logger import get_logger
+
+logger = get_logger("common.events")
+
+
+class LocalEventSource:
+    """In-process event source: publish() delivers rows to the subscriber on a background thread."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def publish(self, record: dict):
+        self._queue.put(record)
+
+    def start(self, on_record):
+        def run():
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                on_record(record)
+
+        self._thread = threading.Thread(target=run, name="local-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+
+
+class PostgresNotifySource:
+    """LISTEN/NOTIFY on a direct Postgres connection; notification payloads are the inserted rows as JSON."""
+
+    def __init__(self, dsn: str, channel: str, poll_seconds: float = 1.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, on_record):
+        import psycopg2
+
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        conn.cursor().execute(f'LISTEN "{self.channel}"')
+        logger.info(f"[events] Listening on Postgres channel {self.channel}")
+
+        def run():
+            import select
+
+            while not self._stop.is_set():
+                if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        on_record(json.loads(notify.payload))
+                    except Exception as e:
+                        logger.error(f"[events] Bad notification payload: {e}")
+            conn.close()
+
+        self._thread = threading.Thread(target=run, name="pg-notify", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class SupabaseRealtimeSource:
+    """Supabase Realtime postgres_changes subscription for INSERTs on one table, run on its own event loop."""
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        table: str = "medical_records",
+        schema: str = "public",
+    ):
+        self.url = url.rstrip("/").replace("http", "ws", 1) + "/realtime/v1"
+        self.key = key
+        self.table = table
+        self.schema = schema
+        self._loop = None
+        self._thread = None
+
+    def start(self, on_record):
+        from realtime import AsyncRealtimeClient
+
+        def callback(payload):
+            data = payload.get("data", payload)
+            record = data.get("record") or data.get("new")
+            if record:
+                on_record(record)
+
+        async def subscribe():
+            client = AsyncRealtimeClient(self.url, self.key)
+            await client.connect()
+            channel = client.channel(f"{self.schema}:{self.table}")
+            channel.on_postgres_changes(
+                "INSERT", schema=self.schema, table=self.table, callback=callback
+            )
+            await channel.subscribe()
+            logger.info(f"[events] Subscribed to Realtime inserts on {self.table}")
+            await client.listen()
+
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(subscribe())
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error(f"[events] Realtime subscription failed: {e}")
+
+        self._thread = threading.Thread(
+            target=run, name="supabase-realtime", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._loop is not None:
+            for task in asyncio.all_tasks(self._loop):
+                self._loop.call_soon_threadsafe(task.cancel)
+            self._thread.join(timeout=5)
+
+
+def make_event_source(config):
+    """Event source selected by EVENT_SOURCE ("notify", "realtime" or "local")."""
+    kind = config["EVENT_SOURCE"]
+    if kind == "notify":
+        return PostgresNotifySource(config["DATABASE_URL"], config["NOTIFY_CHANNEL"])
+    if kind == "realtime":
+        key = config.get("SUPABASE_SERVICE_ROLE") or config["SUPABASE_ANON_KEY"]
+        return SupabaseRealtimeSource(config["SUPABASE_URL"], key)
+    if kind == "local":
+        return LocalEventSource()
+    raise ValueError(f"Unknown EVENT_SOURCE: {kind}")
+
+
+class PatientDebouncer:
+    """
+    Collects record ids per patient and calls `on_batch(patient_id, record_ids, first_seen)` once no new
+    record has arrived for `window` seconds, or `max_wait` seconds after the first one, whichever is sooner.
+    A patient is never dispatched again until done(patient_id) reports its previous batch finished;
+    records arriving meanwhile form the next batch. `on_batch` runs on the debouncer thread and should
+    only hand the batch off.
+    """
+
+    def __init__(self, on_batch, window: float = 5.0, max_wait: float = 30.0):
+        self.on_batch = on_batch
+        self.window = window
+        self.max_wait = max_wait
+        self._pending = {}
+        self._in_flight = set()
+        self._deadlines = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._run, name="patient-debouncer", daemon=True
+        )
+        self._thread.start()
+
+    def add(self, patient_id: str, record_id):
+        now = time.monotonic()
+        with self._cond:
+            entry = self._pending.get(patient_id)
+            if entry is None:
+                entry = self._pending[patient_id] = {"records": [], "first_seen": now}
+            if record_id not in entry["records"]:
+                entry["records"].append(record_id)
+            entry["deadline"] = min(
+                now + self.window, entry["first_seen"] + self.max_wait
+            )
+            heapq.heappush(self._deadlines, (entry["deadline"], patient_id))
+            self._cond.notify()
+
+    def done(self, patient_id: str):
+        with self._cond:
+            self._in_flight.discard(patient_id)
+            entry = self._pending.get(patient_id)
+            if entry is not None:
+                heapq.heappush(self._deadlines, (entry["deadline"], patient_id))
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(e["records"]) for e in self._pending.values())
+
+    def _due(self):
+        """Pop the batches whose deadline has passed; returns (batches, seconds until the next deadline)."""
+        now = time.monotonic()
+        batches = []
+        while self._deadlines:
+            deadline, patient_id = self._deadlines[0]
+            entry = self._pending.get(patient_id)
+            # Stale heap entries: superseded deadline, already dispatched, or waiting on an in-flight batch
+            if (
+                entry is None
+                or entry["deadline"] != deadline
+                or patient_id in self._in_flight
+            ):
+                heapq.heappop(self._deadlines)
+                continue
+            if deadline > now and not self._stopped:
+                return batches, deadline - now
+            heapq.heappop(self._deadlines)
+            del self._pending[patient_id]
+            self._in_flight.add(patient_id)
+            batches.append((patient_id, entry["records"], entry["first_seen"]))
+        return batches, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batches, wait = self._due()
+                if not batches:
+                    if self._stopped:
+                        return
+                    self._cond.wait(wait)
+                    continue
+            for patient_id, records, first_seen in batches:
+                try:
+                    self.on_batch(patient_id, records, first_seen)
+                except Exception as e:
+                    logger.error(
+                        f"[events] Failed to dispatch patient {patient_id}: {e}"
+                    )
+                    self.done(patient_id)
+
+    def stop(self):
+        """
+        Dispatch everything still pending (ignoring the window) and stop the thread. Records of a patient
+        whose batch is still in flight are left unprocessed in the database for the next start's catch-up.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
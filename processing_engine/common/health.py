@@ -0,0 +1,67 @@
+"""
+Minimal HTTP health endpoint for long-running workers:
+
+    GET /healthz  200 while the process is serving (liveness)
+    GET /readyz   200 when `status()` reports ready, else 503 (readiness); body is the status JSON
+    GET /metrics  Prometheus text from the metrics registry
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from processing_engine.common.logger import get_logger
+from processing_engine.common.metrics import metrics
+
+logger = get_logger("common.health")
+
+
+class HealthServer:
+    """Serves the endpoints above on a daemon thread; `status` returns a dict with a boolean "ready"."""
+
+    def __init__(self, status, host: str = "0.0.0.0", port: int = 8080):
+        self.status = status
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/healthz":
+                    self._send(200, {"alive": True})
+                elif self.path == "/readyz":
+                    status = server.status()
+                    self._send(200 if status.get("ready") else 503, status)
+                elif self.path == "/metrics":
+                    self._send(
+                        200, metrics.to_prometheus(), "text/plain; version=0.0.4"
+                    )
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _send(self, code, body, content_type="application/json"):
+                payload = (
+                    body if isinstance(body, str) else json.dumps(body, default=str)
+                ).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="health-server", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        logger.info(
+            f"[health] Serving /healthz, /readyz and /metrics on port {self.port}"
+        )
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
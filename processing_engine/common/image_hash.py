@@ -0,0 +1,273 @@
+"""
+Perceptual hashes of document images and a per-patient index of them, to spot the same page photographed
+twice or uploaded again under a new record.
+
+Two 64-bit hashes are kept per image: dHash (sign of horizontal gradients on a 9x8 thumbnail) and pHash
+(sign of the 8x8 low-frequency DCT coefficients of a 32x32 thumbnail against their median). Two images are
+candidates when both Hamming distances are within their thresholds. Thumbnails of two reports printed on
+the same template (same letterhead and table, different values) can be just as close, so a candidate is
+only a duplicate once its content agrees too: the same file bytes, or OCR texts whose word 3-shingles
+overlap by at least `min_text_similarity` (Jaccard). Without OCR text only byte-identical re-uploads
+match. Decoding needs Pillow, which is optional: without it hashing is disabled and every document is
+analysed.
+
+The index is one SQLite table, one row per record, clustered on (patient_id, record_id) so a lookup
+reads one patient's key range.
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from processing_engine.common.logger import get_logger
+from processing_engine.common.text_dedupe import normalize_fact, shingles
+
+logger = get_logger("common.image_hash")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_hashes (
+    patient_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    dhash INTEGER NOT NULL,
+    phash INTEGER NOT NULL,
+    lm_calls INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    sha256 TEXT,
+    text TEXT,
+    PRIMARY KEY (patient_id, record_id)
+) WITHOUT ROWID;
+"""
+
+
+def _bits(flags) -> int:
+    value = 0
+    for flag in flags:
+        value = (value << 1) | int(flag)
+    return value
+
+
+def dhash(pixels) -> int:
+    """dHash of a 9-wide, 8-high grayscale thumbnail given as rows of pixel values."""
+    return _bits(row[x] > row[x + 1] for row in pixels for x in range(8))
+
+
+def _dct_matrix(n: int):
+    return [
+        [
+            math.sqrt((1 if k == 0 else 2) / n)
+            * math.cos(math.pi * (2 * i + 1) * k / (2 * n))
+            for i in range(n)
+        ]
+        for k in range(n)
+    ]
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def phash(pixels) -> int:
+    """pHash of a 32x32 grayscale thumbnail given as rows of pixel values."""
+    # Only the top-left 8x8 block of the 2-D DCT is needed
+    rows = [
+        [sum(c * v for c, v in zip(_DCT32[k], row)) for k in range(8)] for row in pixels
+    ]
+    block = [
+        [sum(_DCT32[k][i] * rows[i][j] for i in range(32)) for j in range(8)]
+        for k in range(8)
+    ]
+    values = [v for row in block for v in row]
+    # The DC term only carries overall brightness
+    median = sorted(values[1:])[len(values[1:]) // 2]
+    return _bits(v > median for v in values)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def image_hashes(path: str):
+    """(dhash, phash) of an image file; requires Pillow."""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        gray = image.convert("L")
+        small = gray.resize((9, 8), Image.LANCZOS)
+        large = gray.resize((32, 32), Image.LANCZOS)
+    d = list(small.getdata())
+    p = list(large.getdata())
+    return (
+        dhash([d[y * 9 : (y + 1) * 9] for y in range(8)]),
+        phash([p[y * 32 : (y + 1) * 32] for y in range(32)]),
+    )
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the word 3-shingles of two OCR texts; numbers count as words."""
+    shingles_a, shingles_b = shingles(normalize_fact(a)), shingles(normalize_fact(b))
+    union = shingles_a | shingles_b
+    return len(shingles_a & shingles_b) / len(union) if union else 0.0
+
+
+def _signed(value: int) -> int:
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class ImageHashIndex:
+    """Per-patient perceptual hashes of analysed documents, in one SQLite file."""
+
+    def __init__(
+        self,
+        path: str,
+        max_dhash: int = 10,
+        max_phash: int = 8,
+        min_text_similarity: float = 0.9,
+    ):
+        self.path = path
+        self.max_dhash = max_dhash
+        self.max_phash = max_phash
+        self.min_text_similarity = min_text_similarity
+        self._lock = threading.Lock()
+        self._conn = None
+        self._available = None
+
+    def available(self) -> bool:
+        if self._available is None:
+            try:
+                import PIL  # noqa: F401
+
+                self._available = True
+            except ImportError:
+                logger.warning(
+                    "[dedupe] Near-duplicate detection disabled, Pillow is not installed"
+                )
+                self._available = False
+        return self._available
+
+    def hashes(self, path: str):
+        """Hashes of a document, or None if hashing is unavailable or the file is not an image."""
+        if not self.available():
+            return None
+        try:
+            return image_hashes(path)
+        except Exception as e:
+            logger.info(f"[dedupe] Cannot hash {path}: {e}")
+            return None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+            # Indexes written before content confirmation lack its columns
+            columns = {
+                row[1] for row in self._conn.execute("PRAGMA table_info(image_hashes)")
+            }
+            for column in ("sha256", "text"):
+                if column not in columns:
+                    self._conn.execute(
+                        f"ALTER TABLE image_hashes ADD COLUMN {column} TEXT"
+                    )
+        return self._conn
+
+    def add(
+        self,
+        patient_id: str,
+        record_id,
+        hashes,
+        lm_calls: int = 0,
+        sha256: str = None,
+        text: str = None,
+    ):
+        """Index a record's hashes with its content: the file's SHA-256 and its OCR text, if any."""
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO image_hashes "
+                    "(patient_id, record_id, dhash, phash, lm_calls, created_at, sha256, text) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        patient_id,
+                        str(record_id),
+                        _signed(hashes[0]),
+                        _signed(hashes[1]),
+                        lm_calls,
+                        datetime.now(timezone.utc).isoformat(),
+                        sha256,
+                        text,
+                    ),
+                )
+
+    def _confirm(self, sha256, text, stored_sha256, stored_text):
+        """What confirms a perceptual match ("bytes" or "text"), or None if the content differs."""
+        if sha256 is not None and sha256 == stored_sha256:
+            return "bytes"
+        if (
+            text
+            and stored_text
+            and text_similarity(text, stored_text) >= self.min_text_similarity
+        ):
+            return "text"
+        return None
+
+    def find(self, patient_id: str, hashes, exclude=None, sha256=None, text=None):
+        """
+        Closest earlier record of this patient whose image is near `hashes` and whose content agrees
+        (same `sha256`, or OCR `text` similar enough), as {"record_id", "dhash_distance",
+        "phash_distance", "lm_calls", "confirmed_by"}, or None.
+        """
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    "SELECT record_id, dhash, phash, lm_calls, sha256, text "
+                    "FROM image_hashes WHERE patient_id = ?",
+                    (patient_id,),
+                )
+                .fetchall()
+            )
+        best = None
+        for record_id, d, p, lm_calls, stored_sha256, stored_text in rows:
+            if exclude is not None and record_id == str(exclude):
+                continue
+            d_dist = hamming(hashes[0], _unsigned(d))
+            p_dist = hamming(hashes[1], _unsigned(p))
+            if d_dist > self.max_dhash or p_dist > self.max_phash:
+                continue
+            confirmed_by = self._confirm(sha256, text, stored_sha256, stored_text)
+            if confirmed_by is None:
+                continue
+            if (
+                best is None
+                or d_dist + p_dist < best["dhash_distance"] + best["phash_distance"]
+            ):
+                best = {
+                    "record_id": record_id,
+                    "dhash_distance": d_dist,
+                    "phash_distance": p_dist,
+                    "lm_calls": lm_calls,
+                    "confirmed_by": confirmed_by,
+                }
+        return best
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
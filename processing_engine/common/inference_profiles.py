@@ -0,0 +1,143 @@
+"""
+Per-module inference profiles: which dspy predictor (plain Predict or ChainOfThought), which model and
+which generation limits each module uses. Profiles come from INFERENCE_PROFILES (inline JSON) or
+INFERENCE_PROFILES_FILE (a JSON file), keyed by module class name, optionally with a part suffix:
+
+    {"DocumentMetadataModule": {"strategy": "predict", "max_tokens": 800},
+     "SummarySection.summary": {"model": "medgemma"},
+     "accurate_analyser": {"model": "gemini/gemini-2.5-pro"}}
+
+Modules not listed keep their built-in default (ChainOfThought on the globally configured LM).
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+import dspy
+from processing_engine.common.config import load_config
+from processing_engine.common.logger import get_logger
+
+logger = get_logger("common.inference_profiles")
+
+STRATEGIES = {"predict": dspy.Predict, "cot": dspy.ChainOfThought}
+PROFILE_KEYS = {"strategy", "model", "max_tokens", "temperature"}
+
+_lock = threading.Lock()
+_lms = {}
+_overrides = []
+_profiles = None
+
+
+def load_profiles(config=None):
+    """Read the configured profiles; invalid entries are reported and ignored."""
+    config = config or load_config()
+    raw = {}
+    if config.get("INFERENCE_PROFILES_FILE"):
+        with open(config["INFERENCE_PROFILES_FILE"]) as f:
+            raw.update(json.load(f))
+    if config.get("INFERENCE_PROFILES"):
+        raw.update(json.loads(config["INFERENCE_PROFILES"]))
+    profiles = {}
+    for name, profile in raw.items():
+        unknown = set(profile) - PROFILE_KEYS
+        if unknown or profile.get("strategy", "cot") not in STRATEGIES:
+            logger.error(f"[profiles] Ignoring invalid profile for {name}: {profile}")
+            continue
+        profiles[name] = profile
+    return profiles
+
+
+def get_profile(name: str) -> dict:
+    """Effective profile for a module ("Module" or "Module.part"); overrides win over configuration."""
+    global _profiles
+    if _profiles is None:
+        _profiles = load_profiles()
+    base = name.split(".", 1)[0]
+    profile = {}
+    for source in [_profiles] + list(_overrides):
+        profile.update(source.get(base, {}))
+        if name != base:
+            profile.update(source.get(name, {}))
+    return profile
+
+
+def reload_profiles():
+    """Re-read the configured profiles (e.g. on a worker reload); modules built afterwards use them."""
+    global _profiles
+    profiles = load_profiles()
+    with _lock:
+        _profiles = profiles
+    logger.info(f"[profiles] Reloaded {len(profiles)} profiles")
+
+
+@contextmanager
+def override_profiles(profiles: dict):
+    """Temporarily apply profiles on top of the configuration (used by the evaluation harness)."""
+    with _lock:
+        _overrides.append(profiles)
+    try:
+        yield
+    finally:
+        with _lock:
+            _overrides.remove(profiles)
+
+
+def resolve_model(model: str) -> str:
+    """Expand the "gemini" / "medgemma" aliases to the configured model ids."""
+    config = load_config()
+    aliases = {
+        "gemini": "gemini/gemini-2.0-flash",
+        "medgemma": config["MEDGEMMA_MODEL"],
+    }
+    return aliases.get(model, model)
+
+
+def profile_lm(profile: dict):
+    """
+    LM for a profile: a named model, or a copy of the global LM with different limits.
+    Returns None when the profile changes neither, so the predictor follows the global LM.
+    """
+    limits = {
+        key: profile[key] for key in ("max_tokens", "temperature") if key in profile
+    }
+    model = profile.get("model")
+    if not model and not limits:
+        return None
+    base = None if model else dspy.settings.lm
+    if not model and base is None:
+        return None
+    key = (model or id(base), tuple(sorted(limits.items())))
+    with _lock:
+        lm = _lms.get(key)
+        if lm is None:
+            if model:
+                config = load_config()
+                model_id = resolve_model(model)
+                kwargs = dict(limits)
+                if model_id == config["MEDGEMMA_MODEL"]:
+                    kwargs.update(
+                        api_base=config["MEDGEMMA_API_BASE"], api_key="sk1234"
+                    )
+                elif model_id.startswith("gemini/"):
+                    kwargs["api_key"] = config["GEMINI_API_KEY"]
+                lm = dspy.LM(model_id, **kwargs)
+            else:
+                lm = base.copy(**limits)
+            _lms[key] = lm
+    return lm
+
+
+def profile_lms() -> list:
+    """The LMs created so far for profiles (e.g. to warm them up)."""
+    with _lock:
+        return list(_lms.values())
+
+
+def make_predictor(name: str, signature, default: str = "cot"):
+    """Build the predictor for module `name` according to its profile."""
+    profile = get_profile(name)
+    predictor = STRATEGIES[profile.get("strategy", default)](signature)
+    lm = profile_lm(profile)
+    if lm is not None:
+        predictor.set_lm(lm)
+    return predictor
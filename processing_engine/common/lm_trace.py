@@ -0,0 +1,191 @@
+"""
+Sampled store of LM calls for debugging slow or bad generations in production.
+Calls are enqueued by the caller as they are and serialized and written to SQLite by a background thread,
+so recording never blocks the pipeline. Inline images (base64 data URLs) are replaced by a placeholder.
+"""
+
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+from processing_engine.common.logger import get_logger, truncate
+
+logger = get_logger("common.lm_trace")
+
+# Characters kept from each prompt/response
+TRACE_TEXT_LIMIT = 4000
+COLUMNS = (
+    "id",
+    "ts",
+    "module",
+    "model",
+    "latency_s",
+    "prompt_tokens",
+    "completion_tokens",
+    "prompt",
+    "response",
+    "error",
+)
+_DATA_URL = re.compile(r"data:([\w.+\-]+/[\w.+\-]+);base64,[A-Za-z0-9+/=]+")
+
+
+def strip_images(value):
+    """`value` with every base64 data URL in its strings replaced by "<image/png, N base64 chars>"."""
+    if isinstance(value, str):
+        if ";base64," not in value:
+            return value
+        return _DATA_URL.sub(
+            lambda m: f"<{m.group(1)}, {len(m.group(0))} base64 chars>", value
+        )
+    if isinstance(value, dict):
+        return {key: strip_images(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [strip_images(item) for item in value]
+    return value
+
+
+def _serialize(value):
+    if value is None:
+        return None
+    value = strip_images(value)
+    if not isinstance(value, str):
+        value = json.dumps(value, default=str)
+    return truncate(value, TRACE_TEXT_LIMIT) if value else value
+
+
+class LMTraceStore:
+    """SQLite-backed trace store that keeps at most `max_rows` calls, dropping the oldest first."""
+
+    def __init__(self, path: str, max_rows: int = 50000, max_queue: int = 1000):
+        self.path = path
+        self.max_rows = max_rows
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._init_schema()
+        self._thread = threading.Thread(
+            target=self._run, name="lm-trace-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _init_schema(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS lm_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL,
+                module TEXT,
+                model TEXT,
+                latency_s REAL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                prompt TEXT,
+                response TEXT,
+                error TEXT
+            )
+            """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_lm_calls_module ON lm_calls (module)"
+        )
+        conn.commit()
+        conn.close()
+
+    def record(self, call: dict):
+        """
+        Enqueue a call for writing; drops it (and counts the drop) if the writer is behind. Prompt and
+        response are serialized on the writer thread, so they must not be mutated afterwards.
+        """
+        try:
+            self._queue.put_nowait(dict(call))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        conn = sqlite3.connect(self.path)
+        written = 0
+        while True:
+            call = self._queue.get()
+            if call is None:
+                break
+            batch = [call]
+            # Drain whatever else is waiting so writes are batched
+            while len(batch) < 100:
+                try:
+                    call = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if call is None:
+                    self._queue.put(None)
+                    break
+                batch.append(call)
+            try:
+                conn.executemany(
+                    """
+                    INSERT INTO lm_calls (ts, module, model, latency_s, prompt_tokens, completion_tokens, prompt, response, error)
+                    VALUES (:ts, :module, :model, :latency_s, :prompt_tokens, :completion_tokens, :prompt, :response, :error)
+                    """,
+                    [
+                        {
+                            "ts": c.get("ts"),
+                            "module": c.get("module"),
+                            "model": c.get("model"),
+                            "latency_s": c.get("latency_s"),
+                            "prompt_tokens": c.get("prompt_tokens"),
+                            "completion_tokens": c.get("completion_tokens"),
+                            "prompt": _serialize(c.get("prompt")),
+                            "response": _serialize(c.get("response")),
+                            "error": c.get("error"),
+                        }
+                        for c in batch
+                    ],
+                )
+                written += len(batch)
+                if written >= 1000:
+                    written = 0
+                    conn.execute(
+                        "DELETE FROM lm_calls WHERE id <= (SELECT MAX(id) FROM lm_calls) - ?",
+                        (self.max_rows,),
+                    )
+                conn.commit()
+            except Exception as e:
+                logger.error(f"[lm_trace] Failed to write {len(batch)} calls: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    def flush(self):
+        """Block until everything enqueued so far has been written."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def query(self, where: str = None, params=(), limit: int = 50, **equals):
+        """
+        Return recent calls matching a parameterised SQL condition and/or column values, e.g.
+        query("latency_s > ?", (20,)) or query(module="DocumentProcessor"). Values always go in `params`
+        or `equals`, never into `where`; the connection is read-only.
+        """
+        unknown = set(equals) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown lm_calls columns: {sorted(unknown)}")
+        if where is not None and (";" in where or "--" in where):
+            raise ValueError("where must be a single condition with ? placeholders")
+        conditions = [f"({where})"] if where else []
+        conditions += [f"{column} = ?" for column in equals]
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(
+                "SELECT * FROM lm_calls WHERE "
+                + (" AND ".join(conditions) or "1=1")
+                + " ORDER BY id DESC LIMIT ?",
+                (*params, *equals.values(), limit),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
@@ -1,11 +1,122 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+
+LOG_FILE = os.getenv("LOG_FILE", "processing_engine.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Max characters kept from any logged payload
+LOG_MAX_PAYLOAD = int(os.getenv("LOG_MAX_PAYLOAD", "2000"))
+# Per-event sampling, e.g. "metadata=0.1,summary=1"; events not listed are always logged
+LOG_SAMPLE_RATES = {
+    event.strip(): float(rate)
+    for event, rate in (
+        item.split("=", 1)
+        for item in os.getenv("LOG_SAMPLE_RATES", "").split(",")
+        if "=" in item
+    )
+}
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including any structured fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Formatted before queueing, see _QueueHandler
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler whose prepare() keeps the traceback: the stock one drops exc_info, so the JSON formatter
+    never saw it. It is formatted into exc_text here rather than keeping the frames alive in the queue.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+
+def _configure():
+    """Route all logging through a queue so callers never block on file I/O."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        file_handler = logging.FileHandler(LOG_FILE)
+        file_handler.setFormatter(JsonLineFormatter())
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(
+            log_queue, file_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(_listener.stop)
 
 
 def get_logger(name: str = __name__):
     """Get a configured logger instance."""
-    logging.basicConfig(
-        filename="processing_engine.log",
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-    )
+    _configure()
     return logging.getLogger(name)
+
+
+def truncate(text: str, limit: int = None) -> str:
+    limit = LOG_MAX_PAYLOAD if limit is None else limit
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"... [truncated {len(text) - limit} chars]"
+
+
+def log_event(
+    logger: logging.Logger,
+    event: str,
+    message: str = "",
+    level: int = logging.INFO,
+    payload=None,
+    **fields,
+):
+    """
+    Log a structured event. Nothing is built unless the level is enabled and the event is sampled in.
+    `payload` may be a callable so large JSON/text is only produced when it will actually be written.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = LOG_SAMPLE_RATES.get(event, 1.0)
+    if rate < 1.0 and random.random() >= rate:
+        return
+    fields["event"] = event
+    if payload is not None:
+        if callable(payload):
+            payload = payload()
+        if not isinstance(payload, str):
+            payload = json.dumps(payload, default=str)
+        fields["payload"] = truncate(payload)
+    logger.log(level, f"[{event}] {message}", extra={"fields": fields})
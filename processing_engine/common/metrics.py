@@ -0,0 +1,160 @@
+"""
+In-process metrics: latency histograms, counters and gauges with an offline Prometheus text-file exporter
+and a per-run summary table.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Seconds; covers fast cache hits through multi-minute LM calls
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Raw samples kept per histogram series for percentiles in the summary table
+SAMPLE_WINDOW = 2048
+
+
+def _label_key(labels: dict):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + list(extra or [])
+    if not items:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in items)
+    return "{" + inner + "}"
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+
+class Metrics:
+    """Thread-safe registry of histograms, counters and gauges keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall time of the enclosed block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def to_prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    for bound, count in zip(hist.buckets, hist.bucket_counts):
+                        labels = _format_labels(key, [("le", bound)])
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    labels = _format_labels(key, [("le", "+Inf")])
+                    lines.append(f"{name}_bucket{labels} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Atomically write the text exposition (suitable for node_exporter's textfile collector)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def summary_table(self) -> str:
+        """Human-readable per-run table: latency percentiles, then counters and gauges."""
+        rows = [("series", "count", "p50", "p95", "total")]
+        with self._lock:
+            for name, series in sorted(self.histograms.items()):
+                for key, hist in sorted(series.items()):
+                    samples = list(hist.samples)
+                    rows.append(
+                        (
+                            name + _format_labels(key),
+                            str(hist.count),
+                            f"{percentile(samples, 50):.3f}",
+                            f"{percentile(samples, 95):.3f}",
+                            f"{hist.sum:.3f}",
+                        )
+                    )
+            for kind in (self.counters, self.gauges):
+                for name, series in sorted(kind.items()):
+                    for key, value in sorted(series.items()):
+                        rows.append(
+                            (name + _format_labels(key), "", "", "", f"{value:g}")
+                        )
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return "\n".join(
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths))
+            for row in rows
+        )
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -0,0 +1,154 @@
+"""
+Local OCR pre-pass (Tesseract through pytesseract, both optional) run in a process pool.
+
+Each page yields its text, the number of words Tesseract recognised and a confidence in [0, 1]: the mean
+of the per-word confidences weighted by word length, so a clean printed lab report scores high and
+handwriting or a photo of a screen scores low. Callers use `confident(result)` to decide whether the
+text is good enough to replace the image.
+"""
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from processing_engine.common.logger import get_logger
+from processing_engine.common.metrics import metrics
+
+logger = get_logger("common.ocr")
+
+
+def summarize_ocr(data: dict) -> dict:
+    """Text, word count and confidence from pytesseract.image_to_data(..., output_type=Output.DICT)."""
+    lines = {}
+    weighted = total = 0.0
+    for i, word in enumerate(data.get("text", [])):
+        word = (word or "").strip()
+        conf = float(data["conf"][i])
+        # -1 marks layout boxes (blocks, lines) rather than words
+        if not word or conf < 0:
+            continue
+        key = tuple(
+            data[field][i]
+            for field in ("block_num", "par_num", "line_num")
+            if field in data
+        )
+        lines.setdefault(key, []).append(word)
+        weighted += conf * len(word)
+        total += len(word)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    return {
+        "text": text,
+        "words": sum(len(words) for words in lines.values()),
+        "confidence": round(weighted / total / 100.0, 4) if total else 0.0,
+    }
+
+
+def ocr_file(path: str, lang: str = "eng") -> dict:
+    """OCR one image file; runs in the pool's worker processes."""
+    import pytesseract
+    from PIL import Image
+
+    start = time.perf_counter()
+    with Image.open(path) as image:
+        data = pytesseract.image_to_data(
+            image.convert("L"), lang=lang, output_type=pytesseract.Output.DICT
+        )
+    result = summarize_ocr(data)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+class OcrPool:
+    """
+    OCR on `workers` processes. run() returns None (so the caller keeps the vision path) when OCR is
+    unavailable, fails or takes longer than `timeout` seconds. A timed-out page would keep its worker
+    busy, so the pool's processes are killed and a fresh pool is started on the next call; other pages
+    in flight on the old pool fail and fall back to the vision path too.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        min_confidence: float = 0.85,
+        min_words: int = 30,
+        timeout: float = 30.0,
+        lang: str = "eng",
+    ):
+        self.workers = workers
+        self.min_confidence = min_confidence
+        self.min_words = min_words
+        self.timeout = timeout
+        self.lang = lang
+        self._pool = None
+        self._available = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        if self._available is None:
+            try:
+                import pytesseract
+
+                pytesseract.get_tesseract_version()
+                self._available = True
+            except Exception as e:
+                logger.warning(
+                    f"[ocr] OCR pre-pass disabled, Tesseract unavailable: {e}"
+                )
+                self._available = False
+        return self._available
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: the pipeline process is multi-threaded, forking it is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _recycle(self, pool):
+        """Kill the processes of `pool` and forget it, unless another caller already did."""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        # ProcessPoolExecutor cannot cancel a running task; terminating its workers is the only way
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, path: str):
+        if not self.available():
+            return None
+        pool = self._executor()
+        try:
+            result = pool.submit(ocr_file, path, self.lang).result(timeout=self.timeout)
+        except TimeoutError:
+            metrics.inc("ocr_total", status="timeout")
+            logger.error(
+                f"[ocr] OCR of {path} took over {self.timeout}s, restarting the OCR workers"
+            )
+            self._recycle(pool)
+            return None
+        except Exception as e:
+            metrics.inc("ocr_total", status="error")
+            logger.error(f"[ocr] OCR failed for {path}: {e!r}")
+            return None
+        metrics.inc("ocr_total", status="ok")
+        metrics.observe("ocr_seconds", result["seconds"])
+        metrics.observe("ocr_confidence", result["confidence"])
+        return result
+
+    def confident(self, result) -> bool:
+        return bool(
+            result
+            and result["confidence"] >= self.min_confidence
+            and result["words"] >= self.min_words
+        )
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
@@ -0,0 +1,128 @@
+"""
+Registry of use-case plugins.
+
+A use case is declared without importing it, either by a manifest next to its code,
+`processing_engine/usecases/<name>/usecase.json`:
+
+    {"name": "ayurlekha",
+     "description": "...",
+     "module": "processing_engine.usecases.ayurlekha.processor",
+     "requires": ["dspy", "supabase", "mem0"],
+     "hooks": {"poll": "process_patients", "events": "run_event_driven"},
+     "ready_checks": ["supabase"]}
+
+or, for use cases shipped in another package, by an entry point in the `processing_engine.usecases`
+group whose value is the plugin module (`name = "package.module"`); these get the default hooks.
+
+Only load() imports the plugin module, so a worker pays for the dependencies of the use cases it runs
+and no others. Hooks are module-level callables:
+
+    poll(**kwargs)           one pass over the pending work
+    events(**kwargs)         process pushed work until a stop is requested (optional)
+    warm_up(check)           open clients and warm models; check(name, fn) records each step (optional)
+    reload(config)           apply a freshly loaded config dict (optional)
+"""
+
+import glob
+import importlib
+import importlib.util
+import json
+import os
+import threading
+from importlib.metadata import entry_points
+from processing_engine.common.logger import get_logger
+
+logger = get_logger("common.plugins")
+
+USECASES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "usecases")
+MANIFEST_NAME = "usecase.json"
+ENTRY_POINT_GROUP = "processing_engine.usecases"
+DEFAULT_HOOKS = {
+    "poll": "process",
+    "events": "run_event_driven",
+    "warm_up": "warm_up",
+    "reload": "reload",
+}
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def discover(root: str = None) -> dict:
+    """Manifests of every declared use case by name; manifests override entry points of the same name."""
+    manifests = {}
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        manifests[ep.name] = {
+            "name": ep.name,
+            "module": ep.value,
+            "source": f"entry point {ep.value}",
+        }
+    for path in sorted(
+        glob.glob(os.path.join(root or USECASES_DIR, "*", MANIFEST_NAME))
+    ):
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+            name = manifest.get("name") or os.path.basename(os.path.dirname(path))
+            if not manifest.get("module"):
+                raise ValueError("no module")
+        except Exception as e:
+            logger.error(f"[plugins] Ignoring invalid manifest {path}: {e}")
+            continue
+        manifests[name] = dict(manifest, name=name, source=path)
+    for manifest in manifests.values():
+        manifest["hooks"] = dict(DEFAULT_HOOKS, **manifest.get("hooks", {}))
+        manifest.setdefault("requires", [])
+        manifest.setdefault("ready_checks", [])
+        manifest.setdefault("description", "")
+    return manifests
+
+
+def missing_requirements(manifest: dict) -> list:
+    """Top-level modules listed in `requires` that cannot be imported here."""
+    return [
+        name for name in manifest["requires"] if importlib.util.find_spec(name) is None
+    ]
+
+
+class UseCase:
+    """A loaded plugin: its manifest plus the imported module."""
+
+    def __init__(self, manifest: dict, module):
+        self.name = manifest["name"]
+        self.manifest = manifest
+        self.module = module
+
+    def hook(self, name: str):
+        """The callable behind hook `name`, or None if the plugin does not provide it."""
+        attribute = self.manifest["hooks"].get(name)
+        return getattr(self.module, attribute, None) if attribute else None
+
+    def __repr__(self):
+        return f"UseCase({self.name!r}, {self.module.__name__})"
+
+
+def load(name: str, manifests: dict = None) -> UseCase:
+    """Import use case `name` (once per process) and return it."""
+    with _lock:
+        if name in _loaded:
+            return _loaded[name]
+        manifests = manifests or discover()
+        if name not in manifests:
+            raise KeyError(
+                f"Unknown use case {name!r}; available: {', '.join(sorted(manifests)) or 'none'}"
+            )
+        manifest = manifests[name]
+        missing = missing_requirements(manifest)
+        if missing:
+            raise ImportError(
+                f"Use case {name!r} needs modules that are not installed: {', '.join(missing)}"
+            )
+        module = importlib.import_module(manifest["module"])
+        if manifest["hooks"]["poll"] and not hasattr(module, manifest["hooks"]["poll"]):
+            raise AttributeError(
+                f"Use case {name!r}: {manifest['module']} has no {manifest['hooks']['poll']}()"
+            )
+        usecase = _loaded[name] = UseCase(manifest, module)
+    logger.info(f"[plugins] Loaded use case {name} from {manifest['source']}")
+    return usecase
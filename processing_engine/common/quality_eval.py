@@ -0,0 +1,239 @@
+"""
+Sampled background quality evaluation of pipeline outputs with the judge modules.
+
+The pipeline hands outputs to QualityEvaluator.submit(), which returns immediately: a sampled share is
+scored on a small worker pool by accurate_analyser (and compare_with_expected_data when a reference is
+given) and the scores are stored per record in SQLite. When the judges fall behind, new submissions are
+dropped and counted rather than queued, so evaluation never slows the pipeline down.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import dspy
+from processing_engine.common.dspy_modules import (
+    accurate_analyser,
+    compare_with_expected_data,
+)
+from processing_engine.common.logger import get_logger, truncate
+from processing_engine.common.metrics import metrics
+
+logger = get_logger("common.quality_eval")
+
+ANALYSER_FIELDS = (
+    "authenticity",
+    "completeness",
+    "clarity",
+    "uncertainty",
+    "relevance",
+    "attribution",
+    "temporal_ordering",
+    "explainability",
+)
+# Characters of the output/reference sent to the judges
+JUDGE_TEXT_LIMIT = 20000
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_score(value):
+    """First number in a judge's free-text score, scaled to 0-1 if it looks like a 0-10 or 0-100 scale."""
+    match = _NUMBER.search("" if value is None else str(value))
+    if not match:
+        return None
+    score = float(match.group())
+    if score > 10:
+        return score / 100
+    if score > 1:
+        return score / 10
+    return score
+
+
+def as_text(value) -> str:
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+
+def sampled(kind: str, record_id: str, sample_rate: float) -> bool:
+    """Deterministic per-record sampling, so a re-run judges the same records."""
+    if sample_rate <= 0:
+        return False
+    digest = hashlib.sha1(f"{kind}:{record_id}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64 < sample_rate
+
+
+class QualityEvaluator:
+    """Background judge pool writing one row per (kind, record_id) to a SQLite table."""
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float = 0.05,
+        workers: int = 2,
+        max_pending: int = 100,
+        judge_lm=None,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.judge_lm = judge_lm
+        self.dropped = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="quality-eval"
+        )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS quality_scores (
+                kind TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                patient_id TEXT,
+                quality REAL,
+                analyser REAL,
+                scores TEXT,
+                feedback TEXT,
+                judge_seconds REAL,
+                judged_at TEXT NOT NULL,
+                PRIMARY KEY (kind, record_id)
+            )
+            """)
+        self._conn.commit()
+
+    def submit(self, kind: str, record_id, output, reference=None, patient_id=None):
+        """
+        Queue `output` (a per-document analysis, a summary, ...) for judging if it is sampled.
+        `reference` is what the output should agree with, e.g. the analyses a summary was built from.
+        Returns True if the output was queued.
+        """
+        if output is None or not sampled(kind, str(record_id), self.sample_rate):
+            return False
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                metrics.inc("quality_eval_total", kind=kind, status="dropped")
+                return False
+            # Copied in the caller so dspy.context settings reach the worker
+            future = self._pool.submit(
+                contextvars.copy_context().run,
+                self._judge,
+                kind,
+                str(record_id),
+                output,
+                reference,
+                patient_id,
+            )
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return True
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _judge(self, kind, record_id, output, reference, patient_id):
+        output = as_text(output)[:JUDGE_TEXT_LIMIT]
+        start = time.perf_counter()
+        try:
+            with dspy.context(lm=self.judge_lm or dspy.settings.lm):
+                analysis = accurate_analyser()(data=output)
+                scores = {
+                    field: parse_score(getattr(analysis, field, None))
+                    for field in ANALYSER_FIELDS
+                }
+                quality, feedback = None, None
+                if reference is not None:
+                    # The raw answer: forward() turns "8/10" into 0.0 before it can be rescaled
+                    comparison = compare_with_expected_data().predictor(
+                        existing_data=as_text(reference)[:JUDGE_TEXT_LIMIT],
+                        new_data=output,
+                    )
+                    quality = parse_score(getattr(comparison, "quality", None))
+                    feedback = comparison.feedback
+            seconds = time.perf_counter() - start
+            metrics.observe("quality_eval_seconds", seconds, kind=kind)
+            known = [v for v in scores.values() if v is not None]
+            analyser_mean = sum(known) / len(known) if known else None
+            self._store(
+                kind,
+                record_id,
+                patient_id,
+                quality,
+                analyser_mean,
+                scores,
+                feedback,
+                seconds,
+            )
+            if analyser_mean is not None:
+                metrics.observe("quality_analyser_score", analyser_mean, kind=kind)
+            if quality is not None:
+                metrics.observe("quality_score", quality, kind=kind)
+            metrics.inc("quality_eval_total", kind=kind, status="ok")
+        except Exception as e:
+            metrics.inc("quality_eval_total", kind=kind, status="error")
+            logger.error(f"[quality] Failed to judge {kind} {record_id}: {e}")
+
+    def _store(
+        self,
+        kind,
+        record_id,
+        patient_id,
+        quality,
+        analyser,
+        scores,
+        feedback,
+        seconds,
+    ):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO quality_scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    record_id,
+                    patient_id,
+                    quality,
+                    analyser,
+                    json.dumps(scores),
+                    truncate(feedback, 2000) if feedback else feedback,
+                    seconds,
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+            self._conn.commit()
+
+    def flush(self, timeout: float = None):
+        """Wait for judgments already queued (end of a run); new submissions are still accepted."""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+    def scores(self, kind: str = None, record_id: str = None):
+        """Stored rows, optionally for one kind and/or record."""
+        where, params = [], []
+        if kind is not None:
+            where.append("kind = ?")
+            params.append(kind)
+        if record_id is not None:
+            where.append("record_id = ?")
+            params.append(str(record_id))
+        sql = "SELECT * FROM quality_scores"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY judged_at", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self._conn.close()
@@ -0,0 +1,36 @@
+"""
+Hash-based sharding helpers so several nodes can split one backlog without a shared queue.
+"""
+
+import hashlib
+
+
+def parse_shard(spec: str):
+    """
+    Parse a shard spec of the form "i/N" into (index, count).
+    Index is 0-based so it lines up with SKYPILOT_NODE_RANK.
+    """
+    try:
+        index_str, count_str = spec.split("/", 1)
+        index, count = int(index_str), int(count_str)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Malformed shard spec (expected 'i/N'): {spec}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index out of range: {spec}")
+    return index, count
+
+
+def shard_for(key: str, count: int) -> int:
+    """Return the shard a key belongs to. Stable across processes and machines."""
+    digest = hashlib.sha1(str(key).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def in_shard(key: str, index: int, count: int) -> bool:
+    """True if the key is owned by shard `index` of `count`."""
+    return count <= 1 or shard_for(key, count) == index
+
+
+def filter_shard(rows, index: int, count: int, key: str = "id"):
+    """Keep only the rows whose `key` hashes to the given shard."""
+    return [row for row in rows if in_shard(row[key], index, count)]
@@ -3,29 +3,136 @@ Supabase I/O utilities: connect, download, upload, update job status.
 """
 
 import os
-from supabase import create_client, Client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+supabase = None
+_client_lock = threading.Lock()
+# If set, every in-memory upload is also written under this directory (debugging only)
+UPLOAD_DEBUG_DIR = os.getenv("UPLOAD_DEBUG_DIR")
+UPLOAD_MAX_WORKERS = int(os.getenv("UPLOAD_MAX_WORKERS", "8"))
+
+
+def get_client():
+    """Return the shared Supabase client, creating it on first use."""
+    global supabase
+    with _client_lock:
+        if supabase is None:
+            from supabase import create_client
+
+            supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+    return supabase
+
+
+def set_client(client):
+    """Replace the shared client (e.g. with a local stand-in for benchmarks)."""
+    global supabase
+    with _client_lock:
+        supabase = client
 
 
 def download_file_from_supabase(bucket: str, remote_path: str, local_path: str):
     """Download a file from Supabase Storage to local."""
-    response = supabase.storage.from_(bucket).download(remote_path)
+    response = get_client().storage.from_(bucket).download(remote_path)
     with open(local_path, "wb") as f:
         f.write(response)
 
 
-def upload_file_to_supabase(bucket: str, remote_path: str, local_path: str):
-    """Upload a file to Supabase Storage."""
+def download_bytes_from_supabase(bucket: str, remote_path: str) -> bytes:
+    """Download a file from Supabase Storage into memory."""
+    return get_client().storage.from_(bucket).download(remote_path)
+
+
+def upload_file_to_supabase(
+    bucket: str, remote_path: str, local_path: str, upsert: bool = False
+):
+    """Upload a file to Supabase Storage. With `upsert`, an existing object is overwritten."""
+    file_options = {"upsert": "true"} if upsert else None
     with open(local_path, "rb") as f:
-        supabase.storage.from_(bucket).upload(remote_path, f)
+        get_client().storage.from_(bucket).upload(
+            remote_path, f, file_options=file_options
+        )
+
+
+def _to_bytes(data):
+    """Return (bytes, content_type) for bytes, str, or JSON-serializable data."""
+    if isinstance(data, bytes):
+        return data, "application/octet-stream"
+    if isinstance(data, str):
+        return data.encode("utf-8"), "text/plain; charset=utf-8"
+    return json.dumps(data, indent=2).encode("utf-8"), "application/json"
+
+
+def upload_bytes_to_supabase(
+    bucket: str,
+    remote_path: str,
+    data,
+    upsert: bool = False,
+    content_type: str = None,
+    cache_control: int = None,
+):
+    """
+    Upload bytes, text, or a JSON-serializable object to Supabase Storage without touching local disk.
+    `cache_control` is the max-age in seconds the object is served with (Storage defaults to an hour).
+    """
+    payload, default_content_type = _to_bytes(data)
+    file_options = {"content-type": content_type or default_content_type}
+    if upsert:
+        file_options["upsert"] = "true"
+    if cache_control is not None:
+        file_options["cache-control"] = str(cache_control)
+    if UPLOAD_DEBUG_DIR:
+        debug_path = os.path.join(UPLOAD_DEBUG_DIR, bucket, remote_path)
+        os.makedirs(os.path.dirname(debug_path), exist_ok=True)
+        with open(debug_path, "wb") as f:
+            f.write(payload)
+    get_client().storage.from_(bucket).upload(
+        remote_path, payload, file_options=file_options
+    )
+
+
+def upload_many_to_supabase(uploads, upsert: bool = False, max_workers: int = None):
+    """
+    Upload many in-memory objects in parallel with a bounded thread pool.
+    `uploads` is a list of dicts with bucket, remote_path and data (bytes, str, or JSON-serializable),
+    optionally upsert, content_type and cache_control.
+    Returns one result dict per upload, in order: bucket, remote_path, ok, error.
+    """
+
+    def _upload(item):
+        result = {
+            "bucket": item["bucket"],
+            "remote_path": item["remote_path"],
+            "ok": True,
+            "error": None,
+        }
+        try:
+            upload_bytes_to_supabase(
+                item["bucket"],
+                item["remote_path"],
+                item["data"],
+                upsert=item.get("upsert", upsert),
+                content_type=item.get("content_type"),
+                cache_control=item.get("cache_control"),
+            )
+        except Exception as e:
+            result["ok"] = False
+            result["error"] = str(e)
+        return result
+
+    if not uploads:
+        return []
+    workers = min(max_workers or UPLOAD_MAX_WORKERS, len(uploads))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_upload, uploads))
 
 
 def update_job_status(table: str, job_id: str, status: str):
     """Update job status in Supabase DB."""
-    supabase.table(table).update({"status": status}).eq("id", job_id).execute()
+    get_client().table(table).update({"status": status}).eq("id", job_id).execute()
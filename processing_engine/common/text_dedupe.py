@@ -0,0 +1,263 @@
+"""
+Fact-level deduplication of a patient's document analyses before they are stored as memories and packed
+into a summary prompt.
+
+Analyses are split into sentences/lines ("facts"); a list item keeps its nested attribute lines
+("1. Metformin" with "- Frequency: ..." under it) as one fact, so an item is only dropped as a whole. Exact repeats are caught by hashing the normalized
+text; near repeats (reworded demographics headers, the same medication with different punctuation) by
+MinHash over word shingles with LSH banding. Near repeats must also carry the same numbers, so
+"Amlodipine 5mg" and "Amlodipine 10mg" or two readings on different dates are never merged, and near
+repeats of list items must name the same thing on their first line, so two drugs with the same
+schedule are never merged either.
+Every kept fact remembers which records it came from.
+"""
+
+import hashlib
+import re
+
+# Mersenne prime for the universal hash family used to simulate MinHash permutations
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Abbreviations that end in a period but do not end a sentence
+_ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "no", "vs", "e.g", "i.e", "approx", "st"}
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(])")
+_MARKUP = re.compile(r"^\s*(?:[>#*\-•]+|\d+[.)])\s*|[*_`]+")
+_NON_WORD = re.compile(r"[^\w\s/.%]+")
+_NUMBER = re.compile(r"\d+(?:[./]\d+)*")
+_NUMBERED_ITEM = re.compile(r"^\d+[.)]\s")
+_BULLET_ITEM = re.compile(r"^[\-*•]\s")
+_LIST_MARKER = re.compile(r"^(?:\d+[.)]|[\-*•])$")
+
+
+def _sentences(line: str):
+    parts = _SENTENCE_END.split(line)
+    merged = [parts[0]]
+    for part in parts[1:]:
+        last_word = merged[-1].rsplit(None, 1)[-1].rstrip(".").lower()
+        # "1. Amlodipine" is a list marker, not a sentence ending in "1."
+        if last_word in _ABBREVIATIONS or _LIST_MARKER.match(merged[-1].strip()):
+            merged[-1] += " " + part
+        else:
+            merged.append(part)
+    return [part.strip() for part in merged if part.strip()]
+
+
+def split_facts(text: str):
+    """
+    Split an analysis into facts. A list item ("1. ..." or "- ...") is one fact together with the lines
+    nested under it: lines indented deeper, and bullets directly under a numbered item. Other lines are
+    split into sentences.
+    """
+    facts = []
+    item = None  # (indent, numbered) of the list item the last fact is
+    for raw in (text or "").splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        indent = len(raw) - len(raw.lstrip())
+        numbered = bool(_NUMBERED_ITEM.match(line))
+        if item is not None and not is_heading(line):
+            item_indent, item_numbered = item
+            if indent > item_indent or (
+                item_numbered and indent == item_indent and _BULLET_ITEM.match(line)
+            ):
+                facts[-1] += "\n" + line
+                continue
+        if is_heading(line):
+            item = None
+            facts.append(line)
+        elif numbered or _BULLET_ITEM.match(line):
+            item = (indent, numbered)
+            facts.append(line)
+        else:
+            item = None
+            facts.extend(_sentences(line))
+    return facts
+
+
+def _item_head(fact: str):
+    """Normalized first line of a multi-line list item, without spaces; None for a single line."""
+    first, _, rest = fact.partition("\n")
+    return normalize_fact(first).replace(" ", "") if rest else None
+
+
+def normalize_fact(text: str) -> str:
+    """Lowercase, drop list/markdown markup and punctuation, collapse whitespace."""
+    text = _MARKUP.sub("", text.lower())
+    text = _NON_WORD.sub(" ", text)
+    return " ".join(text.replace(". ", " ").rstrip(".").split())
+
+
+def is_heading(text: str) -> bool:
+    """Section headings ("**Medications:**", "## Labs") carry no fact of their own."""
+    stripped = text.strip()
+    return stripped.startswith("#") or (
+        stripped.rstrip("*_ ").endswith(":") and len(stripped.split()) <= 4
+    )
+
+
+def shingles(normalized: str, k: int = 3):
+    words = normalized.split()
+    if len(words) <= k:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + k]) for i in range(len(words) - k + 1)}
+
+
+class MinHasher:
+    """MinHash signatures of `num_perm` values using seeded universal hashes of each shingle."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        params = hashlib.sha256(f"minhash-{seed}".encode()).digest()
+        coefficients = []
+        while len(coefficients) < 2 * num_perm:
+            params = hashlib.sha256(params).digest()
+            coefficients.extend(
+                int.from_bytes(params[i : i + 8], "big") % _PRIME
+                for i in (0, 8, 16, 24)
+            )
+        self._a = [c or 1 for c in coefficients[:num_perm]]
+        self._b = coefficients[num_perm : 2 * num_perm]
+
+    def signature(self, shingle_set):
+        values = [
+            int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+            for s in shingle_set
+        ]
+        return tuple(
+            min(((a * v + b) % _PRIME) & _MAX_HASH for v in values)
+            for a, b in zip(self._a, self._b)
+        )
+
+
+def estimated_jaccard(sig_a, sig_b) -> float:
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+class FactDeduper:
+    """
+    Accumulates facts from several sources, keeping the first wording of each and the list of sources
+    it appeared in. `threshold` is the estimated Jaccard similarity above which two facts are the same.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.facts = []  # {"text", "sources"} in first-seen order
+        self.total = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+        self._by_hash = {}
+        self._signatures = []
+        self._numbers = []
+        self._heads = []
+        self._buckets = {}
+
+    def add(self, text: str, source: str):
+        """Add one fact; returns its index in `facts` (an existing index if it is a duplicate)."""
+        self.total += 1
+        normalized = normalize_fact(text)
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        index = self._by_hash.get(digest)
+        if index is not None:
+            self.exact_duplicates += 1
+        else:
+            signature = self.hasher.signature(shingles(normalized, self.shingle_size))
+            numbers = frozenset(_NUMBER.findall(normalized))
+            head = _item_head(text)
+            index = self._find_similar(signature, numbers, head)
+            if index is not None:
+                self.near_duplicates += 1
+            else:
+                index = len(self.facts)
+                self.facts.append({"text": text, "sources": []})
+                self._signatures.append(signature)
+                self._numbers.append(numbers)
+                self._heads.append(head)
+                for band in range(self.bands):
+                    key = (band, signature[band * self.rows : (band + 1) * self.rows])
+                    self._buckets.setdefault(key, []).append(index)
+            self._by_hash[digest] = index
+        if source not in self.facts[index]["sources"]:
+            self.facts[index]["sources"].append(source)
+        return index
+
+    def add_text(self, text: str, source: str):
+        """
+        Add every fact of an analysis. Returns its new content in order: indexes of facts first seen
+        here, each preceded by its section heading (a string) when the heading has not been emitted yet.
+        """
+        lines = []
+        pending_heading = None
+        for fact in split_facts(text):
+            if is_heading(fact):
+                pending_heading = fact
+                continue
+            seen_before = len(self.facts)
+            index = self.add(fact, source)
+            if index < seen_before:
+                continue
+            if pending_heading is not None:
+                lines.append(pending_heading)
+                pending_heading = None
+            lines.append(index)
+        return lines
+
+    def novel_text(self, text: str, source: str) -> str:
+        """add_text() rendered as text: only what this analysis adds to the ones before it."""
+        return "\n".join(
+            line if isinstance(line, str) else self.facts[line]["text"]
+            for line in self.add_text(text, source)
+        )
+
+    def _find_similar(self, signature, numbers, head):
+        candidates = set()
+        for band in range(self.bands):
+            key = (band, signature[band * self.rows : (band + 1) * self.rows])
+            candidates.update(self._buckets.get(key, ()))
+        best, best_score = None, self.threshold
+        for index in sorted(candidates):
+            if self._numbers[index] != numbers or self._heads[index] != head:
+                continue
+            score = estimated_jaccard(signature, self._signatures[index])
+            if score >= best_score:
+                best, best_score = index, score
+        return best
+
+
+def dedupe_analyses(analyses, threshold: float = 0.8):
+    """
+    Deduplicate facts across `analyses`, a list of (source_id, text) pairs in document order.
+    Returns (text, deduper): the text keeps one section per source with only the facts first seen
+    there, annotated with how many records repeat them; the deduper holds full provenance.
+    """
+    deduper = FactDeduper(threshold=threshold)
+    sections = []
+    for source, text in analyses:
+        lines = deduper.add_text(text, source)
+        if lines:
+            sections.append((source, lines))
+
+    rendered = []
+    for source, lines in sections:
+        rendered.append(f"--- Analysis from record {source} ---")
+        for line in lines:
+            if isinstance(line, str):
+                rendered.append(line)
+                continue
+            fact = deduper.facts[line]
+            count = len(fact["sources"])
+            suffix = f" (in {count} records)" if count > 1 else ""
+            rendered.append(fact["text"] + suffix)
+    return "\n".join(rendered), deduper
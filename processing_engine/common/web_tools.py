@@ -1,11 +1,13 @@
 import asyncio
 import random
 from ddgs import DDGS
+from processing_engine.common.metrics import metrics
 
 
 def search_web(query: str) -> str:
     """Search the web for the query using DuckDuckGo (ddgs). Returns the results as a string."""
-    results = DDGS().text(query, max_results=5, region="in-en")
+    with metrics.timer("web_search_seconds"):
+        results = DDGS().text(query, max_results=5, region="in-en")
     return str(results)
 
 
@@ -16,6 +18,7 @@ async def search_web_async(query: str, max_retries: int = 3) -> str:
             result = await loop.run_in_executor(None, search_web, query)
             return result
         except Exception as e:
+            metrics.inc("web_search_errors_total")
             if attempt < max_retries - 1:
                 wait_time = (2**attempt) + random.uniform(0, 1)
                 await asyncio.sleep(wait_time)
@@ -1,5 +1,230 @@
-def main():
-    print("Hello from processing-engine!")
+"""
+Long-running processing worker.
+
+    python -m processing_engine.main [--usecase ayurlekha[,other]] [--trigger poll|events] [--interval 60] [--port 8080]
+    python -m processing_engine.main --list
+
+Use cases are plugins found through the registry in common/plugins.py; only the selected ones are
+imported, so a worker pulls in the dependencies of what it runs and nothing else. Several use cases can
+share one process, each on its own thread.
+
+Unlike a per-run job, the worker imports each plugin once and keeps its clients and models open between
+batches. At start each plugin's warm_up hook opens clients and warms its LMs, so the first real batch
+does not pay connection setup or local model load. Work is pulled continuously: a poll cycle every
+`--interval` seconds, or pushed work with `--trigger events`.
+
+/healthz, /readyz and /metrics are served on `--port` (see common/health.py). SIGHUP reloads .env and
+calls each plugin's reload hook without dropping in-flight work (what a plugin does not apply there,
+e.g. ayurlekha's store paths and worker counts, needs a restart); SIGTERM/SIGINT drain and exit.
+"""
+
+import argparse
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from processing_engine.common import plugins
+from processing_engine.common.checkpoint import (
+    install_stop_handlers,
+    stop_requested,
+    wait_for_stop,
+)
+from processing_engine.common.config import load_config
+from processing_engine.common.health import HealthServer
+from processing_engine.common.logger import get_logger
+from processing_engine.common.metrics import metrics
+
+logger = get_logger("main")
+
+config = load_config()
+
+
+class Worker:
+    """Warm use-case plugins plus the poll/event loops that feed them."""
+
+    def __init__(self, usecases, trigger: str = "poll", interval: float = 60.0):
+        self.names = list(usecases)
+        self.trigger = trigger
+        self.interval = interval
+        self.state = "starting"
+        self.usecases = {}
+        self.clients = {}
+        self.checks = {}
+        self.cycles = {name: 0 for name in self.names}
+        self.last_cycle_at = {}
+        self.last_error = {}
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._reload = threading.Event()
+
+    def status(self) -> dict:
+        required = [
+            f"{name}:{check}"
+            for name, usecase in self.usecases.items()
+            for check in usecase.manifest["ready_checks"]
+        ]
+        ready = (
+            self.state in ("idle", "processing")
+            and len(self.usecases) == len(self.names)
+            and all(self.checks.get(name, {}).get("ok") for name in required)
+        )
+        return {
+            "ready": ready,
+            "state": self.state,
+            "trigger": self.trigger,
+            "usecases": self.names,
+            "checks": self.checks,
+            "cycles": self.cycles,
+            "last_cycle_at": self.last_cycle_at,
+            "last_error": self.last_error,
+            "started_at": self.started_at,
+        }
+
+    def _check(self, name: str, fn):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = fn()
+            self.checks[name] = {"ok": True}
+        except Exception as e:
+            self.checks[name] = {"ok": False, "error": str(e)}
+            logger.error(f"[worker] Warm-up of {name} failed: {e}")
+        seconds = time.perf_counter() - start
+        self.checks[name]["seconds"] = round(seconds, 3)
+        metrics.observe("worker_warmup_seconds", seconds, component=name)
+        return result
+
+    def warm_up(self, usecase):
+        hook = usecase.hook("warm_up")
+        if hook is not None:
+            prefix = usecase.name
+            client = hook(lambda name, fn: self._check(f"{prefix}:{name}", fn))
+            if client is not None:
+                self.clients[usecase.name] = client
+
+    def start(self):
+        """Import the selected use cases and warm each of them."""
+        manifests = plugins.discover()
+        for name in self.names:
+            usecase = self._check(
+                f"{name}:import", lambda: plugins.load(name, manifests)
+            )
+            if usecase is None:
+                raise RuntimeError(self.checks[f"{name}:import"]["error"])
+            self.usecases[name] = usecase
+            self.warm_up(usecase)
+        self.state = "idle"
+        logger.info(f"[worker] Ready: {self.checks}")
+
+    def reload(self):
+        """Re-read .env and hand the new config to every plugin's reload hook, then warm them again."""
+        previous, self.state = self.state, "reloading"
+        logger.info("[worker] Reloading configuration")
+        load_dotenv(override=True)
+        fresh = load_config()
+        config.update(fresh)
+        for usecase in self.usecases.values():
+            hook = usecase.hook("reload")
+            if hook is not None:
+                hook(fresh)
+            self.warm_up(usecase)
+        self.state = previous if previous != "reloading" else "idle"
+        metrics.inc("worker_reloads_total")
+
+    def _reload_loop(self):
+        while not stop_requested():
+            if self._reload.wait(1.0):
+                self._reload.clear()
+                try:
+                    self.reload()
+                except Exception as e:
+                    self.last_error["reload"] = str(e)
+                    logger.error(f"[worker] Reload failed: {e}")
+
+    def request_reload(self, *args):
+        self._reload.set()
+
+    def _kwargs(self, name: str) -> dict:
+        client = self.clients.get(name)
+        return {} if client is None else {"supabase": client}
+
+    def _run_events(self, usecase):
+        hook = usecase.hook("events")
+        if hook is None:
+            raise RuntimeError(f"Use case {usecase.name} has no event trigger")
+        hook(**self._kwargs(usecase.name))
+
+    def _run_polls(self, usecase):
+        poll = usecase.hook("poll")
+        while not stop_requested():
+            try:
+                with metrics.timer("worker_cycle_seconds", usecase=usecase.name):
+                    poll(**self._kwargs(usecase.name))
+                self.last_error.pop(usecase.name, None)
+            except Exception as e:
+                self.last_error[usecase.name] = str(e)
+                logger.error(f"[worker] {usecase.name} cycle failed: {e}")
+            self.cycles[usecase.name] += 1
+            self.last_cycle_at[usecase.name] = datetime.now(timezone.utc).isoformat()
+            wait_for_stop(self.interval)
+
+    def run(self):
+        threading.Thread(
+            target=self._reload_loop, name="worker-reload", daemon=True
+        ).start()
+        target = self._run_events if self.trigger == "events" else self._run_polls
+        threads = [
+            threading.Thread(target=target, args=(usecase,), name=f"usecase-{name}")
+            for name, usecase in self.usecases.items()
+        ]
+        self.state = "processing"
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Processing engine worker")
+    parser.add_argument(
+        "--usecase",
+        default=config["WORKER_USECASES"],
+        help="Comma-separated use cases to run in this process",
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="List the declared use cases and exit"
+    )
+    parser.add_argument(
+        "--trigger", choices=("poll", "events"), default=config["TRIGGER_MODE"]
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=config["WORKER_POLL_INTERVAL"],
+        help="Seconds between poll cycles",
+    )
+    parser.add_argument("--port", type=int, default=config["HEALTH_PORT"])
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, manifest in sorted(plugins.discover().items()):
+            missing = plugins.missing_requirements(manifest)
+            note = f" (missing: {', '.join(missing)})" if missing else ""
+            print(f"{name}: {manifest['description']}{note}")
+        return
+
+    install_stop_handlers()
+    usecases = [name.strip() for name in args.usecase.split(",") if name.strip()]
+    worker = Worker(usecases, trigger=args.trigger, interval=args.interval)
+    signal.signal(signal.SIGHUP, worker.request_reload)
+    health = HealthServer(worker.status, port=args.port).start()
+    try:
+        worker.start()
+        worker.run()
+    finally:
+        worker.state = "stopped"
+        health.stop()
+        logger.info(f"[worker] Stopped after {worker.cycles} cycles")
 
 
 if __name__ == "__main__":
@@ -1,30 +1,241 @@
+import importlib
+import json
 import pytest
+from contextlib import nullcontext
+from types import SimpleNamespace
 from unittest.mock import MagicMock
-from processing_engine.usecases.ayurlekha import processor
+from processing_engine.benchmarks.fakes import FakeMemory
+from processing_engine.common.checkpoint import CheckpointJournal
 
 
-def test_pipeline_handles_no_patients(monkeypatch):
-    # Mock supabase client
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    # Keep the journal, cache, metrics and traces the pipeline writes inside tmp_path
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("processing_engine.usecases.ayurlekha.processor")
+
+
+def _mock_supabase(patients, records):
     mock_supabase = MagicMock()
-    mock_supabase.table.return_value.select.return_value.execute.return_value.data = []
+    tables = {"patients": MagicMock(), "medical_records": MagicMock()}
+    tables["patients"].select.return_value.execute.return_value.data = patients
+    records_query = tables["medical_records"].select.return_value
+    # One query for every pending record: .select("*").eq("processed", False)
+    records_query.eq.return_value.execute.return_value.data = records
+    mock_supabase.table.side_effect = lambda name: tables[name]
+    return mock_supabase
+
+
+def test_pipeline_handles_no_patients(processor):
+    mock_supabase = _mock_supabase(patients=[], records=[])
     # Should not raise
-    processor.process_patients_and_generate_per_doc_analysis(mock_supabase)
+    progress = processor.process_patients(supabase=mock_supabase)
+    assert progress == {"done": 0, "records": 0}
 
 
-def test_pipeline_handles_no_records(monkeypatch):
-    # Mock supabase client
-    mock_supabase = MagicMock()
+def test_pipeline_handles_no_records(processor):
     # One patient, but no records
-    mock_supabase.table.return_value.select.return_value.execute.return_value.data = [
-        {"id": "p1", "user_id": "u1"}
+    mock_supabase = _mock_supabase(patients=[{"id": "p1", "user_id": "u1"}], records=[])
+    # Should not raise
+    progress = processor.process_patients(supabase=mock_supabase)
+    assert progress == {"done": 1, "records": 0}
+
+
+def test_pending_records_are_scheduled_per_patient(processor, monkeypatch):
+    records = [
+        {"id": "r1", "patient_id": "p1", "file_url": "x", "created_at": "2025-01-02"},
+        {"id": "r2", "patient_id": "p1", "file_url": "y", "created_at": "2025-01-03"},
+        {"id": "r3", "patient_id": "p9", "file_url": "z", "created_at": "2025-01-04"},
     ]
+    mock_supabase = _mock_supabase(
+        patients=[{"id": "p1", "user_id": "u1"}, {"id": "p2", "user_id": "u2"}],
+        records=records,
+    )
+    processed = []
 
-    def select_side_effect(*args, **kwargs):
-        class Result:
-            data = []
+    def process_patient(supabase, patient, journal, records=None):
+        processed.append((patient["id"], [rec["id"] for rec in records]))
+        return len(records)
 
-        return Result()
+    monkeypatch.setattr(processor, "entity_store", MagicMock())
+    monkeypatch.setattr(processor, "process_patient", process_patient)
+    progress = processor.process_patients(supabase=mock_supabase, patient_workers=1)
+    # p2 has nothing pending and p9 is not a known patient
+    assert processed == [("p1", ["r1", "r2"])]
+    assert progress == {"done": 2, "records": 2}
+    mock_supabase.table("medical_records").select.return_value.eq.assert_called_with(
+        "processed", False
+    )
 
-    mock_supabase.table.return_value.select.side_effect = select_side_effect
-    # Should not raise
-    processor.process_patients_and_generate_per_doc_analysis(mock_supabase)
+
+def test_non_medical_records_are_marked_processed_without_a_summary(
+    processor, tmp_path, monkeypatch
+):
+    document = tmp_path / "selfie.jpg"
+    document.write_bytes(b"not really a photo")
+    summaries = []
+    monkeypatch.setitem(processor.config, "DUPLICATE_DETECTION", False)
+    monkeypatch.setattr(processor, "entity_store", MagicMock())
+    monkeypatch.setattr(
+        processor, "fetch_document", lambda bucket, path: nullcontext(str(document))
+    )
+    monkeypatch.setattr(
+        processor, "check_non_medical", lambda *args: "colourful photo without a page"
+    )
+    monkeypatch.setattr(
+        processor,
+        "generate_and_upload_summary",
+        lambda *args: summaries.append(args) or ("summary.json", True),
+    )
+    monkeypatch.setattr(
+        processor,
+        "upload_many_to_supabase",
+        lambda uploads, upsert: [
+            {"ok": True, "remote_path": u["remote_path"], "error": None}
+            for u in uploads
+        ],
+    )
+    journal = CheckpointJournal(str(tmp_path / "journal.sqlite"))
+    supabase = MagicMock()
+    record = {
+        "id": "r1",
+        "file_url": "https://x.supabase.co/storage/v1/object/public/docs/u1/p1/selfie.jpg",
+    }
+
+    done = processor.process_patient(
+        supabase, {"id": "p1", "user_id": "u1"}, journal, records=[record]
+    )
+
+    assert done == 0 and summaries == []
+    supabase.table.return_value.update.assert_called_once_with({"processed": True})
+    supabase.table.return_value.update.return_value.eq.assert_called_once_with(
+        "id", "r1"
+    )
+    metadata = json.loads(journal.get("r1", "metadata"))
+    assert metadata["is_medical_document"] is False
+    assert journal.is_done("r1", "upload")
+
+
+def test_memories_and_summary_context_carry_each_fact_once(
+    processor, tmp_path, monkeypatch
+):
+    from processing_engine.usecases.ayurlekha import modules
+
+    header = "Patient: Ravi Kumar, 54 years, male.\nKnown hypertensive since 2015."
+    journal = CheckpointJournal(str(tmp_path / "journal.sqlite"))
+    for record_id, medication in (("r1", "Amlodipine 5mg"), ("r2", "Metformin 500mg")):
+        journal.mark(record_id, "analysis", f"{header}\n{medication} once daily")
+        journal.mark(record_id, "metadata", json.dumps({"category": "Prescription"}))
+        journal.mark(record_id, "upload")
+    memory = FakeMemory()
+    memory.add("Allergic to penicillin", user_id="p1", metadata={"record_id": "r0"})
+    contexts = []
+
+    class Summary:
+        compiled = True
+
+        def __call__(self, medical_history, patient_id, user_id):
+            contexts.append(medical_history)
+            return SimpleNamespace()
+
+    monkeypatch.setattr(processor, "mem0_memory", memory)
+    monkeypatch.setattr(processor, "entity_store", MagicMock())
+    monkeypatch.setattr(processor, "quality_evaluator", MagicMock())
+    monkeypatch.setattr(processor, "publish_summary", lambda *args: ("s.json", True))
+    monkeypatch.setattr(modules, "PatientDemographics", Summary)
+    monkeypatch.setattr(modules, "SectionalPatientDemographics", Summary)
+    records = [
+        {
+            "id": record_id,
+            "file_url": f"https://x.co/object/public/docs/{record_id}.jpg",
+        }
+        for record_id in ("r1", "r2")
+    ]
+
+    done = processor.process_patient(
+        MagicMock(), {"id": "p1", "user_id": "u1"}, journal, records=records
+    )
+
+    assert done == 2
+    stored = [m["memory"] for m in memory.memories["p1"]]
+    # The second record only adds its medication
+    assert stored[1] == f"{header}\nAmlodipine 5mg once daily"
+    assert stored[2] == "Metformin 500mg once daily"
+    (context,) = contexts
+    assert context.count("Ravi Kumar") == 1 and context.count("Metformin") == 1
+    assert "Allergic to penicillin" in context
+
+
+def test_failed_summary_section_leaves_records_pending(
+    processor, tmp_path, monkeypatch
+):
+    import dspy
+    from processing_engine.benchmarks.fakes import FakeLM
+    from processing_engine.usecases.ayurlekha import modules
+
+    journal = CheckpointJournal(str(tmp_path / "journal.sqlite"))
+    journal.mark("r1", "analysis", "Tab Amlodipine 5mg once daily")
+    journal.mark("r1", "metadata", json.dumps({"category": "Prescription"}))
+    journal.mark("r1", "upload")
+
+    class BrokenSections(modules.SectionalPatientDemographics):
+        def __init__(self):
+            super().__init__()
+            medications = next(s for s in self.sections if s.name == "medications")
+            medications.forward = lambda medical_history: 1 / 0
+
+    published = []
+    monkeypatch.setitem(processor.config, "SUMMARY_MODE", "sections")
+    monkeypatch.setattr(processor, "mem0_memory", FakeMemory())
+    monkeypatch.setattr(processor, "entity_store", MagicMock())
+    monkeypatch.setattr(processor, "quality_evaluator", MagicMock())
+    monkeypatch.setattr(
+        processor, "publish_summary", lambda *args: published.append(args)
+    )
+    monkeypatch.setattr(modules, "SectionalPatientDemographics", BrokenSections)
+    supabase = MagicMock()
+
+    with dspy.context(lm=FakeLM()):
+        processor.process_patient(
+            supabase,
+            {"id": "p1", "user_id": "u1"},
+            journal,
+            records=[
+                {"id": "r1", "file_url": "https://x.co/object/public/docs/r1.jpg"}
+            ],
+        )
+
+    assert published == []
+    supabase.table.return_value.update.assert_not_called()
+
+
+def test_reload_applies_sampling_and_cache_settings(processor, monkeypatch):
+    for name in ("quality_evaluator", "lm_trace_callback", "document_cache"):
+        monkeypatch.setattr(processor, name, MagicMock())
+    fresh = dict(processor.config)
+    fresh.update(
+        QUALITY_EVAL_SAMPLE_RATE=0.5, LM_TRACE_SAMPLE_RATE=1.0, CACHE_MAX_BYTES=1024
+    )
+    for key in fresh:
+        monkeypatch.setitem(processor.config, key, processor.config[key])
+
+    processor.reload(fresh)
+
+    assert processor.quality_evaluator.sample_rate == 0.5
+    assert processor.lm_trace_callback.sample_rate == 1.0
+    processor.document_cache.resize.assert_called_once_with(1024)
+
+
+def test_each_poll_cycle_closes_its_journal(processor, monkeypatch):
+    journals = []
+
+    def open_journal(*args):
+        journals.append(MagicMock())
+        return journals[-1]
+
+    monkeypatch.setattr(processor, "open_checkpoint_journal", open_journal)
+    supabase = _mock_supabase(patients=[{"id": "p1", "user_id": "u1"}], records=[])
+    for _ in range(3):
+        processor.process_patients(supabase=supabase)
+    assert len(journals) == 3
+    assert all(journal.close.call_count == 1 for journal in journals)
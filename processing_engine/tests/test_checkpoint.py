@@ -0,0 +1,164 @@
+import importlib
+import signal
+import threading
+import time
+from contextlib import nullcontext
+from unittest.mock import MagicMock
+import dspy
+import pytest
+from processing_engine.benchmarks.fakes import FakeLM, FakeMemory
+from processing_engine.common import checkpoint
+from processing_engine.common.checkpoint import CheckpointJournal
+from processing_engine.common.disk_cache import DiskCache
+
+
+def test_journal_survives_reopen(tmp_path):
+    path = str(tmp_path / "journal.sqlite")
+    journal = CheckpointJournal(path)
+    journal.mark("rec-1", "download")
+    journal.mark("rec-1", "analysis", "analysis text")
+    journal.close()
+
+    reopened = CheckpointJournal(path)
+    assert reopened.is_done("rec-1", "download")
+    assert reopened.get("rec-1", "analysis") == "analysis text"
+    assert not reopened.is_done("rec-1", "mem0")
+    reopened.reset()
+    assert reopened.get("rec-1", "analysis") is None
+
+
+class CountingOcr:
+    def __init__(self):
+        self.runs = 0
+
+    def run(self, path):
+        self.runs += 1
+        return {"text": "Tab Metformin 500 mg BD", "words": 40, "confidence": 0.95}
+
+    def confident(self, result):
+        return result is not None
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    processor = importlib.import_module(
+        "processing_engine.usecases.ayurlekha.processor"
+    )
+    monkeypatch.setitem(processor.config, "OCR_PREPASS", True)
+    monkeypatch.setitem(processor.config, "PREFILTER", False)
+    monkeypatch.setitem(processor.config, "DUPLICATE_DETECTION", False)
+    for name in ("entity_store", "quality_evaluator"):
+        monkeypatch.setattr(processor, name, MagicMock())
+    monkeypatch.setattr(processor, "mem0_memory", FakeMemory())
+    return processor
+
+
+def journal_stages(path, record_id):
+    journal = CheckpointJournal(path)
+    try:
+        return {
+            stage
+            for stage in ("download", "analysis", "mem0", "metadata", "upload")
+            if journal.is_done(record_id, stage)
+        }
+    finally:
+        journal.close()
+
+
+def test_resumed_record_skips_journaled_stages(processor, tmp_path, monkeypatch):
+    document = tmp_path / "rx.png"
+    document.write_bytes(b"page")
+    fetched, ocr, lm = [], CountingOcr(), FakeLM()
+    monkeypatch.setattr(processor, "ocr_pool", ocr)
+    monkeypatch.setattr(
+        processor,
+        "fetch_document",
+        lambda bucket, path: fetched.append(path) or nullcontext(str(document)),
+    )
+    record = {"id": "r1", "file_url": "https://x.co/object/public/docs/u1/p1/rx.png"}
+    path = str(tmp_path / "journal.sqlite")
+
+    # First run: download, OCR, analysis and mem0 complete, then the metadata call dies
+    monkeypatch.setattr(
+        processor, "document_cache", DiskCache(str(tmp_path / "a"), 10**6)
+    )
+    with monkeypatch.context() as m:
+        m.setattr(
+            processor, "DocumentMetadataModule", MagicMock(side_effect=TimeoutError)
+        )
+        journal = CheckpointJournal(path)
+        with dspy.context(lm=lm):
+            assert processor.process_record(record, "p1", "u1", journal) == (None, None)
+        journal.close()
+    assert journal_stages(path, "r1") == {"download", "analysis", "mem0"}
+    analysis_calls = lm.calls
+
+    # Resumed on another machine: an empty document cache, only the journal survived
+    monkeypatch.setattr(
+        processor, "document_cache", DiskCache(str(tmp_path / "b"), 10**6)
+    )
+    journal = CheckpointJournal(path)
+    with dspy.context(lm=lm):
+        analysis, upload = processor.process_record(record, "p1", "u1", journal)
+    assert analysis == journal.get("r1", "analysis") and upload is not None
+    assert len(fetched) == 1 and ocr.runs == 1
+    assert len(processor.mem0_memory.memories["p1"]) == 1
+    metadata_calls = lm.calls - analysis_calls
+    assert 0 < metadata_calls < analysis_calls
+
+    # Every stage journaled: no LM, OCR or download at all
+    journal.mark("r1", "upload")
+    with dspy.context(lm=lm):
+        processor.process_record(record, "p1", "u1", journal)
+    assert lm.calls == analysis_calls + metadata_calls
+    assert len(fetched) == 1 and ocr.runs == 1
+    journal.close()
+
+
+def test_sigterm_drains_the_patient_in_flight(processor, monkeypatch):
+    patients = [{"id": f"p{i}", "user_id": f"u{i}"} for i in range(3)]
+    records = [
+        {
+            "id": f"r{i}",
+            "patient_id": f"p{i}",
+            "file_url": "x",
+            "created_at": f"2025-01-0{i + 1}",
+        }
+        for i in range(3)
+    ]
+    supabase = MagicMock()
+    tables = {"patients": MagicMock(), "medical_records": MagicMock()}
+    tables["patients"].select.return_value.execute.return_value.data = patients
+    tables[
+        "medical_records"
+    ].select.return_value.eq.return_value.execute.return_value.data = records
+    supabase.table.side_effect = lambda name: tables[name]
+    journal = MagicMock()
+    monkeypatch.setattr(processor, "open_checkpoint_journal", lambda *args: journal)
+    monkeypatch.setattr(checkpoint, "_stop_event", threading.Event())
+    started, finished = [], []
+
+    def process_patient(supabase, patient, journal, records=None):
+        started.append(patient["id"])
+        if len(started) == 1:
+            # SIGTERM arrives while the first patient is being processed
+            signal.getsignal(signal.SIGTERM)(signal.SIGTERM, None)
+            time.sleep(0.1)
+        finished.append(patient["id"])
+        return len(records)
+
+    monkeypatch.setattr(processor, "process_patient", process_patient)
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+    checkpoint.install_stop_handlers()
+    try:
+        progress = processor.process_patients(supabase=supabase, patient_workers=1)
+    finally:
+        for sig, handler in handlers.items():
+            signal.signal(sig, handler)
+
+    # The patient in flight finishes, the rest are left for a resumed run
+    assert started == finished and len(finished) == 1
+    assert progress["records"] == 1
+    journal.flush.assert_called_once()
+    journal.close.assert_called_once()
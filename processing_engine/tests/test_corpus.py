@@ -0,0 +1,97 @@
+import zlib
+from processing_engine.benchmarks.corpus import (
+    BUCKET,
+    PageTemplate,
+    generate_corpus,
+    load_corpus,
+    render_document_png,
+)
+from processing_engine.benchmarks.fakes import FakeSupabase, seed_corpus
+
+
+def _remote_path(rec):
+    return rec["file_url"].split(f"/{BUCKET}/", 1)[1]
+
+
+def _pixels(data):
+    assert data.startswith(b"\x89PNG\r\n\x1a\n")
+    idat_len = int.from_bytes(data[33:37], "big")
+    # zlib.decompress also verifies the Adler-32 checksum
+    return zlib.decompress(data[41 : 41 + idat_len])
+
+
+def test_render_document_png_is_valid_png():
+    raw = _pixels(render_document_png("lab", 120, 160, seed=1))
+    # One filter byte per row plus one byte per pixel
+    assert len(raw) == 160 * (120 + 1)
+
+
+def test_stamped_page_matches_a_full_render(tmp_path):
+    template = PageTemplate(str(tmp_path / "lab.deflate"), "lab", 120, 160, seed=1)
+    stamped = _pixels(template.stamp(seed=2))
+    header = template.header_rows * (120 + 1)
+    assert (
+        stamped[header:]
+        == _pixels(render_document_png("lab", 120, 160, seed=1))[header:]
+    )
+    assert (
+        stamped[:header]
+        == _pixels(render_document_png("lab", 120, 160, seed=2))[:header]
+    )
+    assert stamped[:header] != _pixels(template.stamp(seed=3))[:header]
+
+
+def test_generate_and_load_corpus(tmp_path):
+    stats = generate_corpus(
+        str(tmp_path),
+        patients=20,
+        records_mean=4,
+        processed_share=0.5,
+        duplicate_share=0.3,
+        resolutions=((64, 90),),
+        variants=2,
+    )
+    client = load_corpus(str(tmp_path))
+
+    patients = client.table("patients").select("*").execute().data
+    records = client.tables["medical_records"]
+    assert len(patients) == 20
+    assert len(records) == stats["records"]
+    assert sum(rec["processed"] for rec in records) == stats["processed"]
+    assert 0 < stats["processed"] < stats["records"]
+
+    pending = (
+        client.table("medical_records")
+        .select("*")
+        .eq("patient_id", patients[0]["id"])
+        .eq("processed", False)
+        .execute()
+        .data
+    )
+    assert all(rec["processed"] is False for rec in pending)
+
+    duplicates = [rec for rec in records if rec["duplicate_of"]]
+    assert len(duplicates) == stats["duplicates"] > 0
+    by_id = {rec["id"]: rec for rec in records}
+    bucket = client.storage.from_(BUCKET)
+    for rec in duplicates:
+        original = by_id[rec["duplicate_of"]]
+        assert original["patient_id"] == rec["patient_id"]
+        assert bucket.download(_remote_path(rec)) == bucket.download(
+            _remote_path(original)
+        )
+    # Unrelated records never share bytes, however few templates there are
+    originals = [
+        bucket.download(_remote_path(rec)) for rec in records if not rec["duplicate_of"]
+    ]
+    assert len(set(originals)) == len(originals)
+    # Stamped pages are valid PNGs: header rows from the record, body rows from the template
+    raw = _pixels(originals[0])
+    assert len(raw) == 90 * (64 + 1)
+
+
+def test_seeded_records_have_distinct_images():
+    client = FakeSupabase()
+    seed_corpus(client, patients=3, records_per_patient=4, image_size=(32, 32))
+    images = list(client.storage.objects.values())
+    assert len(images) == 12 and len(set(images)) == 12
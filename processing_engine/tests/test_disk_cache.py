@@ -0,0 +1,52 @@
+import os
+from processing_engine.common.disk_cache import DiskCache
+
+
+def test_lru_eviction_and_stats(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    cache.put("a.txt", b"aaaa")
+    cache.put("b.txt", b"bbbb")
+    assert cache.get("a.txt") == b"aaaa"  # a is now most recently used
+    cache.put("c.txt", b"cccc")  # over the cap: b is evicted
+    assert cache.get("b.txt") is None
+    assert cache.get_text("c.txt") == "cccc"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["bytes"] <= 10
+
+
+def test_index_rebuilt_and_temp_files_removed(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+    cache.put("doc.jpg", b"image")
+    open(os.path.join(tmp_path, ".tmpabc"), "wb").write(b"partial")
+    reopened = DiskCache(str(tmp_path), max_bytes=100)
+    assert reopened.path("doc.jpg").endswith(".jpg")
+    assert reopened.stats()["entries"] == 1
+    assert not os.path.exists(os.path.join(tmp_path, ".tmpabc"))
+
+
+def test_held_entries_are_not_evicted(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    cache.put("a.jpg", b"aaaa")
+    with cache.hold("a.jpg") as path:
+        cache.put("b.jpg", b"bbbb")
+        cache.put("c.jpg", b"cccc")  # over the cap, but a is in use: b goes
+        assert open(path, "rb").read() == b"aaaa"
+        assert cache.get("b.jpg") is None
+    # Released, a is evicted as soon as the cache is over its cap again
+    assert cache.stats()["bytes"] <= 10
+    pinned = cache.put("d.jpg", b"dddd", pin=True)
+    cache.put("e.jpg", b"eeee")
+    assert os.path.exists(pinned)
+    cache.release(pinned)
+    assert cache.stats()["bytes"] <= 10
+
+
+def test_resize_evicts_down_to_the_new_cap(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+    for key in ("a.txt", "b.txt", "c.txt"):
+        cache.put(key, b"xxxx")
+    cache.resize(8)
+    assert cache.get("a.txt") is None
+    assert cache.get("c.txt") == b"xxxx" and cache.stats()["bytes"] == 8
@@ -0,0 +1,78 @@
+import json
+import dspy
+from dspy.utils.dummies import DummyLM
+from processing_engine.benchmarks.fakes import FakeLM
+from processing_engine.common import compiled_programs
+from processing_engine.usecases.ayurlekha.distill import (
+    compile_program,
+    load_examples,
+    make_metric,
+)
+from processing_engine.usecases.ayurlekha.modules import DocumentMetadataModule
+from processing_engine.usecases.ayurlekha.signatures import DocumentMetadataSignature
+
+
+def _capture(path, n=10):
+    with open(path, "w") as f:
+        for i in range(n):
+            record = {
+                "inputs": {"detailed_analysis": f"Prescription {i} for hypertension."},
+                "outputs": {"category": "Prescription", "date": f"2024-03-{i + 1:02d}"},
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def test_compile_gates_saves_and_applies(tmp_path, monkeypatch):
+    capture = tmp_path / "metadata.jsonl"
+    _capture(capture)
+    examples = load_examples(str(capture), DocumentMetadataSignature)
+    assert list(examples[0].inputs().keys()) == ["detailed_analysis"]
+
+    root = tmp_path / "compiled"
+    failed = compile_program(
+        "metadata",
+        examples,
+        student_lm=FakeLM(),
+        teacher_lm=FakeLM(),
+        student_model="openai/student",
+        optimizer="labeled",
+        gate=0.95,
+        root=str(root),
+    )
+    assert not failed["saved"] and not root.exists()
+
+    report = compile_program(
+        "metadata",
+        examples,
+        student_lm=FakeLM(),
+        teacher_lm=FakeLM(),
+        student_model="openai/student",
+        optimizer="labeled",
+        gate=0.8,
+        root=str(root),
+    )
+    assert report["saved"] and report["n_train"] == 8 and report["n_dev"] == 2
+    assert report["score"] >= 0.8
+
+    monkeypatch.setitem(compiled_programs.config, "COMPILED_PROGRAMS_DIR", str(root))
+    monkeypatch.setattr(compiled_programs, "_loaded", {})
+    module = DocumentMetadataModule()
+    assert module.compiled
+    assert len(module.predictor.predict.demos) == 4
+    assert module.predictor.predict.lm.model == "openai/student"
+
+
+def test_metric_rescales_judge_scores():
+    judge = DummyLM(
+        [
+            {"reasoning": "r", "quality": "8/10", "feedback": "minor gaps"},
+            {"reasoning": "r", "quality": "85", "feedback": "good"},
+            {"reasoning": "r", "quality": "unsure", "feedback": "no score"},
+        ]
+    )
+    metric = make_metric(DocumentMetadataSignature, judge, threshold=0.8)
+    example = dspy.Example(category="Prescription")
+    prediction = dspy.Prediction(category="Prescription")
+    assert metric(example, prediction) == 0.8
+    assert metric(example, prediction) == 0.85
+    assert metric(example, prediction) == 0.0
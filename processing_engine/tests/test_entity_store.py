@@ -0,0 +1,56 @@
+import sqlite3
+import pytest
+from processing_engine.common.entity_store import EntityStore
+
+
+def _metadata(**overrides):
+    metadata = {
+        "date": "2024-03-01",
+        "category": "Prescription",
+        "department": "Cardiology",
+        "doctor_name": "Dr. Rao",
+        "urgency": "High",
+        "is_medical_document": True,
+        "medications": [
+            {"name": "Amlodipine", "dosage": "5mg", "frequency": "OD"},
+            "Aspirin",
+        ],
+        "lab_tests": [{"investigation": "HbA1c", "result": "6.1", "unit": "%"}],
+    }
+    metadata.update(overrides)
+    return metadata
+
+
+def test_upsert_replaces_record_entities(tmp_path):
+    store = EntityStore(str(tmp_path), partitions=4)
+    store.upsert_document("p1", "u1", "r1", _metadata())
+    store.upsert_document("p1", "u1", "r1", _metadata(medications=["Metformin"]))
+
+    medications = store.patient_rows("medications", "p1")
+    assert [m["name"] for m in medications] == ["Metformin"]
+    labs = store.patient_rows("lab_tests", "p1")
+    assert labs[0]["investigation"] == "HbA1c" and labs[0]["unit"] == "%"
+    documents = store.patient_rows("documents", "p1")
+    assert len(documents) == 1
+    assert documents[0]["is_medical_document"] == 1
+    store.close()
+
+
+def test_scan_covers_all_partitions(tmp_path):
+    store = EntityStore(str(tmp_path), partitions=4)
+    for i in range(20):
+        store.upsert_document(
+            f"p{i}", "u1", "r1", _metadata(urgency="High" if i % 2 else "Low")
+        )
+    rows = store.scan("SELECT patient_id FROM documents WHERE urgency = ?", ("High",))
+    assert sorted(row["patient_id"] for row in rows) == sorted(
+        f"p{i}" for i in range(1, 20, 2)
+    )
+    amlodipine = store.scan(
+        "SELECT COUNT(*) AS n FROM medications WHERE name = ?", ("Amlodipine",)
+    )
+    assert sum(row["n"] for row in amlodipine) == 20
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        store.scan("DELETE FROM documents")
+    assert len(store.scan("SELECT patient_id FROM documents")) == 20
+    store.close()
@@ -0,0 +1,59 @@
+import threading
+import time
+from processing_engine.common.events import LocalEventSource, PatientDebouncer
+
+
+class _Batches:
+    def __init__(self):
+        self.batches = []
+        self.event = threading.Event()
+
+    def __call__(self, patient_id, record_ids, first_seen):
+        self.batches.append((patient_id, list(record_ids)))
+        self.event.set()
+
+
+def test_burst_for_one_patient_becomes_one_batch():
+    batches = _Batches()
+    debouncer = PatientDebouncer(batches, window=0.1, max_wait=5)
+    source = LocalEventSource()
+    source.start(lambda row: debouncer.add(row["patient_id"], row["id"]))
+    for i in range(5):
+        source.publish({"id": f"r{i}", "patient_id": "p1"})
+    source.publish({"id": "r0", "patient_id": "p1"})
+    source.publish({"id": "q0", "patient_id": "p2"})
+    time.sleep(0.3)
+    source.stop()
+    debouncer.stop()
+    assert sorted(batches.batches) == [
+        ("p1", ["r0", "r1", "r2", "r3", "r4"]),
+        ("p2", ["q0"]),
+    ]
+
+
+def test_max_wait_caps_a_continuous_stream():
+    batches = _Batches()
+    debouncer = PatientDebouncer(batches, window=0.2, max_wait=0.3)
+    start = time.monotonic()
+    for i in range(20):
+        debouncer.add("p1", f"r{i}")
+        if batches.event.is_set():
+            break
+        time.sleep(0.05)
+    assert batches.event.wait(1)
+    assert time.monotonic() - start < 0.6
+    debouncer.stop()
+
+
+def test_patient_in_flight_is_not_dispatched_twice():
+    batches = _Batches()
+    debouncer = PatientDebouncer(batches, window=0.05, max_wait=1)
+    debouncer.add("p1", "r1")
+    assert batches.event.wait(1)
+    batches.event.clear()
+    debouncer.add("p1", "r2")
+    assert not batches.event.wait(0.2)
+    debouncer.done("p1")
+    assert batches.event.wait(1)
+    debouncer.stop()
+    assert batches.batches == [("p1", ["r1"]), ("p1", ["r2"])]
@@ -0,0 +1,30 @@
+import json
+import urllib.error
+import urllib.request
+from processing_engine.common.health import HealthServer
+from processing_engine.common.metrics import metrics
+
+
+def _get(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}") as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+def test_endpoints_follow_worker_status():
+    status = {"ready": False, "state": "starting"}
+    server = HealthServer(lambda: status, host="127.0.0.1", port=0).start()
+    try:
+        assert _get(server.port, "/healthz")[0] == 200
+        code, body = _get(server.port, "/readyz")
+        assert code == 503 and json.loads(body)["state"] == "starting"
+        status.update(ready=True, state="idle")
+        assert _get(server.port, "/readyz")[0] == 200
+        metrics.inc("health_test_total")
+        code, body = _get(server.port, "/metrics")
+        assert code == 200 and "health_test_total" in body
+        assert _get(server.port, "/nope")[0] == 404
+    finally:
+        server.stop()
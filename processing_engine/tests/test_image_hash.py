@@ -0,0 +1,78 @@
+import random
+from processing_engine.common.image_hash import (
+    ImageHashIndex,
+    dhash,
+    hamming,
+    phash,
+    text_similarity,
+)
+
+
+def _page(seed, noise=0, size=32):
+    rng = random.Random(seed)
+    base = [[rng.randint(0, 255) for _ in range(size)] for _ in range(size)]
+    # Smooth it so it looks like a photographed page rather than static
+    smooth = [
+        [
+            sum(
+                base[(y + dy) % size][(x + dx) % size] for dy in (0, 1) for dx in (0, 1)
+            )
+            // 4
+            for x in range(size)
+        ]
+        for y in range(size)
+    ]
+    jitter = random.Random(seed + 1000)
+    return [
+        [min(255, max(0, v + jitter.randint(-noise, noise))) for v in row]
+        for row in smooth
+    ]
+
+
+def _hashes(pixels):
+    thumb = [row[::4][:9] + [row[-1]] * (9 - len(row[::4][:9])) for row in pixels[::4]]
+    return dhash(thumb), phash(pixels)
+
+
+def test_retake_is_close_and_other_page_is_far():
+    original, retake, other = (
+        _hashes(_page(1)),
+        _hashes(_page(1, noise=6)),
+        _hashes(_page(2)),
+    )
+    assert hamming(original[1], retake[1]) <= 8
+    assert hamming(original[1], other[1]) > 8
+    assert 0 <= original[0] < 1 << 64 and 0 <= original[1] < 1 << 64
+
+
+def test_index_finds_near_duplicates_per_patient(tmp_path):
+    index = ImageHashIndex(str(tmp_path / "hashes.sqlite"), max_dhash=10, max_phash=8)
+    original = _hashes(_page(1))
+    index.add("p1", "r1", original, lm_calls=3, sha256="a" * 64)
+    index.add("p1", "r2", _hashes(_page(2)), lm_calls=2, sha256="b" * 64)
+    match = index.find("p1", _hashes(_page(1, noise=6)), exclude="r9", sha256="a" * 64)
+    assert match["record_id"] == "r1" and match["lm_calls"] == 3
+    assert match["confirmed_by"] == "bytes"
+    assert index.find("p1", original, exclude="r1", sha256="a" * 64) is None
+    assert index.find("p2", original, sha256="a" * 64) is None
+    # High bit set survives the signed SQLite round trip
+    index.add("p3", "r1", (1 << 63, (1 << 64) - 1), sha256="c" * 64)
+    match = index.find("p3", (1 << 63, (1 << 64) - 1), sha256="c" * 64)
+    assert match["phash_distance"] == 0
+    index.close()
+
+
+def test_same_template_with_different_content_is_not_a_duplicate(tmp_path):
+    index = ImageHashIndex(str(tmp_path / "hashes.sqlite"), min_text_similarity=0.9)
+    template = _hashes(_page(1))
+    header = "City Diagnostics Laboratory Complete Blood Count Patient Test Result Unit Reference Range\n"
+    first = header + "Haemoglobin 13.2 g/dL 13-17\nPlatelets 250000 /uL\nWBC 7400 /uL"
+    second = header + "Haemoglobin 9.8 g/dL 13-17\nPlatelets 110000 /uL\nWBC 12900 /uL"
+    index.add("p1", "r1", template, sha256="a" * 64, text=first)
+    # Identical thumbnails, different bytes and different values
+    assert index.find("p1", template, sha256="b" * 64, text=second) is None
+    assert index.find("p1", template, sha256="b" * 64) is None
+    # A retake of the same report reads the same
+    retake = index.find("p1", template, sha256="b" * 64, text=first.replace("\n", " "))
+    assert retake["confirmed_by"] == "text"
+    assert text_similarity(first, second) < 0.9
@@ -0,0 +1,73 @@
+import json
+import dspy
+from processing_engine.benchmarks import eval_profiles
+from processing_engine.common.inference_profiles import (
+    get_profile,
+    make_predictor,
+    override_profiles,
+)
+
+
+def test_profiles_select_strategy_and_part_overrides():
+    profiles = {
+        "SummarySection": {"strategy": "predict"},
+        "SummarySection.summary": {"strategy": "cot"},
+    }
+    with override_profiles(profiles):
+        assert get_profile("SummarySection.labTests") == {"strategy": "predict"}
+        assert type(make_predictor("SummarySection.labTests", "a -> b")) is dspy.Predict
+        assert isinstance(
+            make_predictor("SummarySection.summary", "a -> b"), dspy.ChainOfThought
+        )
+    assert isinstance(
+        make_predictor("SummarySection.labTests", "a -> b"), dspy.ChainOfThought
+    )
+
+
+def test_eval_harness_reports_quality_and_latency(tmp_path):
+    samples = tmp_path / "samples.jsonl"
+    samples.write_text(
+        "\n".join(
+            json.dumps(sample)
+            for sample in [
+                {
+                    "id": "m1",
+                    "task": "metadata",
+                    "input": "Rx",
+                    "expected": {"category": "Prescription"},
+                },
+                {
+                    "id": "s1",
+                    "task": "summary",
+                    "input": "History",
+                    "expected": {"summary": "x"},
+                },
+            ]
+        )
+    )
+    candidates = tmp_path / "candidates.json"
+    candidates.write_text(
+        json.dumps(
+            {
+                "baseline": {},
+                "predict": {"DocumentMetadataModule": {"strategy": "predict"}},
+            }
+        )
+    )
+    rows = eval_profiles.main(
+        [
+            "--samples",
+            str(samples),
+            "--candidates",
+            str(candidates),
+            "--fake",
+            "--out",
+            str(tmp_path / "out.json"),
+        ]
+    )
+    assert [row["candidate"] for row in rows] == ["baseline", "predict"]
+    for row in rows:
+        assert row["errors"] == 0
+        assert row["quality"] == 0.9
+        assert row["prompt_tokens"] > 0
+    assert json.loads((tmp_path / "out.json").read_text())["summary"] == rows
@@ -0,0 +1,54 @@
+import pytest
+from processing_engine.common.lm_trace import LMTraceStore, strip_images
+
+
+def test_records_are_written_in_background(tmp_path):
+    store = LMTraceStore(str(tmp_path / "trace.sqlite"))
+    store.record(
+        {
+            "ts": "2025-01-01T00:00:00",
+            "module": "DocumentProcessor",
+            "model": "gemini/gemini-2.0-flash",
+            "latency_s": 12.5,
+            "prompt_tokens": 900,
+            "completion_tokens": 300,
+            "prompt": [{"role": "user", "content": "x" * 10000}],
+            "response": ["ok"],
+        }
+    )
+    store.flush()
+    rows = store.query("latency_s > ?", (10,))
+    store.close()
+    assert len(rows) == 1
+    assert rows[0]["module"] == "DocumentProcessor"
+    assert len(rows[0]["prompt"]) < 5000
+
+
+def test_images_are_replaced_and_queries_are_parameterised(tmp_path):
+    image = "data:image/png;base64," + "iVBORw0KGgo" * 5000
+    prompt = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "Analyse this document."},
+                {"type": "image_url", "image_url": {"url": image}},
+            ],
+        }
+    ]
+    assert strip_images(f"see {image}") == f"see <image/png, {len(image)} base64 chars>"
+    store = LMTraceStore(str(tmp_path / "trace.sqlite"))
+    ts = "2025-01-01T00:00:00"
+    store.record(
+        {"ts": ts, "module": "DocumentProcessor", "prompt": prompt, "latency_s": 3.0}
+    )
+    store.record({"ts": ts, "module": "DocumentMetadataModule", "prompt": "short"})
+    store.flush()
+    (row,) = store.query(module="DocumentProcessor")
+    assert "Analyse this document." in row["prompt"] and "iVBOR" not in row["prompt"]
+    assert len(store.query("latency_s >= ?", (3,), module="DocumentProcessor")) == 1
+    assert len(store.query()) == 2
+    with pytest.raises(ValueError):
+        store.query(prompt_text="x")
+    with pytest.raises(ValueError):
+        store.query("1=1; DELETE FROM lm_calls")
+    store.close()
@@ -0,0 +1,76 @@
+import json
+import logging
+import queue
+from processing_engine.common import logger as logger_module
+from processing_engine.common.logger import JsonLineFormatter, _QueueHandler, log_event
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(JsonLineFormatter().format(record)))
+
+
+def _logger(name, level=logging.INFO):
+    capture = _Capture()
+    log = logging.getLogger(f"test_logger.{name}")
+    log.handlers = [capture]
+    log.propagate = False
+    log.setLevel(level)
+    return log, capture.lines
+
+
+def test_json_line_shape():
+    record = logging.LogRecord(
+        "area.name", logging.WARNING, __file__, 1, "hello %s", ("there",), None
+    )
+    record.fields = {"event": "download", "record_id": 7}
+    entry = json.loads(JsonLineFormatter().format(record))
+    assert set(entry) == {"ts", "level", "logger", "message", "event", "record_id"}
+    assert entry["level"] == "WARNING" and entry["logger"] == "area.name"
+    assert entry["message"] == "hello there" and entry["record_id"] == 7
+
+
+def test_log_event_fields_and_truncation(monkeypatch):
+    monkeypatch.setattr(logger_module, "LOG_MAX_PAYLOAD", 10)
+    log, lines = _logger("fields")
+    log_event(log, "metadata", "Metadata for a.jpg", payload={"k": "v" * 20}, n=3)
+    (entry,) = lines
+    assert entry["message"] == "[metadata] Metadata for a.jpg"
+    assert entry["event"] == "metadata" and entry["n"] == 3
+    assert entry["payload"].startswith('{"k": "vvv')
+    assert entry["payload"].endswith("[truncated 19 chars]")
+
+
+def test_log_event_sampling_and_lazy_payload(monkeypatch):
+    monkeypatch.setattr(logger_module, "LOG_SAMPLE_RATES", {"metadata": 0.0})
+    log, lines = _logger("sampling")
+    built = []
+
+    def payload():
+        built.append(1)
+        return "big"
+
+    log_event(log, "metadata", payload=payload)
+    # Sampled out, and below the logger's level: the payload is never built
+    log_event(log, "summary", level=logging.DEBUG, payload=payload)
+    assert lines == [] and built == []
+    log_event(log, "summary", payload=payload)
+    assert [e["payload"] for e in lines] == ["big"] and built == [1]
+
+
+def test_traceback_survives_the_queue():
+    log_queue = queue.SimpleQueue()
+    log = logging.getLogger("test_logger.queue")
+    log.handlers = [_QueueHandler(log_queue)]
+    log.propagate = False
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("Failed %s", "badly")
+    entry = json.loads(JsonLineFormatter().format(log_queue.get_nowait()))
+    assert entry["message"] == "Failed badly"
+    assert "ValueError: boom" in entry["exc"] and "Traceback" in entry["exc"]
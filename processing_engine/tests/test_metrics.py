@@ -0,0 +1,48 @@
+from processing_engine.common.metrics import Metrics, percentile
+
+
+def test_prometheus_export_and_summary(tmp_path):
+    m = Metrics()
+    for value in [0.02, 0.2, 3.0]:
+        m.observe("stage_seconds", value, stage="analysis")
+    m.inc("lm_prompt_tokens_total", 120, model="gemini", module="DocumentProcessor")
+    m.set_gauge("queue_depth", 4, queue="records")
+
+    text = m.to_prometheus()
+    assert 'stage_seconds_bucket{stage="analysis",le="0.25"} 2' in text
+    assert 'stage_seconds_count{stage="analysis"} 3' in text
+    assert (
+        'lm_prompt_tokens_total{model="gemini",module="DocumentProcessor"} 120' in text
+    )
+
+    path = tmp_path / "run.prom"
+    m.write_prometheus(str(path))
+    assert path.read_text() == text
+    assert 'stage_seconds{stage="analysis"}' in m.summary_table()
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+
+
+def test_lm_usage_is_taken_from_the_call_itself(monkeypatch):
+    import dspy
+    from processing_engine.benchmarks.fakes import FakeLM
+    from processing_engine.common import dspy_callbacks
+
+    m = Metrics()
+    monkeypatch.setattr(dspy_callbacks, "metrics", m)
+    callback = dspy_callbacks.MetricsCallback()
+    lm = FakeLM(output_tokens=10)
+    # Driven by hand: another call on the same LM finishes before the first one's callback runs
+    with dspy.context(callbacks=[]):
+        callback.on_lm_start("first", lm, {})
+        first = lm(messages=[{"role": "user", "content": "x" * 400}])
+        lm(messages=[{"role": "user", "content": "y" * 4000}])
+        callback.on_lm_end("first", first)
+
+    assert 'lm_prompt_tokens_total{model="fake/fake-lm",module="unknown"} 100\n' in (
+        m.to_prometheus()
+    )
@@ -0,0 +1,62 @@
+import multiprocessing
+import time
+from processing_engine.common import ocr
+from processing_engine.common.ocr import OcrPool, summarize_ocr
+
+
+def _data(words, confs):
+    n = len(words)
+    return {
+        "text": words,
+        "conf": confs,
+        "block_num": [1] * n,
+        "par_num": [1] * n,
+        "line_num": [1 if i < n // 2 else 2 for i in range(n)],
+    }
+
+
+def test_summary_skips_layout_boxes_and_weights_by_length():
+    result = summarize_ocr(
+        _data(["", "Haemoglobin", "13.2", "g/dL", "x"], [-1, 96, 90, 94, 10])
+    )
+    assert result["words"] == 4
+    assert result["text"] == "Haemoglobin\n13.2 g/dL x"
+    # The one-letter low-confidence word barely moves the score
+    assert 0.9 < result["confidence"] < 0.95
+
+
+def test_confidence_gate_needs_both_score_and_words():
+    pool = OcrPool(min_confidence=0.85, min_words=3)
+    assert pool.confident({"confidence": 0.9, "words": 40, "text": "..."})
+    assert not pool.confident({"confidence": 0.6, "words": 40, "text": "..."})
+    assert not pool.confident({"confidence": 0.95, "words": 2, "text": "..."})
+    assert not pool.confident(None)
+
+
+def test_unavailable_ocr_keeps_the_vision_path():
+    pool = OcrPool()
+    pool._available = False
+    assert pool.run("missing.png") is None
+
+
+def _stuck_ocr(path, lang):
+    time.sleep(60)
+
+
+def _quick_ocr(path, lang):
+    return {"text": path, "words": 1, "confidence": 1.0, "seconds": 0.0}
+
+
+def test_timed_out_page_does_not_keep_its_worker(monkeypatch):
+    pool = OcrPool(workers=1, timeout=2)
+    pool._available = True
+    monkeypatch.setattr(ocr, "ocr_file", _stuck_ocr)
+    assert pool.run("page.png") is None
+    deadline = time.time() + 5
+    while multiprocessing.active_children() and time.time() < deadline:
+        time.sleep(0.05)
+    assert not multiprocessing.active_children()
+    # The next page gets a fresh worker instead of queueing behind the stuck one
+    monkeypatch.setattr(ocr, "ocr_file", _quick_ocr)
+    assert pool.run("next.png")["text"] == "next.png"
+    pool.close()
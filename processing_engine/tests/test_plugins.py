@@ -0,0 +1,50 @@
+import json
+import sys
+import pytest
+from processing_engine.common import plugins
+
+
+def _manifest(root, name, **fields):
+    folder = root / name
+    folder.mkdir()
+    (folder / plugins.MANIFEST_NAME).write_text(json.dumps(dict(name=name, **fields)))
+
+
+def test_discovery_reads_manifests_without_importing(tmp_path):
+    _manifest(tmp_path, "echo", module="echo_usecase_plugin", hooks={"poll": "run"})
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / plugins.MANIFEST_NAME).write_text("{not json")
+    manifests = plugins.discover(str(tmp_path))
+    assert set(manifests) >= {"echo"} and "broken" not in manifests
+    assert manifests["echo"]["hooks"]["poll"] == "run"
+    assert manifests["echo"]["hooks"]["warm_up"] == "warm_up"
+    assert "echo_usecase_plugin" not in sys.modules
+
+
+def test_load_imports_only_the_selected_plugin(tmp_path, monkeypatch):
+    module = tmp_path / "echo_usecase_plugin.py"
+    module.write_text("calls = []\ndef run(**kwargs):\n    calls.append(kwargs)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    _manifest(tmp_path, "echo", module="echo_usecase_plugin", hooks={"poll": "run"})
+    _manifest(
+        tmp_path, "heavy", module="heavy_usecase_plugin", requires=["no_such_dep"]
+    )
+    manifests = plugins.discover(str(tmp_path))
+    monkeypatch.setattr(plugins, "_loaded", {})
+
+    usecase = plugins.load("echo", manifests)
+    usecase.hook("poll")(supabase=None)
+    assert usecase.module.calls == [{"supabase": None}]
+    assert usecase.hook("warm_up") is None
+    assert plugins.load("echo", manifests) is usecase
+    assert "heavy_usecase_plugin" not in sys.modules
+    with pytest.raises(ImportError, match="no_such_dep"):
+        plugins.load("heavy", manifests)
+    with pytest.raises(KeyError):
+        plugins.load("missing", manifests)
+
+
+def test_ayurlekha_is_declared():
+    manifest = plugins.discover()["ayurlekha"]
+    assert manifest["module"] == "processing_engine.usecases.ayurlekha.processor"
+    assert manifest["hooks"]["poll"] == "process_patients"
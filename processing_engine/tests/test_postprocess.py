@@ -0,0 +1,74 @@
+from datetime import date
+from processing_engine.common.dates import normalize_date, parse_duration
+from processing_engine.usecases.ayurlekha.postprocess import (
+    postprocess_summary,
+    resolve_course,
+)
+
+TODAY = date(2025, 7, 13)
+
+
+def test_normalize_date():
+    cases = {
+        "2024-03-01": "2024-03-01",
+        "01/03/2024": "2024-03-01",
+        "03/25/2024": "2024-03-25",
+        "1st March 2024": "2024-03-01",
+        "March 1, 2024": "2024-03-01",
+        "Since Jan 2024": "2024-01",
+        "Oct '22": "2022-10",
+        # A day without a year is not a month and year
+        "Review on May 15": "Review on May 15",
+        "Seen May 15, review Sep 2023": "2023-09",
+        "2019": "2019",
+        "Ongoing": "Ongoing",
+    }
+    for raw, expected in cases.items():
+        assert normalize_date(raw) == expected
+
+
+def test_parse_duration():
+    assert parse_duration("BD x 5 days") == (0, 5)
+    assert parse_duration("for three months") == (3, 0)
+    assert parse_duration("continue") is None
+
+
+def test_resolve_course_computes_end_and_outdated():
+    done = resolve_course(
+        {"name": "Azithromycin", "start_date": "01/07/2025", "duration": "5 days"},
+        TODAY,
+    )
+    assert done["end_date"] == "2025-07-06"
+    assert done["is_outdated"] is True
+    assert "2025-07-06" in done["outdated_reason"]
+
+    current = resolve_course(
+        {"name": "Telmisartan", "start_date": "Jan 2025", "duration": "1 year"}, TODAY
+    )
+    assert current["end_date"] == "2026-01"
+    assert current["is_outdated"] is False
+
+    open_ended = resolve_course({"name": "Metformin", "duration": "continue"}, TODAY)
+    assert open_ended["is_outdated"] is False and open_ended["end_date"] == ""
+
+
+def test_postprocess_summary_sorts_timeline_and_labs():
+    summary = postprocess_summary(
+        {
+            "historyTimeline": [
+                {"date": "Nov 2023", "event": "GVHD"},
+                {"date": "Ongoing", "event": "HTN"},
+                {"date": "Oct 2022", "event": "AML"},
+            ],
+            "labTests": [
+                {"date": "12/02/2024", "investigation": "Chest X-ray"},
+                {"date": "Jan 2023", "investigation": "CBC"},
+            ],
+            "medications": None,
+        },
+        TODAY,
+    )
+    assert [e["event"] for e in summary["historyTimeline"]] == ["AML", "GVHD", "HTN"]
+    assert summary["historyTimeline"][0]["date"] == "2022-10"
+    assert [t["date"] for t in summary["labTests"]] == ["2023-01", "2024-02-12"]
+    assert summary["medications"] == []
@@ -0,0 +1,93 @@
+import pytest
+from processing_engine.benchmarks.bench_prefilter import score
+from processing_engine.usecases.ayurlekha.prefilter import (
+    MedicalPrefilter,
+    classify,
+    medical_term_count,
+    pixel_features,
+)
+
+PAGE = [(240, 238, 235)] * 900 + [(30, 30, 30)] * 100
+PHOTO = [(200, 60, 40), (40, 160, 60), (30, 60, 200), (220, 180, 40)] * 250
+
+
+def test_pixel_features_separate_pages_from_photos():
+    page, photo = pixel_features(PAGE), pixel_features(PHOTO)
+    assert page["paper_fraction"] == 0.9 and page["colourfulness"] < 10
+    assert photo["paper_fraction"] == 0 and photo["colourfulness"] > 60
+
+
+def test_medical_vocabulary_lets_documents_through():
+    assert medical_term_count("Tab Metformin 500 mg BD, HbA1c 6.1") == 4
+    assert classify({**pixel_features(PHOTO), "words": 12, "medical_terms": 3}) is None
+    # A colourful photo of a page with text is borderline and goes on to the analysis
+    assert classify({**pixel_features(PHOTO), "words": 12, "medical_terms": 0}) is None
+
+
+def test_clear_non_medical_uploads_are_rejected_with_a_reason():
+    assert "colourful photo" in classify(
+        {**pixel_features(PHOTO), "words": 0, "medical_terms": 0}
+    )
+    assert "without any medical terms" in classify(
+        {
+            **pixel_features(PAGE),
+            "words": 80,
+            "medical_terms": 0,
+            "ocr_confidence": 0.93,
+        }
+    )
+    assert "file name" in classify(
+        {"words": 5, "medical_terms": 0, "ocr_confidence": 0.9},
+        "u1/p1/Screenshot_2024.png",
+    )
+    assert classify(pixel_features(PAGE)) is None
+    # Without OCR the file name alone is not enough
+    assert classify({}, "u1/p1/Screenshot_2024.png") is None
+
+
+def test_colourful_medical_photo_passes_without_ocr():
+    # A rash, wound or medicine strip photographed without the OCR pre-pass
+    assert classify(pixel_features(PHOTO), "u1/p1/IMG_2041.jpg") is None
+
+
+def test_low_confidence_ocr_is_not_trusted():
+    # Handwritten or non-English prescriptions: many misread words, none of them a known term
+    garbage = {
+        **pixel_features(PAGE),
+        "words": 120,
+        "medical_terms": 0,
+        "ocr_confidence": 0.41,
+    }
+    assert classify(garbage) is None
+    assert classify({**garbage, "words": 5}, "u1/p1/Screenshot_2024.png") is None
+    # Forwarded prescription photos keep WhatsApp's default name
+    assert (
+        classify({**garbage, "ocr_confidence": 0.95}, "WhatsApp Image 2024-03-01.jpeg")
+        is not None
+    )
+    assert (
+        classify(
+            {**garbage, "words": 5, "ocr_confidence": 0.95},
+            "WhatsApp Image 2024-03-01.jpeg",
+        )
+        is None
+    )
+
+
+def test_check_without_ocr_does_nothing(tmp_path, monkeypatch):
+    prefilter = MedicalPrefilter()
+    monkeypatch.setattr(
+        prefilter, "features", lambda *a, **k: pytest.fail("image decoded without OCR")
+    )
+    assert prefilter.check(str(tmp_path / "x.png"), None, "Screenshot.png") is None
+
+
+def test_score_treats_rejection_as_positive():
+    rows = [
+        {"label": "non_medical", "rejected": True},
+        {"label": "non_medical", "rejected": False},
+        {"label": "medical", "rejected": False},
+        {"label": "medical", "rejected": True},
+    ]
+    result = score(rows)
+    assert result["precision"] == 0.5 and result["recall"] == 0.5
@@ -0,0 +1,71 @@
+import json
+from datetime import date
+from processing_engine.benchmarks.fakes import FakeSupabase
+from processing_engine.common import supabase_io
+from processing_engine.usecases.ayurlekha.postprocess import postprocess_summary
+from processing_engine.usecases.ayurlekha.publish import (
+    publish_summary,
+    summary_etag,
+)
+
+
+def _summary(generated_at, medications):
+    return {
+        "patient": {"name": "Test Patient", "age": 40},
+        "medications": medications,
+        "footer": {"date": generated_at[:10], "generatedBy": "Ayurlekha App"},
+        "meta": {"version": "1.0", "generated_at": generated_at},
+    }
+
+
+def test_etag_ignores_volatile_fields_and_key_order():
+    first = _summary("2025-07-01T10:00:00", [{"name": "Metformin"}])
+    second = _summary("2025-07-02T09:00:00", [{"name": "Metformin"}])
+    reordered = dict(reversed(list(second.items())))
+    assert summary_etag(first) == summary_etag(second) == summary_etag(reordered)
+    assert summary_etag(first) != summary_etag(
+        _summary("2025-07-01T10:00:00", [{"name": "Insulin"}])
+    )
+
+
+def test_etag_of_outdated_medications_is_stable_across_days():
+    medications = [
+        {"name": "Azithromycin", "start_date": "01/07/2025", "duration": "5 days"},
+        {"name": "Telmisartan", "start_date": "Jan 2025", "duration": "1 year"},
+    ]
+    monday = postprocess_summary(
+        _summary("2025-08-04T10:00:00", medications), date(2025, 8, 4)
+    )
+    tuesday = postprocess_summary(
+        _summary("2025-08-05T10:00:00", medications), date(2025, 8, 5)
+    )
+    assert monday["medications"][0]["is_outdated"]
+    assert summary_etag(monday) == summary_etag(tuesday)
+
+
+def test_unchanged_summary_is_not_republished(monkeypatch):
+    client = FakeSupabase()
+    monkeypatch.setattr(supabase_io, "supabase", client)
+    objects = client.storage.objects
+
+    path, changed = publish_summary("u1", "p1", _summary("2025-07-01T10:00:00", []))
+    assert changed and ("medical-documents", path) in objects
+    count = len(objects)
+
+    same_path, changed = publish_summary(
+        "u1", "p1", _summary("2025-07-02T10:00:00", [])
+    )
+    assert not changed and same_path == path and len(objects) == count
+
+    new_path, changed = publish_summary(
+        "u1", "p1", _summary("2025-07-03T10:00:00", [{"name": "Insulin"}])
+    )
+    latest = json.loads(objects[("medical-documents", "Ayurlekha/u1/p1/latest.json")])
+    assert changed and latest["path"] == new_path
+    assert latest["previous_etag"] != latest["etag"]
+    options = client.storage.file_options
+    assert (
+        options[("medical-documents", "Ayurlekha/u1/p1/latest.json")]["cache-control"]
+        == "0"
+    )
+    assert "cache-control" not in options[("medical-documents", new_path)]
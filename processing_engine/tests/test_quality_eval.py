@@ -0,0 +1,76 @@
+import time
+import dspy
+from dspy.utils.dummies import DummyLM
+from processing_engine.benchmarks.fakes import FakeLM
+from processing_engine.common.quality_eval import (
+    ANALYSER_FIELDS,
+    QualityEvaluator,
+    parse_score,
+    sampled,
+)
+
+
+def test_sampling_is_deterministic_and_proportional():
+    picked = [sampled("analysis", str(i), 0.25) for i in range(4000)]
+    assert picked == [sampled("analysis", str(i), 0.25) for i in range(4000)]
+    assert 800 < sum(picked) < 1200
+    assert not any(sampled("analysis", str(i), 0.0) for i in range(100))
+
+
+def test_judging_runs_in_background_and_stores_scores(tmp_path):
+    latency = 0.2
+    evaluator = QualityEvaluator(
+        str(tmp_path / "quality.sqlite"), sample_rate=1.0, workers=2, max_pending=3
+    )
+    with dspy.context(lm=FakeLM(latency=latency)):
+        start = time.perf_counter()
+        queued = [
+            evaluator.submit("summary", f"r{i}", {"summary": "ok"}, reference="src")
+            for i in range(5)
+        ]
+        assert time.perf_counter() - start < latency
+    assert queued == [True, True, True, False, False] and evaluator.dropped == 2
+
+    evaluator.flush()
+    rows = evaluator.scores(kind="summary")
+    assert [row["record_id"] for row in sorted(rows, key=lambda r: r["record_id"])] == [
+        "r0",
+        "r1",
+        "r2",
+    ]
+    assert rows[0]["quality"] == 0.9
+    assert 0.7 <= rows[0]["analyser"] <= 0.9
+    evaluator.close()
+
+
+def test_parse_score_rescales_and_keeps_zero():
+    assert parse_score("8/10") == 0.8
+    assert parse_score("85") == 0.85
+    assert parse_score(0) == 0.0
+    assert parse_score(0.0) == 0.0
+    assert parse_score("0") == 0.0
+    assert parse_score(None) is None
+    assert parse_score("unsure") is None
+
+
+def test_unparseable_and_zero_judge_scores_are_stored(tmp_path):
+    analyser = {"reasoning": "r"} | {field: "7" for field in ANALYSER_FIELDS}
+    judge = DummyLM(
+        [
+            analyser,
+            {"reasoning": "r", "quality": "8/10", "feedback": "minor gaps"},
+            analyser,
+            {"reasoning": "r", "quality": "0", "feedback": "wrong patient"},
+        ]
+    )
+    evaluator = QualityEvaluator(
+        str(tmp_path / "quality.sqlite"), sample_rate=1.0, workers=1, judge_lm=judge
+    )
+    for record_id in ("r0", "r1"):
+        evaluator.submit("summary", record_id, {"summary": "ok"}, reference="src")
+        evaluator.flush()
+    rows = {row["record_id"]: row for row in evaluator.scores(kind="summary")}
+    assert rows["r0"]["quality"] == 0.8
+    assert rows["r1"]["quality"] == 0.0
+    assert abs(rows["r0"]["analyser"] - 0.7) < 1e-9
+    evaluator.close()
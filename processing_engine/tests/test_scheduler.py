@@ -0,0 +1,61 @@
+from processing_engine.common.metrics import metrics
+from processing_engine.common.scheduler import FairScheduler, priority_class
+from processing_engine.usecases.ayurlekha.triage import UrgencyTriage
+
+
+def _drain(scheduler):
+    scheduler.close()
+    order = []
+    while (job := scheduler.pop()) is not None:
+        order.append(job)
+    return order
+
+
+def test_heavy_user_does_not_starve_others():
+    scheduler = FairScheduler()
+    for i in range(5):
+        scheduler.push(f"bulk{i}", user_id="bulk", cost=100)
+    for i in range(5):
+        scheduler.push(f"small{i}", user_id="small", cost=1)
+    order = _drain(scheduler)
+    # Every small job goes before the bulk user's second job
+    assert order.index("small4") < order.index("bulk1")
+
+
+def test_weights_share_by_cost():
+    scheduler = FairScheduler(weights={"gold": 3})
+    for i in range(8):
+        scheduler.push(("gold", i), user_id="gold")
+        scheduler.push(("free", i), user_id="free")
+    first = _drain(scheduler)[:8]
+    assert sum(user == "gold" for user, _ in first) == 6
+
+
+def test_urgency_classes_and_recency():
+    metrics.reset()
+    scheduler = FairScheduler()
+    scheduler.push("old-routine", user_id="a", priority="low", recency=1)
+    scheduler.push("new-routine", user_id="a", priority="low", recency=2)
+    scheduler.push("discharge", user_id="b", priority="high")
+    scheduler.push("lab", user_id="c", priority="medium")
+    assert _drain(scheduler) == ["discharge", "lab", "new-routine", "old-routine"]
+    waits = metrics.histograms["queue_wait_seconds"]
+    assert {dict(key)["priority"] for key in waits} == {"high", "medium", "low"}
+
+
+def test_triage_plan():
+    triage = UrgencyTriage("heuristic")
+    records = [
+        {"id": "r1", "kind": "prescription", "created_at": "2025-01-01T00:00:00"},
+        {"id": "r2", "file_url": ".../discharge_summary.png"},
+        {"id": "r3", "kind": "lab_report", "created_at": "2025-02-01T00:00:00+00:00"},
+    ]
+    plan = triage.plan({"id": "p1"}, records)
+    assert plan["priority"] == "high" and plan["cost"] == 3
+    assert plan["recency"] > 0
+    assert triage.plan({"id": "p1"}, records[:1])["priority"] == "low"
+    assert triage.plan({"id": "p1"}, records[:1], {"r1": "High"})["priority"] == "high"
+    assert (
+        triage.plan({"id": "p1", "priority": True}, records[:1])["priority"] == "high"
+    )
+    assert priority_class("Medium") == priority_class(None) == "medium"
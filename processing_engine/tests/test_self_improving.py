@@ -0,0 +1,67 @@
+import copy
+import threading
+import dspy
+from types import SimpleNamespace
+from processing_engine.benchmarks.fakes import FakeLM
+from processing_engine.common.dspy_modules import selfImprovingModule
+
+
+def test_prediction_is_one_call_and_refinement_runs_off_path():
+    module = selfImprovingModule(history_size=5, refine_every=4)
+    lm = FakeLM()
+    with dspy.context(lm=lm):
+        result = module(input="fever and body ache")
+        assert lm.calls == 1 and "improvement" not in result
+
+        for i in range(3):
+            module(input=f"case {i}", actual="Paracetamol")
+        assert lm.calls == 4 and module.refinements == 0
+
+        module(input="case 3", actual="Paracetamol")
+        module.wait_for_refinement()
+        # 4 evaluations + 1 refine, batched in the background
+        assert lm.calls == 5 + 5 and module.refinements == 1
+        assert module.strategy == "Prefer generic names."
+        assert module.examples[-1]["evaluation"]["score"] == "0.7"
+
+        calls = lm.calls
+        result = module(input="headache")
+        assert lm.calls == calls + 1
+        assert result["improvement"] == "Prefer generic names."
+
+        for i in range(10):
+            module(input=f"more {i}", actual="Paracetamol")
+        module.wait_for_refinement()
+    assert len(module.examples) == 5
+
+
+def test_module_state_is_still_serializable():
+    module = selfImprovingModule()
+    assert "predict" in str(module.dump_state())
+    copy.deepcopy(module)
+    module.deepcopy()
+
+
+def test_refinement_sees_its_own_batch():
+    module = selfImprovingModule(history_size=10, refine_every=2)
+    release = threading.Event()
+    seen = []
+
+    def evaluate(prediction, actual):
+        release.wait(5)
+        return SimpleNamespace(score="0.5", feedback=f"check {actual}")
+
+    def refine(feedback, previous_examples):
+        seen.append([entry["input"] for entry in previous_examples])
+        return SimpleNamespace(improved_strategy="Prefer generic names.")
+
+    module.evaluate, module.refine = evaluate, refine
+    with dspy.context(lm=FakeLM()):
+        module(input="first", actual="A")
+        module(input="second", actual="B")
+        # Arrive while the first batch is still being evaluated
+        module(input="third", actual="C")
+        module(input="fourth", actual="D")
+        release.set()
+        module.wait_for_refinement()
+    assert seen[0] == ["first", "second"]
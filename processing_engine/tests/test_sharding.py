@@ -0,0 +1,23 @@
+import pytest
+from processing_engine.common.sharding import (
+    filter_shard,
+    parse_shard,
+    shard_for,
+)
+
+
+def test_parse_shard():
+    assert parse_shard("0/4") == (0, 4)
+    assert parse_shard("3/4") == (3, 4)
+    for bad in ["4/4", "-1/4", "1/0", "abc", "1"]:
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def test_shards_partition_rows():
+    rows = [{"id": f"patient-{i}"} for i in range(200)]
+    slices = [filter_shard(rows, i, 4) for i in range(4)]
+    assert sum(len(s) for s in slices) == len(rows)
+    assert all(slices)
+    # Stable: the same id always maps to the same shard
+    assert shard_for("patient-7", 4) == shard_for("patient-7", 4)
@@ -0,0 +1,30 @@
+import time
+import pytest
+import dspy
+from processing_engine.benchmarks.fakes import FakeLM
+from processing_engine.usecases.ayurlekha.modules import SectionalPatientDemographics
+
+
+def test_sections_run_concurrently_and_assemble():
+    module = SectionalPatientDemographics()
+    latency = 0.2
+    with dspy.context(lm=FakeLM(latency=latency)):
+        start = time.perf_counter()
+        summary = module(medical_history="History.", patient_id="p1", user_id="u1")
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < latency * len(module.sections) / 2
+    assert summary.patient["name"] == "Test Patient"
+    assert summary.patient["id"] == "p1"
+    assert summary.medications[0]["name"] == "Paracetamol"
+    assert summary.historyTimeline and summary.labTests
+    assert summary.meta["patient_id"] == "p1"
+    assert summary.footer["generatedBy"] == "Ayurlekha App"
+
+
+def test_failed_section_fails_the_summary():
+    module = SectionalPatientDemographics()
+    module.sections[3].forward = lambda medical_history: 1 / 0
+    with dspy.context(lm=FakeLM()):
+        with pytest.raises(RuntimeError, match=module.sections[3].name):
+            module(medical_history="History.")
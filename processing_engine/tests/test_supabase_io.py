@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from processing_engine.benchmarks.fakes import FakeSupabase
+from processing_engine.common import supabase_io
+from processing_engine.common.supabase_io import (
+    upload_bytes_to_supabase,
+    upload_many_to_supabase,
+)
+
+
+def _client(monkeypatch, client=None):
+    client = client or FakeSupabase()
+    monkeypatch.setattr(supabase_io, "supabase", client)
+    monkeypatch.setattr(supabase_io, "UPLOAD_DEBUG_DIR", None)
+    return client
+
+
+def test_upload_bytes_sets_content_type_and_upsert(monkeypatch):
+    client = _client(monkeypatch)
+    storage = client.storage
+    upload_bytes_to_supabase("docs", "a.json", {"ok": True})
+    upload_bytes_to_supabase("docs", "b.txt", "text")
+    upload_bytes_to_supabase("docs", "c.bin", b"\x00", content_type="image/png")
+    assert json.loads(storage.objects[("docs", "a.json")]) == {"ok": True}
+    assert storage.file_options[("docs", "a.json")] == {
+        "content-type": "application/json"
+    }
+    assert (
+        storage.file_options[("docs", "b.txt")]["content-type"]
+        == "text/plain; charset=utf-8"
+    )
+    assert storage.file_options[("docs", "c.bin")]["content-type"] == "image/png"
+
+    upload_bytes_to_supabase("docs", "a.json", b"new", upsert=True, cache_control=60)
+    assert storage.objects[("docs", "a.json")] == b"new"
+    assert storage.file_options[("docs", "a.json")] == {
+        "content-type": "application/octet-stream",
+        "upsert": "true",
+        "cache-control": "60",
+    }
+
+
+def test_upload_many_reports_each_object_and_partial_failure(monkeypatch):
+    client = _client(monkeypatch)
+    client.storage.objects[("docs", "taken.json")] = b"old"
+    uploads = [
+        {"bucket": "docs", "remote_path": "one.json", "data": {"n": 1}},
+        {"bucket": "docs", "remote_path": "taken.json", "data": {"n": 2}},
+        {
+            "bucket": "docs",
+            "remote_path": "three.txt",
+            "data": "3",
+            "content_type": "text/markdown",
+        },
+    ]
+    results = upload_many_to_supabase(uploads)
+    assert [r["remote_path"] for r in results] == [
+        "one.json",
+        "taken.json",
+        "three.txt",
+    ]
+    assert [r["ok"] for r in results] == [True, False, True]
+    assert "already exists" in results[1]["error"]
+    assert client.storage.objects[("docs", "taken.json")] == b"old"
+    assert (
+        client.storage.file_options[("docs", "three.txt")]["content-type"]
+        == "text/markdown"
+    )
+
+    # upsert overwrites the existing object
+    results = upload_many_to_supabase(uploads[1:2], upsert=True)
+    assert results[0]["ok"] and results[0]["error"] is None
+    assert json.loads(client.storage.objects[("docs", "taken.json")]) == {"n": 2}
+    assert upload_many_to_supabase([]) == []
+
+
+def test_upload_many_bounds_concurrency(monkeypatch):
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    class CountingBucket:
+        def upload(self, path, file, file_options=None):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.02)
+            with lock:
+                active["now"] -= 1
+
+    class CountingClient:
+        class storage:
+            @staticmethod
+            def from_(bucket):
+                return CountingBucket()
+
+    _client(monkeypatch, CountingClient())
+    uploads = [
+        {"bucket": "docs", "remote_path": f"{i}.json", "data": {}} for i in range(12)
+    ]
+    results = upload_many_to_supabase(uploads, max_workers=3)
+    assert all(r["ok"] for r in results)
+    assert 1 < active["peak"] <= 3
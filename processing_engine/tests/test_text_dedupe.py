@@ -0,0 +1,111 @@
+from processing_engine.common.text_dedupe import (
+    FactDeduper,
+    dedupe_analyses,
+    split_facts,
+)
+
+
+def test_split_facts_keeps_abbreviations():
+    facts = split_facts("Seen by Dr. Rao today. BP was 120/80.\n\n- Amlodipine 5mg OD")
+    assert facts == ["Seen by Dr. Rao today.", "BP was 120/80.", "- Amlodipine 5mg OD"]
+
+
+def test_exact_and_near_duplicates_share_provenance():
+    deduper = FactDeduper()
+    first = deduper.add(
+        "Patient has a long standing history of type 2 diabetes mellitus and hypertension.",
+        "r1",
+    )
+    assert (
+        deduper.add(
+            "- **Patient has a long standing history of type 2 diabetes mellitus and hypertension**",
+            "r2",
+        )
+        == first
+    )
+    assert (
+        deduper.add(
+            "The patient has a long standing history of type 2 diabetes mellitus and hypertension",
+            "r3",
+        )
+        == first
+    )
+    assert deduper.facts[first]["sources"] == ["r1", "r2", "r3"]
+    assert deduper.exact_duplicates == 1
+    assert deduper.near_duplicates == 1
+
+
+def test_facts_with_different_numbers_are_not_merged():
+    deduper = FactDeduper(threshold=0.5)
+    a = deduper.add(
+        "Patient continues on tablet amlodipine 5mg once daily after breakfast for blood pressure control",
+        "r1",
+    )
+    b = deduper.add(
+        "Patient continues on tablet amlodipine 10mg once daily after breakfast for blood pressure control",
+        "r2",
+    )
+    assert a != b
+
+
+def test_dedupe_analyses_carries_each_fact_once():
+    header = "Patient: Ravi Kumar, 54 years, male.\nKnown hypertensive since 2015."
+    analyses = [
+        ("r1", header + "\n**Medications:**\n- Amlodipine 5mg once daily"),
+        ("r2", header + "\n**Medications:**\n- Amlodipine 5mg once daily"),
+        ("r3", header + "\n**Medications:**\n- Metformin 500mg twice daily"),
+    ]
+    text, deduper = dedupe_analyses(analyses)
+    assert text.count("Ravi Kumar") == 1
+    assert "Known hypertensive since 2015. (in 3 records)" in text
+    assert text.count("Amlodipine") == 1
+    # r2 adds nothing new, r3 keeps its heading for the new medication
+    assert "record r2" not in text
+    assert "record r3 ---\n**Medications:**\n- Metformin" in text
+    assert len(deduper.facts) == 4
+
+
+MEDICATION_LIST = """**Medications:**
+1. Amlodipine
+   - Dosage: 5 mg
+   - Frequency: Once daily
+   - Duration: 30 days
+2. Metformin
+   - Dosage: 500 mg
+   - Frequency: Once daily
+   - Duration: 30 days
+3. Atorvastatin
+- Frequency: Once daily at bedtime, after food, with water
+- Duration: 30 days
+4. Rosuvastatin
+- Frequency: Once daily at bedtime, after food, with water
+- Duration: 30 days"""
+
+
+def test_list_items_keep_their_attribute_lines():
+    facts = split_facts(MEDICATION_LIST)
+    assert facts[0] == "**Medications:**"
+    assert facts[2] == (
+        "2. Metformin\n- Dosage: 500 mg\n- Frequency: Once daily\n- Duration: 30 days"
+    )
+    assert len(facts) == 5
+    assert split_facts("1. Amlodipine 5mg. Take after food.") == [
+        "1. Amlodipine 5mg. Take after food."
+    ]
+
+
+def test_medication_schedules_survive_dedupe():
+    deduper = FactDeduper()
+    text = deduper.novel_text(MEDICATION_LIST, "r1")
+    # Every drug keeps its dosing, also when its schedule repeats the one before
+    for item in split_facts(MEDICATION_LIST)[1:]:
+        assert item in text
+    assert text.count("Duration: 30 days") == 4
+
+    # The same list from a later record adds nothing; a new drug comes with its own schedule
+    assert deduper.novel_text(MEDICATION_LIST, "r2") == ""
+    later = MEDICATION_LIST.replace("4. Rosuvastatin", "4. Telmisartan")
+    assert deduper.novel_text(later, "r3") == (
+        "**Medications:**\n4. Telmisartan\n- Frequency: Once daily at bedtime, after food, "
+        "with water\n- Duration: 30 days"
+    )
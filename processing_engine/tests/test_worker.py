@@ -0,0 +1,118 @@
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+from processing_engine import main
+from processing_engine.common import checkpoint, plugins
+from processing_engine.common.health import HealthServer
+
+PLUGIN = """
+import threading
+import time
+from processing_engine.common import checkpoint
+
+polls = []
+warm_ups = []
+configs = []
+poll_seconds = 0.0
+stop_after = None
+
+
+def warm_up(check):
+    warm_ups.append(1)
+    check("db", lambda: None)
+    return "client"
+
+
+def process(**kwargs):
+    polls.append(kwargs)
+    if stop_after is not None and len(polls) >= stop_after:
+        checkpoint._stop_event.set()
+    time.sleep(poll_seconds)
+
+
+def reload(config):
+    configs.append(config)
+"""
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch):
+    (tmp_path / "echo_worker_plugin.py").write_text(PLUGIN)
+    folder = tmp_path / "echo"
+    folder.mkdir()
+    (folder / plugins.MANIFEST_NAME).write_text(
+        json.dumps(
+            {"name": "echo", "module": "echo_worker_plugin", "ready_checks": ["db"]}
+        )
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    manifests = plugins.discover(str(tmp_path))
+    monkeypatch.setattr(plugins, "discover", lambda root=None: manifests)
+    monkeypatch.setattr(plugins, "_loaded", {})
+    monkeypatch.setattr(checkpoint, "_stop_event", threading.Event())
+    yield
+    sys.modules.pop("echo_worker_plugin", None)
+
+
+def _readyz(server):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/readyz") as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_worker_warms_up_and_runs_one_cycle(plugin):
+    worker = main.Worker(["echo"], interval=60)
+    server = HealthServer(worker.status, host="127.0.0.1", port=0).start()
+    try:
+        assert _readyz(server) == 503
+        worker.start()
+        assert _readyz(server) == 200
+        module = worker.usecases["echo"].module
+        module.stop_after = 1
+        start = time.perf_counter()
+        worker.run()
+        # The stop ends the wait for the next cycle instead of sleeping out the interval
+        assert time.perf_counter() - start < 5
+    finally:
+        server.stop()
+    assert module.polls == [{"supabase": "client"}]
+    assert worker.cycles == {"echo": 1} and "echo" in worker.last_cycle_at
+    assert worker.checks["echo:db"]["ok"]
+
+
+def test_reload_hands_fresh_config_to_plugins(plugin, monkeypatch):
+    worker = main.Worker(["echo"])
+    worker.start()
+    module = worker.usecases["echo"].module
+    monkeypatch.setattr(main, "load_dotenv", lambda override: None)
+    monkeypatch.setenv("QUALITY_EVAL_SAMPLE_RATE", "0.5")
+    monkeypatch.setitem(main.config, "QUALITY_EVAL_SAMPLE_RATE", 0.05)
+
+    worker.reload()
+
+    assert module.configs[-1]["QUALITY_EVAL_SAMPLE_RATE"] == 0.5
+    assert main.config["QUALITY_EVAL_SAMPLE_RATE"] == 0.5
+    assert module.warm_ups == [1, 1]
+    assert worker.state == "idle"
+
+
+def test_stop_drains_the_cycle_in_flight(plugin):
+    worker = main.Worker(["echo"], interval=60)
+    worker.start()
+    module = worker.usecases["echo"].module
+    module.poll_seconds = 0.3
+    runner = threading.Thread(target=worker.run)
+    runner.start()
+    while not module.polls:
+        time.sleep(0.01)
+    # SIGTERM mid-cycle: the poll finishes, no new one starts
+    checkpoint._stop_event.set()
+    runner.join(timeout=5)
+    assert not runner.is_alive()
+    assert len(module.polls) == 1 and worker.cycles == {"echo": 1}
@@ -0,0 +1,248 @@
+"""
+Teacher-student distillation of the ayurlekha programs onto a smaller model (MedGemma by default).
+
+The pipeline records teacher (Gemini) input/output pairs to DISTILL_CAPTURE_DIR while a program is not yet
+compiled. This script turns a capture file into a train/dev split, optimizes a student predictor against
+the teacher's outputs, and saves it to COMPILED_PROGRAMS_DIR only if its dev score passes the quality gate.
+Modules pick up saved programs at construction (see common/compiled_programs.py).
+
+    python -m processing_engine.usecases.ayurlekha.distill metadata --optimizer bootstrap --gate 0.8
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timezone
+import dspy
+from processing_engine.common.compiled_programs import save_compiled
+from processing_engine.common.config import load_config
+from processing_engine.common.dspy_modules import compare_with_expected_data
+from processing_engine.common.inference_profiles import STRATEGIES, profile_lm
+from processing_engine.common.logger import get_logger
+from processing_engine.common.quality_eval import parse_score
+from processing_engine.usecases.ayurlekha.signatures import (
+    AyurlekhaSummarySignature,
+    DocumentMetadataSignature,
+    DocumentTextSignature,
+    DocumentProcessorSignature,
+)
+
+logger = get_logger("ayurlekha.distill")
+
+config = load_config()
+
+PROGRAMS = {
+    "analysis": DocumentProcessorSignature,
+    "text_analysis": DocumentTextSignature,
+    "metadata": DocumentMetadataSignature,
+    "summary": AyurlekhaSummarySignature,
+}
+OPTIMIZERS = ("labeled", "bootstrap", "mipro")
+
+
+class _Student(dspy.Module):
+    def __init__(self, signature, strategy: str):
+        super().__init__()
+        self.predictor = STRATEGIES[strategy](signature)
+
+    def forward(self, **inputs):
+        return self.predictor(**inputs)
+
+
+def load_examples(path: str, signature):
+    """Captured JSONL -> dspy.Example list; image inputs are loaded from their copied files."""
+    input_names = list(signature.input_fields)
+    output_names = list(signature.output_fields)
+    examples = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            inputs = dict(record["inputs"])
+            for name in input_names:
+                if name.endswith("_image") and name in inputs:
+                    inputs[name] = dspy.Image.from_file(inputs[name])
+            outputs = {name: record["outputs"].get(name) for name in output_names}
+            examples.append(dspy.Example(**inputs, **outputs).with_inputs(*input_names))
+    return examples
+
+
+def split_examples(examples, dev_share: float = 0.2, seed: int = 0):
+    """Deterministic train/dev split."""
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    n_dev = max(1, int(len(shuffled) * dev_share)) if len(shuffled) > 1 else 0
+    return shuffled[n_dev:], shuffled[:n_dev]
+
+
+def make_metric(signature, judge_lm, threshold: float):
+    """
+    compare_with_expected_data score of a prediction against the teacher output (0-1).
+    During bootstrapping (trace is set) it is a pass/fail at `threshold`.
+    """
+    comparer = compare_with_expected_data()
+    output_names = list(signature.output_fields)
+
+    def metric(example, prediction, trace=None):
+        expected = {name: example.get(name) for name in output_names}
+        produced = {name: getattr(prediction, name, None) for name in output_names}
+        with dspy.context(lm=judge_lm):
+            # The raw judge output: "8/10" or "85" must be rescaled, not clamped to 1
+            judged = comparer.predictor(
+                existing_data=json.dumps(expected, default=str),
+                new_data=json.dumps(produced, default=str),
+            )
+        score = parse_score(getattr(judged, "quality", None))
+        score = 0.0 if score is None else min(max(score, 0.0), 1.0)
+        return score >= threshold if trace is not None else score
+
+    return metric
+
+
+def evaluate(program, examples, metric, lm) -> float:
+    """Mean metric over `examples`; failed predictions score 0."""
+    if not examples:
+        return 0.0
+    scores = []
+    with dspy.context(lm=lm):
+        for example in examples:
+            try:
+                scores.append(metric(example, program(**example.inputs())))
+            except Exception as e:
+                logger.error(f"[distill] Evaluation failed: {e}")
+                scores.append(0.0)
+    return sum(scores) / len(scores)
+
+
+def compile_program(
+    program: str,
+    examples,
+    student_lm,
+    teacher_lm,
+    student_model: str,
+    optimizer: str = "bootstrap",
+    strategy: str = "cot",
+    gate: float = 0.8,
+    threshold: float = 0.8,
+    max_demos: int = 4,
+    root: str = None,
+    seed: int = 0,
+):
+    """
+    Optimize a student predictor for `program` on captured teacher examples and save it if the dev score
+    reaches `gate`. Returns the report dict; report["saved"] says whether the gate passed.
+    """
+    signature = PROGRAMS[program]
+    trainset, devset = split_examples(examples, seed=seed)
+    metric = make_metric(signature, teacher_lm, threshold)
+
+    baseline = _Student(signature, strategy)
+    baseline_score = evaluate(baseline, devset, metric, student_lm)
+
+    with dspy.context(lm=student_lm):
+        if optimizer == "labeled":
+            compiled = dspy.LabeledFewShot(k=max_demos).compile(
+                _Student(signature, strategy), trainset=trainset
+            )
+        elif optimizer == "bootstrap":
+            compiled = dspy.BootstrapFewShot(
+                metric=metric,
+                teacher_settings={"lm": teacher_lm},
+                max_bootstrapped_demos=max_demos,
+                max_labeled_demos=max_demos,
+            ).compile(_Student(signature, strategy), trainset=trainset)
+        elif optimizer == "mipro":
+            compiled = dspy.MIPROv2(
+                metric=metric,
+                prompt_model=teacher_lm,
+                task_model=student_lm,
+                teacher_settings={"lm": teacher_lm},
+                max_bootstrapped_demos=max_demos,
+                max_labeled_demos=max_demos,
+                seed=seed,
+            ).compile(
+                _Student(signature, strategy),
+                trainset=trainset,
+                valset=devset or None,
+                requires_permission_to_run=False,
+            )
+        else:
+            raise ValueError(f"Unknown optimizer {optimizer}")
+    score = evaluate(compiled, devset, metric, student_lm)
+
+    report = {
+        "program": program,
+        "model": student_model,
+        "strategy": strategy,
+        "optimizer": optimizer,
+        "teacher": getattr(teacher_lm, "model", str(teacher_lm)),
+        "score": score,
+        "baseline_score": baseline_score,
+        "gate": gate,
+        "n_train": len(trainset),
+        "n_dev": len(devset),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    report["saved"] = bool(devset) and score >= gate
+    if report["saved"]:
+        save_compiled(program, compiled.predictor, report, root)
+    else:
+        logger.warning(
+            f"[distill] {program} student scored {score:.3f} (baseline {baseline_score:.3f}) "
+            f"on {len(devset)} dev examples; gate {gate} not met, keeping the teacher"
+        )
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("program", choices=sorted(PROGRAMS))
+    parser.add_argument(
+        "--examples",
+        default=None,
+        help="Captured JSONL (default: {DISTILL_CAPTURE_DIR}/{program}.jsonl)",
+    )
+    parser.add_argument("--student", default="medgemma", help="Student model")
+    parser.add_argument("--teacher", default="gemini", help="Teacher / judge model")
+    parser.add_argument("--optimizer", choices=OPTIMIZERS, default="bootstrap")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="cot")
+    parser.add_argument(
+        "--gate", type=float, default=0.8, help="Minimum mean dev score to save"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.8,
+        help="Per-example score a bootstrapped demo must reach",
+    )
+    parser.add_argument("--max-demos", type=int, default=4)
+    parser.add_argument("--out", default=None, help="Compiled programs directory")
+    args = parser.parse_args(argv)
+
+    path = args.examples or os.path.join(
+        config["DISTILL_CAPTURE_DIR"] or ".", f"{args.program}.jsonl"
+    )
+    examples = load_examples(path, PROGRAMS[args.program])
+    logger.info(f"[distill] Loaded {len(examples)} {args.program} examples from {path}")
+    report = compile_program(
+        args.program,
+        examples,
+        student_lm=profile_lm({"model": args.student}),
+        teacher_lm=profile_lm({"model": args.teacher}),
+        student_model=args.student,
+        optimizer=args.optimizer,
+        strategy=args.strategy,
+        gate=args.gate,
+        threshold=args.threshold,
+        max_demos=args.max_demos,
+        root=args.out,
+    )
+    print(json.dumps(report, indent=2))
+    return 0 if report["saved"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,20 @@
 import dspy
 from typing import List, Dict, Any
+from processing_engine.common.compiled_programs import apply_compiled
+from processing_engine.common.inference_profiles import make_predictor
+from processing_engine.common.logger import get_logger
+from processing_engine.common.metrics import metrics
 from processing_engine.common.web_tools import web_verify_medicine
 from .signatures import DocumentProcessorSignature
+from .signatures import DocumentTextSignature
 from .signatures import AyurlekhaSummarySignature
 from .signatures import DocumentMetadataSignature
+from .signatures import SUMMARY_SECTIONS, section_signature
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+import contextvars
+
+logger = get_logger("ayurlekha.modules")
 
 
 class MedicineFactChecker(dspy.Module):
@@ -29,7 +39,9 @@ class MedicineFactChecker(dspy.Module):
             f"Verify if '{medicine_name}' is a real pharmaceutical drug or medication"
         )
         try:
-            result = self.react(medicine_verification_query=query)
+            with metrics.timer("medicine_verification_seconds"):
+                result = self.react(medicine_verification_query=query)
+            metrics.inc("medicine_verifications_total", status="verified")
             return {
                 "medicine": medicine_name,
                 "if_medicine": result.if_medicine,
@@ -38,6 +50,7 @@ class MedicineFactChecker(dspy.Module):
                 "status": "verified",
             }
         except Exception as e:
+            metrics.inc("medicine_verifications_total", status="error")
             return {
                 "medicine": medicine_name,
                 "if_medicine": "",
@@ -61,6 +74,18 @@ class MedicineFactChecker(dspy.Module):
         return results
 
 
+def verify_analysis(medicine_checker, prediction) -> dspy.Prediction:
+    """A document analysis `prediction` with each extracted medicine checked by `medicine_checker`."""
+    medicine_verifications = medicine_checker.verify_multiple_medicines(
+        prediction.extracted_medicines
+    )
+    return dspy.Prediction(
+        detailed_analysis=prediction.detailed_analysis,
+        medicine_verifications=medicine_verifications,
+        extracted_medicines=prediction.extracted_medicines,
+    )
+
+
 class DocumentProcessor(dspy.Module):
     """
     Module to process a medical document image and extract structured information, including detailed analysis and medicine verification.
@@ -68,21 +93,36 @@ class DocumentProcessor(dspy.Module):
 
     def __init__(self):
         super().__init__()
-        self.predictor = dspy.ChainOfThought(DocumentProcessorSignature)
+        self.predictor = make_predictor("DocumentProcessor", DocumentProcessorSignature)
+        self.compiled = apply_compiled(self, "analysis", DocumentProcessorSignature)
         self.medicine_checker = MedicineFactChecker()
 
     def forward(self, document_image):
         """
         Process the document image and return detailed analysis and verified medicines.
         """
-        prediction = self.predictor(document_image=document_image)
-        medicine_verifications = self.medicine_checker.verify_multiple_medicines(
-            prediction.extracted_medicines
+        return verify_analysis(
+            self.medicine_checker, self.predictor(document_image=document_image)
         )
-        return dspy.Prediction(
-            detailed_analysis=prediction.detailed_analysis,
-            medicine_verifications=medicine_verifications,
-            extracted_medicines=prediction.extracted_medicines,
+
+
+class DocumentTextProcessor(dspy.Module):
+    """
+    Text-only counterpart of DocumentProcessor for documents whose OCR text is reliable. Defaults to plain
+    Predict; the "DocumentTextProcessor" inference profile can move it to the local model.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.predictor = make_predictor(
+            "DocumentTextProcessor", DocumentTextSignature, default="predict"
+        )
+        self.compiled = apply_compiled(self, "text_analysis", DocumentTextSignature)
+        self.medicine_checker = MedicineFactChecker()
+
+    def forward(self, document_text: str):
+        return verify_analysis(
+            self.medicine_checker, self.predictor(document_text=document_text)
         )
 
 
@@ -93,12 +133,33 @@ class DocumentMetadataModule(dspy.Module):
 
     def __init__(self):
         super().__init__()
-        self.predictor = dspy.ChainOfThought(DocumentMetadataSignature)
+        self.predictor = make_predictor(
+            "DocumentMetadataModule", DocumentMetadataSignature
+        )
+        self.compiled = apply_compiled(self, "metadata", DocumentMetadataSignature)
 
     def forward(self, detailed_analysis: str) -> dspy.Prediction:
         return self.predictor(detailed_analysis=detailed_analysis)
 
 
+def default_footer(today_str: str) -> Dict[str, Any]:
+    return {
+        "date": today_str,
+        "generatedBy": "Ayurlekha App",
+        "notMedicalDocument": "Not a Medical Document",
+        "disclaimer": "This document is a summary for informational purposes only and does not replace professional medical advice, diagnosis, or treatment. Always consult with a qualified healthcare provider for any medical concerns.",
+    }
+
+
+def default_meta(generated_at: str, patient_id: str = None, user_id: str = None):
+    return {
+        "version": "1.0",
+        "generated_at": generated_at,
+        "patient_id": patient_id or "",
+        "user_id": user_id or "",
+    }
+
+
 class PatientDemographics(dspy.Module):
     """
     Module to extract and synthesize all patient demographic and medical summary fields required for the Ayurlekha JSON template.
@@ -106,7 +167,10 @@ class PatientDemographics(dspy.Module):
 
     def __init__(self):
         super().__init__()
-        self.predictor = dspy.ChainOfThought(AyurlekhaSummarySignature)
+        self.predictor = make_predictor(
+            "PatientDemographics", AyurlekhaSummarySignature
+        )
+        self.compiled = apply_compiled(self, "summary", AyurlekhaSummarySignature)
 
     def forward(
         self, medical_history: str, patient_id: str = None, user_id: str = None
@@ -144,23 +208,13 @@ class PatientDemographics(dspy.Module):
         footer = (
             prediction.footer
             if hasattr(prediction, "footer")
-            else {
-                "date": today_str,
-                "generatedBy": "Ayurlekha App",
-                "notMedicalDocument": "Not a Medical Document",
-                "disclaimer": "This document is a summary for informational purposes only and does not replace professional medical advice, diagnosis, or treatment. Always consult with a qualified healthcare provider for any medical concerns.",
-            }
+            else default_footer(today_str)
         )
         # Meta
         meta = (
             prediction.meta
             if hasattr(prediction, "meta")
-            else {
-                "version": "1.0",
-                "generated_at": generated_at,
-                "patient_id": patient_id or "",
-                "user_id": user_id or "",
-            }
+            else default_meta(generated_at, patient_id, user_id)
         )
         return dspy.Prediction(
             patient=patient,
@@ -175,3 +229,88 @@ class PatientDemographics(dspy.Module):
             footer=footer,
             meta=meta,
         )
+
+
+class SummarySection(dspy.Module):
+    """
+    Predictor for one Ayurlekha summary section. A module of its own so LM metrics and traces
+    are attributed to summary sections rather than to the bare predictor.
+    """
+
+    def __init__(self, name: str, item_signature, shape: str):
+        super().__init__()
+        self.name = name
+        self.item_signature = item_signature
+        self.shape = shape
+        self.predictor = make_predictor(
+            f"SummarySection.{name}", section_signature(name, item_signature, shape)
+        )
+
+    def empty(self):
+        return {"one": {}, "many": [], "text": ""}[self.shape]
+
+    def forward(self, medical_history: str):
+        prediction = self.predictor(medical_history=medical_history)
+        if self.shape == "one":
+            return {
+                field: getattr(prediction, field, None)
+                for field in self.item_signature.output_fields
+            }
+        return getattr(prediction, self.name, None) or self.empty()
+
+
+class SectionalPatientDemographics(dspy.Module):
+    """
+    Section-parallel alternative to PatientDemographics: each summary section is extracted by its own
+    smaller predictor over the same context, concurrently, so wall time is roughly the slowest section
+    instead of one long completion. Footer and meta are filled in code. If any section fails the whole
+    summary fails, so its records stay pending instead of being published with an empty section.
+    """
+
+    def __init__(self, max_workers: int = None):
+        super().__init__()
+        self.sections = [
+            SummarySection(name, item_signature, shape)
+            for name, item_signature, shape in SUMMARY_SECTIONS
+        ]
+        self.max_workers = max_workers or len(self.sections)
+
+    def _run_section(self, section, medical_history: str):
+        try:
+            with metrics.timer("summary_section_seconds", section=section.name):
+                return section(medical_history=medical_history)
+        except Exception as e:
+            metrics.inc("summary_section_errors_total", section=section.name)
+            logger.error(f"[summary] Section {section.name} failed: {e}")
+            raise
+
+    def forward(
+        self, medical_history: str, patient_id: str = None, user_id: str = None
+    ) -> dspy.Prediction:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # Each task runs in a copy of the caller's context so dspy.context overrides apply
+            futures = [
+                pool.submit(
+                    contextvars.copy_context().run,
+                    self._run_section,
+                    section,
+                    medical_history,
+                )
+                for section in self.sections
+            ]
+            results, failed = {}, []
+            for section, future in zip(self.sections, futures):
+                try:
+                    results[section.name] = future.result()
+                except Exception:
+                    failed.append(section.name)
+        if failed:
+            raise RuntimeError(f"Summary sections failed: {', '.join(failed)}")
+        now = datetime.now(timezone.utc)
+        if patient_id and not results["patient"].get("id"):
+            results["patient"]["id"] = patient_id
+        return dspy.Prediction(
+            **results,
+            footer=default_footer(now.strftime("%Y-%m-%d")),
+            meta=default_meta(now.isoformat(), patient_id, user_id),
+        )
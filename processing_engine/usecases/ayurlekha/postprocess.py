@@ -0,0 +1,96 @@
+"""
+Deterministic post-processing of LM outputs for Ayurlekha: date normalization, end dates from durations,
+"outdated" flags against today, and chronological ordering. The LM only extracts the raw facts.
+"""
+
+from datetime import date, datetime, timezone
+from processing_engine.common.dates import (
+    add_duration,
+    format_date,
+    normalize_date,
+    parse_duration,
+    parse_fuzzy_date,
+)
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def resolve_course(item, today: date = None):
+    """
+    Fill start_date, end_date, is_outdated and outdated_reason of a medication/action dict from its
+    start_date, duration and any end_date stated in the document. Returns a new dict; strings are passed through.
+    """
+    if not isinstance(item, dict):
+        return item
+    today = today or _today()
+    item = dict(item)
+    start = parse_fuzzy_date(item.get("start_date"))
+    if start:
+        item["start_date"] = format_date(*start)
+    end = parse_fuzzy_date(item.get("end_date"))
+    if end is None and start:
+        duration = parse_duration(item.get("duration"))
+        if duration:
+            end = add_duration(start[0], *duration), start[1]
+    if end:
+        end_date, precision = end
+        item["end_date"] = format_date(end_date, precision)
+        # A month/year precision end is outdated only once that whole period has passed
+        if precision == "month":
+            period_end = add_duration(end_date, months=1)
+        elif precision == "year":
+            period_end = add_duration(end_date, months=12)
+        else:
+            period_end = add_duration(end_date, days=1)
+        item["is_outdated"] = period_end <= today
+        # Without today's date, so the published summary (and its ETag) stays the same from day to day
+        item["outdated_reason"] = (
+            f"Ended on {item['end_date']}" if item["is_outdated"] else ""
+        )
+    else:
+        item["end_date"] = item.get("end_date") or ""
+        item["is_outdated"] = False
+        item["outdated_reason"] = ""
+    return item
+
+
+def sort_chronologically(items, field: str = "date"):
+    """Normalize each item's date and sort oldest first; undated items keep their order at the end."""
+    dated, undated = [], []
+    for position, item in enumerate(items or []):
+        if not isinstance(item, dict):
+            undated.append(item)
+            continue
+        item = dict(item)
+        parsed = parse_fuzzy_date(item.get(field))
+        if parsed:
+            item[field] = format_date(*parsed)
+            dated.append((parsed[0], position, item))
+        else:
+            undated.append(item)
+    return [item for _, _, item in sorted(dated, key=lambda t: t[:2])] + undated
+
+
+def postprocess_summary(summary: dict, today: date = None) -> dict:
+    """Apply the deterministic rules to an Ayurlekha summary dict."""
+    summary = dict(summary)
+    summary["medications"] = [
+        resolve_course(item, today) for item in summary.get("medications") or []
+    ]
+    summary["historyTimeline"] = sort_chronologically(summary.get("historyTimeline"))
+    summary["labTests"] = sort_chronologically(summary.get("labTests"))
+    return summary
+
+
+def postprocess_metadata(metadata: dict, today: date = None) -> dict:
+    """Apply the deterministic rules to a per-document metadata dict."""
+    metadata = dict(metadata)
+    metadata["date"] = normalize_date(metadata.get("date"))
+    for field in ("actions", "medications"):
+        metadata[field] = [
+            resolve_course(item, today) for item in metadata.get(field) or []
+        ]
+    metadata["lab_tests"] = sort_chronologically(metadata.get("lab_tests"))
+    return metadata
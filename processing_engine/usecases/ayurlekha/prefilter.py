@@ -0,0 +1,155 @@
+"""
+Cheap local check for obviously non-medical uploads (selfies, holiday photos, app screenshots), run before
+the vision analysis so they do not cost a DocumentProcessor and a metadata call.
+
+Features come from a 64x64 thumbnail (needs Pillow, optional) and, when the OCR pre-pass ran, its text:
+
+- colourfulness (Hasler and Suesstrunk) and the share of paper-white pixels: scans and photographed
+  pages are mostly low-saturation bright background, photos of people and places are not;
+- the number of recognised words and of medical terms or dosage units among them, and the OCR confidence.
+
+Only clear cases are rejected, each with a reason; anything with medical vocabulary, and anything the
+rules are unsure about, goes on to the full analysis. Every rule needs the OCR text, so with OCR_PREPASS
+off nothing is rejected and no image is decoded. Handwritten or non-English prescriptions come out of
+Tesseract as confident-looking garbage words with no known term, so the rules that read the text only
+trust a high-confidence OCR result. benchmarks/bench_prefilter.py measures precision and recall on a
+labelled sample.
+"""
+
+import os
+import re
+from processing_engine.common.logger import get_logger
+from processing_engine.common.metrics import metrics
+
+logger = get_logger("ayurlekha.prefilter")
+
+MEDICAL_TERMS = frozenset("""
+    patient doctor dr hospital clinic diagnosis prescription rx tab tablet tabs cap capsule syrup
+    injection inj dose daily od bd bid tds tid qid sos hs medicine medication report laboratory lab
+    pathology haemoglobin hemoglobin glucose cholesterol creatinine thyroid tsh urine blood serum
+    platelet wbc rbc hba1c test result reference range investigation specimen sample mbbs md opd ipd
+    discharge admission ward scan mri ct ecg x-ray ultrasound radiology pulse bp mmhg allergy
+    """.split())
+UNIT_PATTERN = re.compile(
+    r"\b\d+(?:\.\d+)?\s*(?:mg|mcg|ml|iu|g/dl|mg/dl|mmol/l|mmhg)\b"
+)
+# Not "whatsapp image": forwarded prescription photos are named that way too
+NON_MEDICAL_NAMES = ("selfie", "screenshot", "meme", "wallpaper")
+
+# A photo: colourful and almost no paper-white background
+PHOTO_MIN_COLOURFULNESS = 45.0
+PHOTO_MAX_PAPER = 0.15
+# A text-heavy image with no medical vocabulary at all (needs the OCR pre-pass)
+TEXT_MIN_WORDS = 40
+# OCR confidence the text and file-name rules need; below it the text may just be misread
+TEXT_MIN_CONFIDENCE = 0.85
+
+
+def medical_term_count(text: str) -> int:
+    text = (text or "").lower()
+    words = re.findall(r"[a-z][a-z0-9\-]*", text)
+    return sum(word in MEDICAL_TERMS for word in words) + len(
+        UNIT_PATTERN.findall(text)
+    )
+
+
+def pixel_features(pixels) -> dict:
+    """Colourfulness and paper-white share of a list of (r, g, b) pixels."""
+    n = len(pixels) or 1
+    rg = [r - g for r, g, _ in pixels]
+    yb = [0.5 * (r + g) - b for r, g, b in pixels]
+
+    def mean_std(values):
+        mean = sum(values) / n
+        return mean, (sum((v - mean) ** 2 for v in values) / n) ** 0.5
+
+    rg_mean, rg_std = mean_std(rg)
+    yb_mean, yb_std = mean_std(yb)
+    colourfulness = (rg_std**2 + yb_std**2) ** 0.5 + 0.3 * (
+        rg_mean**2 + yb_mean**2
+    ) ** 0.5
+    paper = sum(
+        1
+        for r, g, b in pixels
+        if 0.299 * r + 0.587 * g + 0.114 * b >= 180 and max(r, g, b) - min(r, g, b) < 40
+    )
+    return {
+        "colourfulness": round(colourfulness, 2),
+        "paper_fraction": round(paper / n, 4),
+    }
+
+
+def classify(features: dict, file_name: str = ""):
+    """
+    Reason the upload is clearly not a medical document, or None to let it through. `features` holds
+    colourfulness/paper_fraction (absent without Pillow) and words/medical_terms/ocr_confidence (absent
+    without OCR); without OCR nothing is rejected.
+    """
+    terms = features.get("medical_terms")
+    if terms:
+        return None
+    words = features.get("words")
+    confident = features.get("ocr_confidence", 0.0) >= TEXT_MIN_CONFIDENCE
+    name = os.path.basename(file_name or "").lower()
+    if terms == 0 and confident and any(marker in name for marker in NON_MEDICAL_NAMES):
+        return f"file name '{name}' and no medical terms in its text"
+    colourfulness = features.get("colourfulness")
+    paper = features.get("paper_fraction")
+    # Photos of rashes, wounds or medicine strips look the same, so only OCR finding no text settles it
+    if (
+        terms == 0
+        and colourfulness is not None
+        and colourfulness >= PHOTO_MIN_COLOURFULNESS
+        and paper <= PHOTO_MAX_PAPER
+        and not words
+    ):
+        return f"colourful photo without a page (colourfulness {colourfulness:.0f}, {paper:.0%} paper-white) and no text"
+    if terms == 0 and confident and words is not None and words >= TEXT_MIN_WORDS:
+        return f"{words} words of text without any medical terms"
+    return None
+
+
+class MedicalPrefilter:
+    """classify() over the features of a local document file."""
+
+    def __init__(self):
+        self._available = None
+
+    def available(self) -> bool:
+        if self._available is None:
+            try:
+                import PIL  # noqa: F401
+
+                self._available = True
+            except ImportError:
+                logger.warning(
+                    "[prefilter] Image features disabled, Pillow is not installed"
+                )
+                self._available = False
+        return self._available
+
+    def features(self, path: str, ocr: dict = None) -> dict:
+        features = {}
+        if self.available():
+            try:
+                from PIL import Image
+
+                with Image.open(path) as image:
+                    thumb = image.convert("RGB").resize((64, 64))
+                features.update(pixel_features(list(thumb.getdata())))
+            except Exception as e:
+                logger.info(f"[prefilter] Cannot read image features of {path}: {e}")
+        if ocr is not None:
+            features["words"] = ocr["words"]
+            features["medical_terms"] = medical_term_count(ocr["text"])
+            features["ocr_confidence"] = ocr["confidence"]
+        return features
+
+    def check(self, path: str, ocr: dict = None, file_name: str = ""):
+        """Reason to skip the document as non-medical, or None; without OCR there is nothing to check."""
+        if ocr is None:
+            return None
+        features = self.features(path, ocr)
+        reason = classify(features, file_name or path)
+        metrics.inc("prefilter_total", verdict="non_medical" if reason else "pass")
+        return reason
@@ -1,20 +1,55 @@
 import os
 import glob
+import threading
+import time
 import dspy
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from urllib.parse import urlparse
 from processing_engine.common.config import load_config
-from processing_engine.common.logger import get_logger
+from processing_engine.common.logger import get_logger, log_event
+from processing_engine.common.sharding import filter_shard, parse_shard
+from processing_engine.common.compiled_programs import capture_example
+from processing_engine.common.checkpoint import (
+    CheckpointJournal,
+    install_stop_handlers,
+    stop_requested,
+    wait_for_stop,
+)
+from processing_engine.common.events import PatientDebouncer, make_event_source
+from processing_engine.common.scheduler import FairScheduler, run_workers
+from processing_engine.common.disk_cache import DiskCache
+from processing_engine.common.entity_store import EntityStore
+from processing_engine.common.dspy_callbacks import LMTraceCallback, MetricsCallback
+from processing_engine.common.lm_trace import LMTraceStore
+from processing_engine.common.image_hash import ImageHashIndex, file_digest
+from processing_engine.common.inference_profiles import profile_lm
+from processing_engine.common.metrics import metrics
+from processing_engine.common.ocr import OcrPool
+from processing_engine.common.quality_eval import QualityEvaluator
+from processing_engine.common.text_dedupe import FactDeduper, dedupe_analyses
 from processing_engine.common.supabase_io import (
-    download_file_from_supabase,
-    upload_file_to_supabase,
+    download_bytes_from_supabase,
+    upload_many_to_supabase,
 )
 from processing_engine.usecases.ayurlekha.modules import DocumentProcessor
 from processing_engine.usecases.ayurlekha.modules import DocumentMetadataModule
+from processing_engine.usecases.ayurlekha.modules import DocumentTextProcessor
+from processing_engine.usecases.ayurlekha.signatures import (
+    AyurlekhaSummarySignature,
+    DocumentMetadataSignature,
+)
+from processing_engine.usecases.ayurlekha.prefilter import MedicalPrefilter
+from processing_engine.usecases.ayurlekha.publish import publish_summary
+from processing_engine.usecases.ayurlekha.triage import UrgencyTriage
+from processing_engine.usecases.ayurlekha.postprocess import (
+    postprocess_metadata,
+    postprocess_summary,
+)
 import json
-
-# NEW: Import mem0 for vector storage
-from mem0 import Memory
+import hashlib
+import logging
+from contextlib import contextmanager
 
 # Load config and logger
 config = load_config()
@@ -22,8 +57,8 @@ logger = get_logger("ayurlekha.processor")
 
 # Set up LMs
 medgemma_lm = dspy.LM(
-    "openai/",
-    api_base="http://127.0.0.1:8081/v1",
+    config["MEDGEMMA_MODEL"],
+    api_base=config["MEDGEMMA_API_BASE"],
     api_key="sk1234",
 )
 gemini_api_key = config["GEMINI_API_KEY"]
@@ -31,13 +66,19 @@ gemini_lm = dspy.LM(
     "gemini/gemini-2.0-flash",
     api_key=gemini_api_key,
 )
-dspy.configure(lm=gemini_lm)
+lm_trace_store = LMTraceStore(config["LM_TRACE_PATH"])
+lm_trace_callback = LMTraceCallback(
+    lm_trace_store, sample_rate=config["LM_TRACE_SAMPLE_RATE"]
+)
+dspy.configure(lm=gemini_lm, callbacks=[MetricsCallback(), lm_trace_callback])
 
 # Ensure Gemini API key is set for mem0
 import os
 
-os.environ["GEMINI_API_KEY"] = gemini_api_key
-os.environ["OPENAI_API_KEY"] = config["OPENAI_API_KEY"]
+if gemini_api_key:
+    os.environ["GEMINI_API_KEY"] = gemini_api_key
+if config["OPENAI_API_KEY"]:
+    os.environ["OPENAI_API_KEY"] = config["OPENAI_API_KEY"]
 
 # NEW: Configure mem0 with ChromaDB for local development
 mem0_config = {
@@ -51,7 +92,51 @@ mem0_config = {
     },
     "llm": {},
 }
-mem0_memory = Memory.from_config(mem0_config)
+mem0_memory = None
+_mem0_lock = threading.Lock()
+
+
+def get_mem0_memory():
+    """Open the mem0 store on first use so importing this module stays cheap."""
+    global mem0_memory
+    with _mem0_lock:
+        if mem0_memory is None:
+            # NEW: Import mem0 for vector storage
+            from mem0 import Memory
+
+            mem0_memory = Memory.from_config(mem0_config)
+    return mem0_memory
+
+
+# Downloaded documents and per-document analyses, bounded by CACHE_MAX_BYTES
+document_cache = DiskCache(config["CACHE_DIR"], config["CACHE_MAX_BYTES"])
+entity_store = EntityStore(
+    config["ENTITY_STORE_DIR"], partitions=config["ENTITY_STORE_PARTITIONS"]
+)
+# Judges a sampled share of analyses, metadata and summaries off the critical path
+quality_evaluator = QualityEvaluator(
+    config["QUALITY_EVAL_PATH"],
+    sample_rate=config["QUALITY_EVAL_SAMPLE_RATE"],
+    workers=config["QUALITY_EVAL_WORKERS"],
+    judge_lm=profile_lm({"model": config["QUALITY_EVAL_MODEL"]}),
+)
+
+# Perceptual hashes of analysed documents, for near-duplicate detection
+image_index = ImageHashIndex(
+    config["IMAGE_HASH_PATH"],
+    max_dhash=config["DUPLICATE_MAX_DHASH"],
+    max_phash=config["DUPLICATE_MAX_PHASH"],
+    min_text_similarity=config["DUPLICATE_MIN_TEXT_SIMILARITY"],
+)
+# Rejects obviously non-medical uploads before the vision analysis
+prefilter = MedicalPrefilter()
+# Local OCR pre-pass; only used with OCR_PREPASS, the pool starts on first use
+ocr_pool = OcrPool(
+    workers=config["OCR_WORKERS"],
+    min_confidence=config["OCR_MIN_CONFIDENCE"],
+    min_words=config["OCR_MIN_WORDS"],
+    lang=config["OCR_LANG"],
+)
 
 # Helper: extract bucket and remote_path from file_url
 
@@ -73,217 +158,966 @@ def extract_bucket_and_path(file_url):
 # Main pipeline
 
 
-def process_patients():
+def build_summary_context(patient_id: str, analyses) -> str:
     """
-    Main pipeline to process all patients, generate detailed JSON summaries for each, and upload results to Supabase.
+    Pack a patient's (record_id, analysis) pairs into the summary prompt context, carrying each
+    repeated fact (demographics, chronic conditions, ongoing medications) only once.
+    """
+    raw = "\n".join(
+        f"--- Analysis from record {source} ---\n{text}" for source, text in analyses
+    )
+    if not config["SUMMARY_DEDUPE"] or len(analyses) < 2:
+        return raw
+    with metrics.timer("stage_seconds", stage="dedupe"):
+        context, deduper = dedupe_analyses(
+            analyses, threshold=config["SUMMARY_DEDUPE_THRESHOLD"]
+        )
+    metrics.observe("summary_context_chars", len(raw), kind="raw")
+    metrics.observe("summary_context_chars", len(context), kind="deduped")
+    metrics.inc("summary_facts_total", deduper.exact_duplicates, kind="exact_duplicate")
+    metrics.inc("summary_facts_total", deduper.near_duplicates, kind="near_duplicate")
+    metrics.inc("summary_facts_total", len(deduper.facts), kind="kept")
+    log_event(
+        logger,
+        "dedupe",
+        f"Deduplicated {deduper.total} facts to {len(deduper.facts)} for patient {patient_id} "
+        f"({len(raw)} -> {len(context)} chars)",
+        level=logging.DEBUG,
+        payload=lambda: deduper.facts,
+        patient_id=patient_id,
+        exact=deduper.exact_duplicates,
+        near=deduper.near_duplicates,
+    )
+    return context
 
+
+def generate_and_upload_summary(patient_id: str, user_id: str, analyses=()):
     """
-    from supabase import create_client
+    Build the Ayurlekha summary for a patient and publish it to Supabase. The context is the
+    deduplicated (record_id, analysis) pairs of this run's documents, followed by mem0 memories of
+    the patient's earlier documents.
+    Returns (remote_path, changed); an unchanged summary is not uploaded again (see publish.py).
+    """
+    # NEW: Retrieve most relevant analyses from mem0 for this patient
+    # For demo, retrieve top 5 most relevant (can tune query as needed)
+    mem0_results = get_mem0_memory().search(
+        query=f"summarize patient {patient_id}", user_id=patient_id
+    )
+    # mem0_results is a dict with a 'results' key
+    analyses = list(analyses)
+    current = {str(source) for source, _ in analyses}
+    earlier_memories = []
+    if mem0_results and "results" in mem0_results:
+        for r in mem0_results["results"]:
+            # Each r is a dict with a 'memory' key (not 'content')
+            source = (r.get("metadata") or {}).get("record_id")
+            # Memories of this run's documents are covered by their full analyses
+            if "memory" in r and str(source) not in current:
+                earlier_memories.append(r["memory"])
+    combined_analysis = build_summary_context(patient_id, analyses)
+    if earlier_memories:
+        combined_analysis += "\n--- Memories from earlier records ---\n" + "\n".join(
+            earlier_memories
+        )
+    log_event(
+        logger,
+        "summary",
+        f"Combined analysis (from mem0) for patient {patient_id}",
+        level=logging.DEBUG,
+        payload=combined_analysis,
+        patient_id=patient_id,
+        analyses=len(analyses),
+        memories=len(earlier_memories),
+    )
+    # Run LLM module for structured summary
+    from processing_engine.usecases.ayurlekha.modules import (
+        PatientDemographics,
+        SectionalPatientDemographics,
+    )
 
-    supabase_url = config["SUPABASE_URL"]
-    supabase_key = config.get("SUPABASE_SERVICE_ROLE") or config["SUPABASE_ANON_KEY"]
-    logger.info(
-        f"[startup] Using {'SUPABASE_SERVICE_ROLE' if config.get('SUPABASE_SERVICE_ROLE') else 'SUPABASE_ANON_KEY'} for Supabase client"
+    if config["SUMMARY_MODE"] == "sections":
+        patient_demographics_module = SectionalPatientDemographics()
+    else:
+        patient_demographics_module = PatientDemographics()
+    summary_obj = patient_demographics_module(
+        medical_history=combined_analysis,
+        patient_id=patient_id,
+        user_id=user_id,
+    )
+    if isinstance(patient_demographics_module, PatientDemographics) and not (
+        patient_demographics_module.compiled
+    ):
+        capture_example(
+            "summary",
+            {"medical_history": combined_analysis},
+            {
+                field: getattr(summary_obj, field, None)
+                for field in AyurlekhaSummarySignature.output_fields
+            },
+        )
+    log_event(
+        logger,
+        "summary",
+        "Summary object",
+        level=logging.DEBUG,
+        payload=lambda: str(summary_obj),
+        patient_id=patient_id,
     )
-    supabase = create_client(supabase_url, supabase_key)
+    # Build JSON summary (NEW FORMAT)
+    # Explicitly build the summary dict using known output fields
+    summary_dict = {
+        "patient": getattr(summary_obj, "patient", None),
+        "summary": getattr(summary_obj, "summary", None),
+        "primaryAlert": getattr(summary_obj, "primaryAlert", None),
+        "chronicConditions": getattr(summary_obj, "chronicConditions", None),
+        "historyTimeline": getattr(summary_obj, "historyTimeline", None),
+        "labTests": getattr(summary_obj, "labTests", None),
+        "medications": getattr(summary_obj, "medications", None),
+        "doctors": getattr(summary_obj, "doctors", None),
+        "emergencyContacts": getattr(summary_obj, "emergencyContacts", None),
+        "footer": getattr(summary_obj, "footer", None),
+        "meta": getattr(summary_obj, "meta", None),
+    }
+    summary_dict = postprocess_summary(summary_dict)
+    log_event(
+        logger,
+        "summary",
+        "JSON to be written",
+        level=logging.DEBUG,
+        payload=summary_dict,
+        patient_id=patient_id,
+    )
+    remote_json_path, changed = publish_summary(user_id, patient_id, summary_dict)
+    if changed:
+        quality_evaluator.submit(
+            "summary",
+            remote_json_path,
+            summary_dict,
+            reference=combined_analysis,
+            patient_id=patient_id,
+        )
+        logger.info(f"[summary] Uploaded summary JSON to Supabase: {remote_json_path}")
+    return remote_json_path, changed
 
-    patients = supabase.table("patients").select("*").execute().data
-    logger.info(f"[db] Found {len(patients)} patients in DB")
-    for patient in patients:
-        patient_id = patient["id"]
-        user_id = patient["user_id"]
-        temp_dir = f"temp_medical_docs/{user_id}_{patient_id}"
-        os.makedirs(temp_dir, exist_ok=True)
-        logger.info(f"[patient] Processing patient {patient_id} (user {user_id})")
-        # Fetch unprocessed medical records
-        records = (
-            supabase.table("medical_records")
-            .select("*")
-            .eq("patient_id", patient_id)
-            .eq("processed", False)
-            .execute()
-            .data
+
+def open_checkpoint_journal(shard_index: int, shard_count: int, resume: bool):
+    """Open this shard's checkpoint journal, restoring it from storage when resuming."""
+    name = f"ayurlekha_shard_{shard_index}_of_{shard_count}.sqlite"
+    journal = CheckpointJournal(
+        os.path.join(config["CHECKPOINT_DIR"], name),
+        bucket=config["CHECKPOINT_BUCKET"],
+        remote_path=f"checkpoints/ayurlekha/{name}",
+    )
+    if resume:
+        journal.restore()
+    else:
+        journal.reset()
+    return journal
+
+
+@contextmanager
+def fetch_document(bucket: str, remote_path: str):
+    """
+    Local path of a stored document, downloading it into the document cache on a miss. The file is
+    pinned in the cache (safe from eviction by concurrent downloads) until the block exits.
+    """
+    document_key = f"documents/{bucket}/{remote_path}"
+    local_path = document_cache.path(document_key, pin=True)
+    if local_path is None:
+        with metrics.timer("stage_seconds", stage="download"):
+            local_path = document_cache.put(
+                document_key,
+                download_bytes_from_supabase(bucket, remote_path),
+                pin=True,
+            )
+        logger.info(f"[download] Downloaded {bucket}/{remote_path} to {local_path}")
+    else:
+        logger.info(f"[download] Cache hit for {bucket}/{remote_path}: {local_path}")
+    try:
+        yield local_path
+    finally:
+        document_cache.release(local_path)
+
+
+def _record_image_path(rec):
+    return fetch_document(*extract_bucket_and_path(rec["file_url"]))
+
+
+# Urgency pre-pass used to prioritise patients in the scheduler
+triage = UrgencyTriage(config["URGENCY_PREPASS"], image_path=_record_image_path)
+
+
+def schedule_patient(scheduler, patient, records, job=None):
+    """Queue one patient's pending records, prioritised by urgency pre-pass, recency and patient flags."""
+    known = {
+        row["record_id"]: row["urgency"]
+        for row in entity_store.patient_rows("documents", patient["id"])
+        if row.get("urgency")
+    }
+    with metrics.timer("stage_seconds", stage="triage"):
+        plan = triage.plan(patient, records, known)
+    scheduler.push(
+        job if job is not None else (patient, records),
+        user_id=patient.get("user_id"),
+        **plan,
+    )
+    return plan["priority"]
+
+
+def run_ocr(local_path: str):
+    """OCR pre-pass result of a document, or None when OCR_PREPASS is off or OCR failed."""
+    if not config["OCR_PREPASS"]:
+        return None
+    with metrics.timer("stage_seconds", stage="ocr"):
+        return ocr_pool.run(local_path)
+
+
+def check_non_medical(local_path: str, record_id, remote_path: str, ocr=None):
+    """Reason the pre-filter rejects a document as clearly non-medical, or None (also when PREFILTER is off or there is no OCR text)."""
+    if not config["PREFILTER"] or ocr is None:
+        return None
+    with metrics.timer("stage_seconds", stage="prefilter"):
+        reason = prefilter.check(local_path, ocr, file_name=remote_path)
+    if reason is not None:
+        # At least the analysis and metadata calls
+        metrics.inc("lm_calls_skipped_total", 2, reason="prefilter")
+        logger.info(f"[prefilter] Record {record_id} skipped as non-medical: {reason}")
+    return reason
+
+
+def non_medical_metadata(reason: str) -> dict:
+    """Metadata recorded for an upload the pre-filter rejected, in the shape of the LM metadata."""
+    return postprocess_metadata(
+        {
+            "intelligent_name": "Non-medical upload",
+            "category": "Non-medical",
+            "date": None,
+            "department": None,
+            "doctor_name": None,
+            "patient_name": None,
+            "insights": [],
+            "actions": [],
+            "medications": [],
+            "lab_tests": [],
+            "urgency": "Low",
+            "summary": None,
+            "is_medical_document": False,
+            "reason": f"Pre-filter: {reason}",
+        }
+    )
+
+
+def analyse_document(local_path: str, record_id, ocr: dict = None):
+    """
+    Detailed analysis of one document. With OCR_PREPASS, a document whose OCR text (`ocr`) is confident enough is
+    analysed from the text (DocumentTextProcessor); everything else, e.g. handwriting, goes to the vision
+    model. Returns (analysis_text, lm_calls), where lm_calls counts the analysis call and one call per
+    medicine verification (a lower bound, a verification can take several); analysis_text is None if
+    the image cannot be loaded.
+    """
+    if ocr_pool.confident(ocr):
+        route, program, inputs = "text", "text_analysis", {"document_text": ocr["text"]}
+        doc_processor = DocumentTextProcessor()
+        call_inputs = inputs
+    else:
+        route, program, inputs = "vision", "analysis", {"document_image": local_path}
+        doc_processor = DocumentProcessor()
+        try:
+            call_inputs = {"document_image": dspy.Image.from_file(local_path)}
+        except Exception as e:
+            logger.error(f"[error] Failed to load image for record {record_id}: {e}")
+            return None, 0
+    metrics.inc("analysis_route_total", route=route)
+    if ocr is not None:
+        logger.info(
+            f"[ocr] Record {record_id}: confidence {ocr['confidence']:.2f}, {ocr['words']} words -> {route} analysis"
+        )
+    with metrics.timer("stage_seconds", stage="analysis"):
+        result = doc_processor(**call_inputs)
+    analysis_text = getattr(result, "detailed_analysis", str(result))
+    if not doc_processor.compiled:
+        capture_example(
+            program,
+            inputs,
+            {
+                "detailed_analysis": analysis_text,
+                "extracted_medicines": getattr(result, "extracted_medicines", []),
+            },
         )
+    return analysis_text, 1 + len(getattr(result, "medicine_verifications", []) or [])
+
+
+def reuse_duplicate(patient_id: str, record_id, hashes, sha256: str, ocr=None):
+    """
+    Analysis and metadata of an earlier near-duplicate image of this patient with the same content (file
+    bytes or OCR text), as (analysis_text, metadata_json), or None when there is no such record or its
+    results are no longer cached.
+    """
+    match = image_index.find(
+        patient_id,
+        hashes,
+        exclude=record_id,
+        sha256=sha256,
+        text=ocr["text"] if ocr else None,
+    )
+    if match is None:
+        return None
+    original = match["record_id"]
+    analysis_text = document_cache.get_text(f"analyses/{patient_id}/{original}.txt")
+    metadata_json = document_cache.get_text(f"metadata/{patient_id}/{original}.json")
+    if analysis_text is None or metadata_json is None:
         logger.info(
-            f"[db] Found {len(records)} unprocessed records for patient {patient_id}"
+            f"[dedupe] Record {record_id} matches {original} but its results are not cached"
         )
-        if not records:
-            continue
-        analysis_texts = []
-        for rec in records:
-            file_url = rec["file_url"]
-            record_id = rec["id"]
-            try:
-                bucket, remote_path = extract_bucket_and_path(file_url)
-                logger.info(
-                    f"[download] bucket='{bucket}', remote_path='{remote_path}' for record {record_id}"
-                )
-                local_path = os.path.join(temp_dir, os.path.basename(remote_path))
-                if not os.path.exists(local_path):
-                    download_file_from_supabase(bucket, remote_path, local_path)
-                    logger.info(f"[download] Downloaded {file_url} to {local_path}")
-                else:
-                    logger.info(f"[download] File already exists locally: {local_path}")
+        return None
+    metadata = json.loads(metadata_json)
+    metadata["duplicate_of"] = original
+    # Analysis and metadata calls of the original are not repeated
+    metrics.inc("duplicate_documents_total")
+    metrics.inc("lm_calls_skipped_total", match["lm_calls"], reason="duplicate")
+    logger.info(
+        f"[dedupe] Record {record_id} is a near-duplicate of {original} "
+        f"(dHash {match['dhash_distance']}, pHash {match['phash_distance']}, same {match['confirmed_by']}), "
+        f"reusing its results"
+    )
+    return analysis_text, json.dumps(metadata, indent=2)
+
+
+def duplicate_stats() -> dict:
+    """Near-duplicate documents found and LM calls they saved so far in this process."""
+    return {
+        "duplicates": int(
+            sum(metrics.counters.get("duplicate_documents_total", {}).values())
+        ),
+        "lm_calls_skipped": int(
+            metrics.counters.get("lm_calls_skipped_total", {}).get(
+                (("reason", "duplicate"),), 0
+            )
+        ),
+    }
+
+
+def prefilter_stats() -> dict:
+    """Pre-filter verdicts ("non_medical", "pass") so far in this process."""
+    return {
+        dict(labels)["verdict"]: int(count)
+        for labels, count in metrics.counters.get("prefilter_total", {}).items()
+    }
+
+
+def analysis_routes() -> dict:
+    """Documents analysed per route ("text" after OCR, "vision") so far in this process."""
+    return {
+        dict(labels)["route"]: int(count)
+        for labels, count in metrics.counters.get("analysis_route_total", {}).items()
+    }
+
+
+def process_record(rec, patient_id: str, user_id: str, journal, deduper=None):
+    """
+    Run download, analysis, mem0 and metadata stages for one medical record.
+    Returns (analysis_text, pending_upload); either may be None if the stage was skipped or failed.
+    analysis_text is "" for a record the pre-filter rejected: it has metadata to upload but no analysis
+    for the summary. With a `deduper` (one per patient), only facts not in the patient's earlier
+    analyses are stored in mem0.
+    """
+    file_url = rec["file_url"]
+    record_id = rec["id"]
+    pending_upload = None
+    try:
+        bucket, remote_path = extract_bucket_and_path(file_url)
+        analysis_text = journal.get(record_id, "analysis")
+        if analysis_text is None:
+            logger.info(
+                f"[download] bucket='{bucket}', remote_path='{remote_path}' for record {record_id}"
+            )
+            with fetch_document(bucket, remote_path) as local_path:
+                journal.mark(record_id, "download")
                 # Per-doc analysis (simulate with DocumentProcessor or similar)
-                analysis_path = os.path.join(
-                    temp_dir, f"{patient_id}_{record_id}_analysis.txt"
+                analysis_key = f"analyses/{patient_id}/{record_id}.txt"
+                analysis_text = document_cache.get_text(analysis_key)
+                # OCR text also confirms near-duplicate matches below
+                ocr = run_ocr(local_path) if analysis_text is None else None
+                hashes = (
+                    image_index.hashes(local_path)
+                    if config["DUPLICATE_DETECTION"]
+                    else None
                 )
-                if not os.path.exists(analysis_path):
-                    doc_processor = DocumentProcessor()
-                    try:
-                        img = dspy.Image.from_file(local_path)
-                    except Exception as e:
-                        logger.error(
-                            f"[error] Failed to load image for record {record_id}: {e}"
-                        )
-                        continue
-                    result = doc_processor(document_image=img)
-                    analysis = getattr(result, "detailed_analysis", str(result))
-                    with open(analysis_path, "w") as f:
-                        f.write(analysis)
-                    logger.info(f"[analysis] Saved analysis to {analysis_path}")
-                else:
-                    logger.info(f"[analysis] Analysis already exists: {analysis_path}")
-                with open(analysis_path, "r") as f:
-                    analysis_text = f.read()
-                    analysis_texts.append(
-                        f"--- Analysis from {os.path.basename(analysis_path)} ---\n"
-                        + analysis_text
-                    )
-                    # FIX: Store each analysis as a string, not a dict
-                    mem0_memory.add(
-                        analysis_text,
-                        user_id=patient_id,
-                        metadata={"record_id": record_id, "user_id": user_id},
-                    )
-                    # Debug: Log total memories for this patient
-                    mems = mem0_memory.get_all(user_id=patient_id)
-                    logger.info(
-                        f"[mem0] Total existing memories for {patient_id}: {len(mems.get('results', []))}"
+                sha256 = file_digest(local_path) if hashes else None
+                duplicate = (
+                    reuse_duplicate(patient_id, record_id, hashes, sha256, ocr)
+                    if hashes
+                    else None
+                )
+                reason = None
+                if duplicate is None and analysis_text is None:
+                    reason = check_non_medical(local_path, record_id, remote_path, ocr)
+                if duplicate is not None:
+                    analysis_text, metadata_json = duplicate
+                    # The original's memory already covers this document
+                    journal.mark(record_id, "mem0")
+                    journal.mark(record_id, "metadata", metadata_json)
+                elif reason is not None:
+                    # Kept out of the patient's memories and summary
+                    analysis_text = ""
+                    journal.mark(record_id, "mem0")
+                    journal.mark(
+                        record_id,
+                        "metadata",
+                        json.dumps(non_medical_metadata(reason), indent=2),
                     )
-                    # NEW: Generate and save document metadata
-                    doc_metadata_module = DocumentMetadataModule()
-                    metadata_obj = doc_metadata_module(detailed_analysis=analysis_text)
-                    metadata_dict = {
-                        "intelligent_name": getattr(
-                            metadata_obj, "intelligent_name", None
-                        ),
-                        "category": getattr(metadata_obj, "category", None),
-                        "date": getattr(metadata_obj, "date", None),
-                        "department": getattr(metadata_obj, "department", None),
-                        "doctor_name": getattr(metadata_obj, "doctor_name", None),
-                        "patient_name": getattr(metadata_obj, "patient_name", None),
-                        "insights": getattr(metadata_obj, "insights", None),
-                        "actions": getattr(metadata_obj, "actions", None),
-                        "urgency": getattr(metadata_obj, "urgency", None),
-                        "summary": getattr(metadata_obj, "summary", None),
-                        "is_medical_document": getattr(
-                            metadata_obj, "is_medical_document", None
-                        ),
-                        "reason": getattr(metadata_obj, "reason", None),
-                    }
-                    logger.info(
-                        f"[metadata] Metadata for {local_path}: {json.dumps(metadata_dict, indent=2)}"
+                elif analysis_text is None:
+                    analysis_text, lm_calls = analyse_document(
+                        local_path, record_id, ocr
                     )
-                    metadata_path = os.path.splitext(local_path)[0] + "_metadata.json"
-                    with open(metadata_path, "w") as mf:
-                        json.dump(metadata_dict, mf, indent=2)
-                    # NEW: Upload metadata JSON to Supabase Storage at the same location as the document
-                    remote_metadata_path = (
-                        os.path.splitext(remote_path)[0] + "_metadata.json"
+                    if analysis_text is None:
+                        return None, None
+                    if hashes:
+                        # + 1 for the metadata call that follows
+                        image_index.add(
+                            patient_id,
+                            record_id,
+                            hashes,
+                            lm_calls + 1,
+                            sha256=sha256,
+                            text=ocr["text"] if ocr else None,
+                        )
+                    document_cache.put(analysis_key, analysis_text)
+                    quality_evaluator.submit(
+                        "analysis", record_id, analysis_text, patient_id=patient_id
                     )
-                    upload_file_to_supabase(bucket, remote_metadata_path, metadata_path)
+                    logger.info(f"[analysis] Cached analysis for record {record_id}")
+                else:
                     logger.info(
-                        f"[metadata] Uploaded metadata to Supabase: {remote_metadata_path}"
+                        f"[analysis] Analysis already cached for record {record_id}"
                     )
-            except Exception as e:
-                logger.error(f"[error] Failed to process record {record_id}: {e}")
-        if not analysis_texts:
-            logger.warning(
-                f"[summary] No analyses for patient {patient_id}, skipping summary generation."
+                journal.mark(record_id, "analysis", analysis_text)
+        else:
+            logger.info(
+                f"[checkpoint] Reusing journaled analysis for record {record_id}"
             )
-            continue
-        # NEW: Retrieve most relevant analyses from mem0 for this patient
-        # For demo, retrieve top 5 most relevant (can tune query as needed)
-        mem0_results = mem0_memory.search(
-            query=f"summarize patient {patient_id}", user_id=patient_id
-        )
-        # mem0_results is a dict with a 'results' key
-        relevant_analyses = []
-        if mem0_results and "results" in mem0_results:
-            for r in mem0_results["results"]:
-                # Each r is a dict with a 'memory' key (not 'content')
-                if "memory" in r:
-                    relevant_analyses.append(r["memory"])
-        combined_analysis = "\n".join(relevant_analyses)
-        logger.info(f"[summary] Combined analysis (from mem0): {combined_analysis}")
-        # Run LLM module for structured summary
-        try:
-            from processing_engine.usecases.ayurlekha.modules import PatientDemographics
-
-            patient_demographics_module = PatientDemographics()
-            summary_obj = patient_demographics_module(
-                medical_history=combined_analysis,
+        memory_text = analysis_text
+        if deduper is not None and analysis_text:
+            # Also for journaled records, so later records are compared with them
+            with metrics.timer("stage_seconds", stage="dedupe"):
+                memory_text = deduper.novel_text(analysis_text, record_id)
+        if not journal.is_done(record_id, "mem0") and not memory_text:
+            logger.info(f"[mem0] Record {record_id} adds no new facts")
+            journal.mark(record_id, "mem0")
+        if not journal.is_done(record_id, "mem0"):
+            memory = get_mem0_memory()
+            # FIX: Store each analysis as a string, not a dict
+            with metrics.timer("stage_seconds", stage="mem0"):
+                memory.add(
+                    memory_text,
+                    user_id=patient_id,
+                    metadata={"record_id": record_id, "user_id": user_id},
+                )
+            journal.mark(record_id, "mem0")
+            # Debug: Log total memories for this patient
+            mems = memory.get_all(user_id=patient_id)
+            logger.info(
+                f"[mem0] Total existing memories for {patient_id}: {len(mems.get('results', []))}"
+            )
+        metadata_json = journal.get(record_id, "metadata")
+        if metadata_json is None:
+            # NEW: Generate and save document metadata
+            doc_metadata_module = DocumentMetadataModule()
+            with metrics.timer("stage_seconds", stage="metadata"):
+                metadata_obj = doc_metadata_module(detailed_analysis=analysis_text)
+            if not doc_metadata_module.compiled:
+                capture_example(
+                    "metadata",
+                    {"detailed_analysis": analysis_text},
+                    {
+                        field: getattr(metadata_obj, field, None)
+                        for field in DocumentMetadataSignature.output_fields
+                    },
+                )
+            metadata_dict = {
+                "intelligent_name": getattr(metadata_obj, "intelligent_name", None),
+                "category": getattr(metadata_obj, "category", None),
+                "date": getattr(metadata_obj, "date", None),
+                "department": getattr(metadata_obj, "department", None),
+                "doctor_name": getattr(metadata_obj, "doctor_name", None),
+                "patient_name": getattr(metadata_obj, "patient_name", None),
+                "insights": getattr(metadata_obj, "insights", None),
+                "actions": getattr(metadata_obj, "actions", None),
+                "medications": getattr(metadata_obj, "medications", None),
+                "lab_tests": getattr(metadata_obj, "lab_tests", None),
+                "urgency": getattr(metadata_obj, "urgency", None),
+                "summary": getattr(metadata_obj, "summary", None),
+                "is_medical_document": getattr(
+                    metadata_obj, "is_medical_document", None
+                ),
+                "reason": getattr(metadata_obj, "reason", None),
+            }
+            metadata_dict = postprocess_metadata(metadata_dict)
+            quality_evaluator.submit(
+                "metadata",
+                record_id,
+                metadata_dict,
+                reference=analysis_text,
                 patient_id=patient_id,
-                user_id=user_id,
             )
-            # NEW: Log LLM call history for debugging
-            dspy.inspect_history(n=5)
-            logger.info(f"[summary] Summary object: {summary_obj}")
-            # Build JSON summary (NEW FORMAT)
-            timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
-            summary_json_filename = f"{patient_id}_Ayurlekha_{timestamp}.json"
-            summary_json_path = os.path.join(temp_dir, summary_json_filename)
-            # Explicitly build the summary dict using known output fields
-            summary_dict = {
-                "patient": getattr(summary_obj, "patient", None),
-                "summary": getattr(summary_obj, "summary", None),
-                "primaryAlert": getattr(summary_obj, "primaryAlert", None),
-                "chronicConditions": getattr(summary_obj, "chronicConditions", None),
-                "historyTimeline": getattr(summary_obj, "historyTimeline", None),
-                "labTests": getattr(summary_obj, "labTests", None),
-                "medications": getattr(summary_obj, "medications", None),
-                "doctors": getattr(summary_obj, "doctors", None),
-                "emergencyContacts": getattr(summary_obj, "emergencyContacts", None),
-                "footer": getattr(summary_obj, "footer", None),
-                "meta": getattr(summary_obj, "meta", None),
+            metadata_json = json.dumps(metadata_dict, indent=2)
+            document_cache.put(f"metadata/{patient_id}/{record_id}.json", metadata_json)
+            log_event(
+                logger,
+                "metadata",
+                f"Metadata for {remote_path}",
+                payload=metadata_json,
+                record_id=record_id,
+                category=metadata_dict["category"],
+                urgency=metadata_dict["urgency"],
+            )
+            journal.mark(record_id, "metadata", metadata_json)
+        # Idempotent, so it is simply redone for journaled records on resume
+        with metrics.timer("stage_seconds", stage="entities"):
+            entity_store.upsert_document(
+                patient_id, user_id, record_id, json.loads(metadata_json)
+            )
+        if not journal.is_done(record_id, "upload"):
+            # NEW: Upload metadata JSON to Supabase Storage at the same location as the document
+            pending_upload = {
+                "record_id": record_id,
+                "bucket": bucket,
+                "remote_path": os.path.splitext(remote_path)[0] + "_metadata.json",
+                "data": metadata_json,
+                "content_type": "application/json",
             }
+        return analysis_text, pending_upload
+    except Exception as e:
+        logger.error(f"[error] Failed to process record {record_id}: {e}")
+        return None, None
+
+
+def fetch_pending_records(supabase, patient_id: str):
+    return (
+        supabase.table("medical_records")
+        .select("*")
+        .eq("patient_id", patient_id)
+        .eq("processed", False)
+        .execute()
+        .data
+    )
+
+
+def process_patient(supabase, patient, journal, records=None):
+    """
+    Process all unprocessed records of one patient, then generate and upload the summary and update the DB.
+    `records` are the pending records if the caller already fetched them.
+    Returns the number of records processed.
+    """
+    patient_id = patient["id"]
+    user_id = patient["user_id"]
+    logger.info(f"[patient] Processing patient {patient_id} (user {user_id})")
+    # Fetch unprocessed medical records
+    if records is None:
+        records = fetch_pending_records(supabase, patient_id)
+    logger.info(
+        f"[db] Found {len(records)} unprocessed records for patient {patient_id}"
+    )
+    if not records:
+        return 0
+    # (record_id, analysis_text) of the patient's documents, for the summary
+    analyses = []
+    pending_uploads = []
+    # Records the pre-filter rejected as non-medical
+    rejected = []
+    # Facts already stored for this patient, so mem0 gets each one once
+    deduper = (
+        FactDeduper(threshold=config["SUMMARY_DEDUPE_THRESHOLD"])
+        if config["SUMMARY_DEDUPE"]
+        else None
+    )
+    for record_num, rec in enumerate(records):
+        if stop_requested():
+            break
+        metrics.set_gauge("queue_depth", len(records) - record_num, queue="records")
+        analysis_text, pending_upload = process_record(
+            rec, patient_id, user_id, journal, deduper
+        )
+        if analysis_text:
+            analyses.append((rec["id"], analysis_text))
+        elif analysis_text == "":
+            rejected.append(rec)
+        if pending_upload is not None:
+            pending_uploads.append(pending_upload)
+    # Metadata uploads for the patient go out together through a bounded pool
+    with metrics.timer("stage_seconds", stage="upload"):
+        upload_results = upload_many_to_supabase(pending_uploads, upsert=True)
+    for upload, result in zip(pending_uploads, upload_results):
+        if result["ok"]:
+            journal.mark(upload["record_id"], "upload")
             logger.info(
-                f"[summary] JSON to be written: {json.dumps(summary_dict, indent=2)}"
+                f"[metadata] Uploaded metadata to Supabase: {result['remote_path']}"
             )
-            with open(summary_json_path, "w") as f:
-                json.dump(summary_dict, f, indent=2)
-            logger.info(f"[summary] Saved summary JSON to {summary_json_path}")
-            remote_json_path = (
-                f"Ayurlekha/{user_id}/{patient_id}/{summary_json_filename}"
+        else:
+            logger.error(
+                f"[error] Failed to upload metadata {result['remote_path']}: {result['error']}"
             )
-            upload_file_to_supabase(
-                "medical-documents", remote_json_path, summary_json_path
+    if stop_requested():
+        logger.warning(
+            f"[checkpoint] Stop requested, leaving patient {patient_id} for a resumed run"
+        )
+        return len(analyses)
+    if not analyses:
+        logger.warning(
+            f"[summary] No analyses for patient {patient_id}, skipping summary generation."
+        )
+        if rejected:
+            # Nothing left to summarise, but they need not be checked again next poll
+            with metrics.timer("stage_seconds", stage="db"):
+                for rec in rejected:
+                    supabase.table("medical_records").update({"processed": True}).eq(
+                        "id", rec["id"]
+                    ).execute()
+            logger.info(
+                f"[db] Marked {len(rejected)} non-medical records processed for patient {patient_id}"
             )
+        return 0
+    # The summary checkpoint is tied to the exact record set it covered
+    summary_key = (
+        f"{patient_id}:"
+        + hashlib.sha1(
+            ",".join(sorted(str(rec["id"]) for rec in records)).encode("utf-8")
+        ).hexdigest()
+    )
+    try:
+        remote_json_path = journal.get(summary_key, "summary")
+        # Unknown for a journaled summary, so the timestamp is refreshed as before
+        changed = True
+        if remote_json_path is None:
+            with metrics.timer("stage_seconds", stage="summary"):
+                remote_json_path, changed = generate_and_upload_summary(
+                    patient_id, user_id, analyses
+                )
+            journal.mark(summary_key, "summary", remote_json_path)
+        else:
             logger.info(
-                f"[summary] Uploaded summary JSON to Supabase: {remote_json_path}"
+                f"[checkpoint] Summary already uploaded for patient {patient_id}: {remote_json_path}"
             )
-            # Update DB
-            now_str = datetime.now(timezone.utc).isoformat()
-            supabase.table("patients").update({"ayurlekha_generated_at": now_str}).eq(
-                "id", patient_id
-            ).execute()
+        # Update DB
+        with metrics.timer("stage_seconds", stage="db"):
+            if changed:
+                now_str = datetime.now(timezone.utc).isoformat()
+                supabase.table("patients").update(
+                    {"ayurlekha_generated_at": now_str}
+                ).eq("id", patient_id).execute()
             for rec in records:
                 supabase.table("medical_records").update({"processed": True}).eq(
                     "id", rec["id"]
                 ).execute()
+        logger.info(
+            f"[db] Updated {'ayurlekha_generated_at and ' if changed else ''}processed flags for patient {patient_id}"
+        )
+    except Exception as e:
+        logger.error(
+            f"[summary] Failed to generate/upload summary or update DB for patient {patient_id}: {e}"
+        )
+    return len(analyses)
+
+
+def create_supabase_client():
+    """Create the Supabase client used for DB access, preferring the service role key."""
+    from supabase import create_client
+
+    supabase_url = config["SUPABASE_URL"]
+    supabase_key = config.get("SUPABASE_SERVICE_ROLE") or config["SUPABASE_ANON_KEY"]
+    logger.info(
+        f"[startup] Using {'SUPABASE_SERVICE_ROLE' if config.get('SUPABASE_SERVICE_ROLE') else 'SUPABASE_ANON_KEY'} for Supabase client"
+    )
+    return create_client(supabase_url, supabase_key)
+
+
+def warm_up(check):
+    """
+    Plugin hook (see usecase.json): open the Supabase client and mem0 store, build the pipeline modules
+    (loading inference profiles and compiled programs) and send every LM a one-token uncached request.
+    Returns the Supabase client, which the worker passes to process_patients / run_event_driven.
+    """
+    from processing_engine.common.inference_profiles import profile_lms
+    from processing_engine.usecases.ayurlekha.modules import PatientDemographics
+
+    client = {}
+    check("supabase", lambda: client.setdefault("supabase", create_supabase_client()))
+    check("mem0", get_mem0_memory)
+    check(
+        "modules",
+        lambda: (DocumentProcessor(), DocumentMetadataModule(), PatientDemographics()),
+    )
+    lms = {"default": dspy.settings.lm, "medgemma": medgemma_lm}
+    for lm in profile_lms():
+        lms.setdefault(lm.model, lm)
+    for name, lm in lms.items():
+        if lm is None:
+            continue
+        if not config["WORKER_WARMUP"]:
+            check(f"lm:{name}", lambda: None)
+            continue
+        # Uncached, so the request really reaches the endpoint
+        check(
+            f"lm:{name}",
+            lambda lm=lm: lm.copy(cache=False)(
+                messages=[{"role": "user", "content": "ping"}], max_tokens=1
+            ),
+        )
+    return client.get("supabase")
+
+
+def reload(fresh_config: dict):
+    """
+    Plugin hook: apply a reloaded config. Inference profiles and compiled programs are re-read, and
+    QUALITY_EVAL_SAMPLE_RATE, LM_TRACE_SAMPLE_RATE and CACHE_MAX_BYTES are applied to the running
+    stores; settings read per batch (OCR_PREPASS, PREFILTER, SUMMARY_MODE, ...) apply from the next one.
+    Paths, worker counts, partitions and the LMs themselves only change on restart.
+    """
+    from processing_engine.common import compiled_programs
+    from processing_engine.common.inference_profiles import reload_profiles
+
+    for module_config in (config, compiled_programs.config):
+        module_config.update(fresh_config)
+    reload_profiles()
+    compiled_programs.clear_cache()
+    quality_evaluator.sample_rate = config["QUALITY_EVAL_SAMPLE_RATE"]
+    lm_trace_callback.sample_rate = config["LM_TRACE_SAMPLE_RATE"]
+    document_cache.resize(config["CACHE_MAX_BYTES"])
+
+
+def process_patients(shard=None, resume=False, supabase=None, patient_workers=None):
+    """
+    Main pipeline to process all patients, generate detailed JSON summaries for each, and upload results to Supabase.
+    If `shard` is an (index, count) tuple, only patients whose id hashes to that shard are processed.
+    With `resume`, stages already recorded in the checkpoint journal are skipped.
+    `patient_workers` > 1 processes that many patients concurrently.
+    Patients with pending records are taken in scheduler order: urgency class first, then fair share
+    across user_id, then upload recency (see common/scheduler.py).
+    """
+    if supabase is None:
+        supabase = create_supabase_client()
+    patient_workers = patient_workers or config["PATIENT_WORKERS"]
+
+    patients = supabase.table("patients").select("*").execute().data
+    logger.info(f"[db] Found {len(patients)} patients in DB")
+    shard_index, shard_count = shard or (0, 1)
+    shard_label = f"{shard_index}/{shard_count}"
+    if shard_count > 1:
+        patients = filter_shard(patients, shard_index, shard_count)
+        logger.info(f"[shard] Shard {shard_label} owns {len(patients)} patients")
+    # One query for every pending record instead of one per patient
+    pending = {}
+    for rec in (
+        supabase.table("medical_records")
+        .select("*")
+        .eq("processed", False)
+        .execute()
+        .data
+    ):
+        pending.setdefault(rec["patient_id"], []).append(rec)
+    scheduler = FairScheduler(weights=config["SCHEDULER_USER_WEIGHTS"])
+    classes = {}
+    for patient in patients:
+        if patient["id"] in pending:
+            priority = schedule_patient(scheduler, patient, pending[patient["id"]])
+            classes[priority] = classes.get(priority, 0) + 1
+    scheduler.close()
+    total_patients = len(patients)
+    logger.info(
+        f"[scheduler] {len(scheduler)} patients with pending records, by priority {classes}"
+    )
+    journal = open_checkpoint_journal(shard_index, shard_count, resume)
+    # Opened on every poll cycle of a long-running worker, so always closed again
+    try:
+        progress_lock = threading.Lock()
+        # Patients without pending records have nothing left to do
+        progress = {"done": total_patients - len(scheduler), "records": 0}
+
+        def run_patient(job):
+            patient, records = job
+            if stop_requested():
+                return
+            try:
+                records_done = process_patient(supabase, patient, journal, records)
+            except Exception as e:
+                records_done = 0
+                logger.error(f"[error] Failed to process patient {patient['id']}: {e}")
+            with progress_lock:
+                progress["done"] += 1
+                progress["records"] += records_done
+                done = progress["done"]
+            metrics.set_gauge("queue_depth", total_patients - done, queue="patients")
             logger.info(
-                f"[db] Updated ayurlekha_generated_at and processed flags for patient {patient_id}"
+                f"[shard] Shard {shard_label} progress: patient {done}/{total_patients}"
+            )
+            journal.maybe_flush()
+
+        for thread in run_workers(scheduler, run_patient, patient_workers):
+            thread.join()
+        if stop_requested():
+            logger.warning(f"[checkpoint] Stop requested, shard {shard_label} drained")
+        journal.flush()
+    finally:
+        journal.close()
+    cache_stats = document_cache.stats()
+    logger.info(f"[cache] Document cache stats: {cache_stats}")
+    metrics.set_gauge("cache_hit_ratio", cache_stats["hit_rate"], cache="documents")
+    metrics.set_gauge("cache_bytes", cache_stats["bytes"], cache="documents")
+    metrics.write_prometheus(config["METRICS_FILE"])
+    lm_trace_store.flush()
+    # Judgments still queued are kept; the pipeline work itself is already done
+    quality_evaluator.flush()
+    duplicates = duplicate_stats()
+    if duplicates["duplicates"]:
+        logger.info(
+            f"[dedupe] {duplicates['duplicates']} near-duplicate documents reused, "
+            f"{duplicates['lm_calls_skipped']} LM calls skipped"
+        )
+    verdicts = prefilter_stats()
+    if verdicts.get("non_medical"):
+        logger.info(
+            f"[prefilter] {verdicts['non_medical']} of {sum(verdicts.values())} new documents skipped as non-medical"
+        )
+    routes = analysis_routes()
+    if routes:
+        analysed = sum(routes.values())
+        logger.info(
+            "[ocr] Analysis routes: "
+            + ", ".join(
+                f"{route} {count} ({count / analysed:.0%})"
+                for route, count in sorted(routes.items())
+            )
+        )
+    logger.info(
+        f"[shard] Shard {shard_label} finished {progress['done']}/{total_patients} patients, {progress['records']} records"
+    )
+    return progress
+
+
+def run_event_driven(
+    source=None, supabase=None, patient_workers=None, window=None, max_wait=None
+):
+    """
+    Process medical_records inserts pushed by `source` (see common/events.py) until a stop is requested.
+    Records are micro-batched per patient, so a burst of uploads for one patient yields one summary.
+    Unprocessed records already in the table are queued once at startup.
+    """
+    if supabase is None:
+        supabase = create_supabase_client()
+    source = source or make_event_source(config)
+    patient_workers = patient_workers or config["PATIENT_WORKERS"]
+    window = config["EVENT_DEBOUNCE_SECONDS"] if window is None else window
+    max_wait = config["EVENT_MAX_WAIT_SECONDS"] if max_wait is None else max_wait
+    journal = open_checkpoint_journal(0, 1, resume=True)
+    scheduler = FairScheduler(weights=config["SCHEDULER_USER_WEIGHTS"])
+    # Looks batches up and triages them off the debouncer thread
+    planner = ThreadPoolExecutor(max_workers=1)
+
+    def plan_batch(patient_id, record_ids, first_seen):
+        try:
+            metrics.observe("event_batch_records", len(record_ids))
+            patients = (
+                supabase.table("patients").select("*").eq("id", patient_id).execute()
+            ).data
+            records = fetch_pending_records(supabase, patient_id)
+            if not patients or not records:
+                debouncer.done(patient_id)
+                return
+            schedule_patient(
+                scheduler,
+                patients[0],
+                records,
+                job=(patients[0], records, record_ids, first_seen),
             )
-            # Clean up temp files (optional)
-            # import shutil; shutil.rmtree(temp_dir)
         except Exception as e:
-            logger.error(
-                f"[summary] Failed to generate/upload summary or update DB for patient {patient_id}: {e}"
+            logger.error(f"[events] Failed to schedule patient {patient_id}: {e}")
+            debouncer.done(patient_id)
+
+    def run_batch(job):
+        patient, records, record_ids, first_seen = job
+        patient_id = patient["id"]
+        try:
+            records_done = process_patient(supabase, patient, journal, records)
+            metrics.observe("event_to_summary_seconds", time.monotonic() - first_seen)
+            logger.info(
+                f"[events] Patient {patient_id}: {len(record_ids)} pushed records, {records_done} processed"
             )
+            journal.maybe_flush()
+        except Exception as e:
+            logger.error(f"[events] Failed to process patient {patient_id}: {e}")
+        finally:
+            debouncer.done(patient_id)
+
+    debouncer = PatientDebouncer(
+        lambda patient_id, record_ids, first_seen: planner.submit(
+            plan_batch, patient_id, record_ids, first_seen
+        ),
+        window=window,
+        max_wait=max_wait,
+    )
+    workers = run_workers(scheduler, run_batch, patient_workers)
+
+    def on_record(record):
+        if record.get("processed") or not record.get("patient_id"):
+            return
+        metrics.inc("events_received_total")
+        debouncer.add(record["patient_id"], record["id"])
+
+    # Subscribe before the catch-up query, so an insert in between is seen at least once
+    source.start(on_record)
+    backlog = (
+        supabase.table("medical_records")
+        .select("*")
+        .eq("processed", False)
+        .execute()
+        .data
+    )
+    logger.info(f"[events] Listening; {len(backlog)} unprocessed records queued")
+    for record in backlog:
+        on_record(record)
+    while not wait_for_stop(5.0):
+        metrics.set_gauge("queue_depth", debouncer.pending(), queue="events")
+    logger.warning("[events] Stop requested, draining")
+    source.stop()
+    debouncer.stop()
+    planner.shutdown(wait=True)
+    scheduler.close()
+    for thread in workers:
+        thread.join()
+    journal.flush()
+    journal.close()
+    metrics.write_prometheus(config["METRICS_FILE"])
+    lm_trace_store.flush()
+    quality_evaluator.flush()
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ayurlekha summary pipeline")
+    parser.add_argument(
+        "--shard",
+        default=os.getenv("AYURLEKHA_SHARD"),
+        help="Process only shard i of N (0-based), e.g. --shard 0/4",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip stages already recorded in the checkpoint journal",
+    )
+    parser.add_argument(
+        "--trigger",
+        choices=("poll", "events"),
+        default=config["TRIGGER_MODE"],
+        help="Scan all patients once, or process pushed record inserts until stopped",
+    )
+    args = parser.parse_args()
+    shard = parse_shard(args.shard) if args.shard else None
+    install_stop_handlers()
     logger.info("Starting Ayurlekha summary pipeline (ayurlekha.processor)")
-    process_patients()
+    if args.trigger == "events":
+        run_event_driven()
+    else:
+        process_patients(shard=shard, resume=args.resume)
+    print(metrics.summary_table())
     logger.info("Completed Ayurlekha summary pipeline (ayurlekha.processor)")
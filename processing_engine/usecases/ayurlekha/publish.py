@@ -0,0 +1,98 @@
+"""
+Content-hash gated publishing of Ayurlekha summaries.
+
+A summary's ETag is the SHA-256 of its canonical JSON (sorted keys, no whitespace) with the volatile
+fields meta.generated_at and footer.date removed. Next to the timestamped summaries, each patient has a
+small `latest.json` pointer holding the path and ETag of the current summary; the frontend polls the
+pointer and only downloads the summary when the ETag changes. A summary whose ETag matches the pointer is
+not uploaded again. The pointer is served with max-age=0, so neither the CDN nor the browser keeps
+answering with a stale one; summaries never change under their name and keep the default caching.
+"""
+
+import copy
+import hashlib
+import json
+from datetime import datetime, timezone
+from processing_engine.common.logger import get_logger
+from processing_engine.common.metrics import metrics
+from processing_engine.common.supabase_io import (
+    download_bytes_from_supabase,
+    upload_bytes_to_supabase,
+)
+
+logger = get_logger("ayurlekha.publish")
+
+SUMMARY_BUCKET = "medical-documents"
+# (section, key) pairs that change on every run without changing the content
+VOLATILE_FIELDS = (("meta", "generated_at"), ("footer", "date"))
+# max-age of latest.json in seconds
+POINTER_CACHE_SECONDS = 0
+
+
+def canonical_json(summary: dict) -> str:
+    """Key-order independent JSON of a summary without its volatile fields."""
+    stable = copy.deepcopy(summary)
+    for section, key in VOLATILE_FIELDS:
+        if isinstance(stable.get(section), dict):
+            stable[section].pop(key, None)
+    return json.dumps(
+        stable, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+
+
+def summary_etag(summary: dict) -> str:
+    return hashlib.sha256(canonical_json(summary).encode("utf-8")).hexdigest()
+
+
+def summary_prefix(user_id: str, patient_id: str) -> str:
+    return f"Ayurlekha/{user_id}/{patient_id}"
+
+
+def read_latest(user_id: str, patient_id: str):
+    """The patient's `latest.json` pointer, or None if there is none (or it cannot be read)."""
+    try:
+        raw = download_bytes_from_supabase(
+            SUMMARY_BUCKET, f"{summary_prefix(user_id, patient_id)}/latest.json"
+        )
+        return json.loads(raw)
+    except Exception as e:
+        logger.info(f"[publish] No latest pointer for patient {patient_id}: {e}")
+        return None
+
+
+def publish_summary(user_id: str, patient_id: str, summary: dict):
+    """
+    Upload `summary` and move the patient's latest pointer to it, unless its ETag equals the current one.
+    Returns (remote_path, changed); when unchanged, remote_path is the already published summary.
+    """
+    etag = summary_etag(summary)
+    latest = read_latest(user_id, patient_id)
+    if latest and latest.get("etag") == etag and latest.get("path"):
+        metrics.inc("summary_publish_total", status="unchanged")
+        logger.info(
+            f"[publish] Summary for patient {patient_id} unchanged (etag {etag[:12]}), keeping {latest['path']}"
+        )
+        return latest["path"], False
+    now = datetime.now(timezone.utc)
+    # The ETag prefix keeps two different summaries published within one second apart
+    remote_path = (
+        f"{summary_prefix(user_id, patient_id)}/"
+        f"{patient_id}_Ayurlekha_{now.strftime('%Y%m%dT%H%M%S')}_{etag[:8]}.json"
+    )
+    # Same name means same content, so overwriting (e.g. after a failed pointer read) is harmless
+    upload_bytes_to_supabase(SUMMARY_BUCKET, remote_path, summary, upsert=True)
+    # Written after the summary, so the pointer never names an object that does not exist yet
+    upload_bytes_to_supabase(
+        SUMMARY_BUCKET,
+        f"{summary_prefix(user_id, patient_id)}/latest.json",
+        {
+            "path": remote_path,
+            "etag": etag,
+            "published_at": now.isoformat(),
+            "previous_etag": (latest or {}).get("etag"),
+        },
+        upsert=True,
+        cache_control=POINTER_CACHE_SECONDS,
+    )
+    metrics.inc("summary_publish_total", status="published")
+    return remote_path, True
@@ -19,6 +19,23 @@ class DocumentProcessorSignature(dspy.Signature):
     )
 
 
+class DocumentTextSignature(dspy.Signature):
+    """
+    Given the OCR text of a printed medical document, extract structured information including document type, demographics, summary, and all specific medical entities.
+    The text comes from local OCR and may contain minor recognition errors; do not invent content that is not in it.
+    """
+
+    document_text: str = dspy.InputField(
+        desc="OCR text of a single medical document, one recognised line per line."
+    )
+    detailed_analysis: str = dspy.OutputField(
+        desc="Detailed analysis of the medical document. Must be semantically correct and accurate."
+    )
+    extracted_medicines: List[str] = dspy.OutputField(
+        desc="Extracted medicines from the document. Only return valid medicine names."
+    )
+
+
 class PatientSignature(dspy.Signature):
     id: str = dspy.OutputField(desc="Patient ID.")
     name: str = dspy.OutputField(desc="Patient name.")
@@ -87,13 +104,12 @@ class MetaSignature(dspy.Signature):
 
 class AyurlekhaSummarySignature(dspy.Signature):
     """
-    For each action, medication, or follow-up, extract:
+    For each medication, extract as written in the documents:
     - start_date (from document or context)
     - duration (if mentioned)
-    - end_date (if calculable)
-    - is_outdated (true if the action/medication/follow-up is no longer current as of today)
-    - outdated_reason (explain why, e.g., 'Follow-up was due on 2023-05-01 and is now overdue')
-    in addition to the usual summary fields.
+    - end_date (only if explicitly stated)
+    in addition to the usual summary fields. Do not compute end dates, outdated flags or ordering;
+    they are derived in code.
     """
 
     medical_history: str = dspy.InputField(
@@ -105,10 +121,14 @@ class AyurlekhaSummarySignature(dspy.Signature):
     chronicConditions: List[Dict[str, Any]] = dspy.OutputField(
         desc="Chronic conditions."
     )
-    historyTimeline: List[Dict[str, Any]] = dspy.OutputField(desc="History timeline.")
-    labTests: List[Dict[str, Any]] = dspy.OutputField(desc="Lab tests.")
+    historyTimeline: List[Dict[str, Any]] = dspy.OutputField(
+        desc="History timeline events, each with date and event, in any order."
+    )
+    labTests: List[Dict[str, Any]] = dspy.OutputField(
+        desc="Lab tests, each with date, investigation and result, in any order."
+    )
     medications: List[Dict[str, Any]] = dspy.OutputField(
-        desc="Medications, each as a dict with name, dosage, frequency, start_date, duration, end_date, is_outdated, outdated_reason."
+        desc="Medications, each as a dict with name, dosage, frequency, indication, start_date, duration, end_date."
     )
     doctors: List[Dict[str, Any]] = dspy.OutputField(desc="Doctors and hospitals.")
     emergencyContacts: List[Dict[str, Any]] = dspy.OutputField(
@@ -118,6 +138,18 @@ class AyurlekhaSummarySignature(dspy.Signature):
     meta: Dict[str, Any] = dspy.OutputField(desc="Meta info.")
 
 
+class UrgencyTriageSignature(dspy.Signature):
+    """
+    Glance at a medical document and judge how urgently it needs processing. Discharge summaries, emergency
+    or ICU notes and critical results are High; routine prescriptions and bills are Low.
+    """
+
+    document_image: dspy.Image = dspy.InputField(
+        desc="An image of a single medical document."
+    )
+    urgency: str = dspy.OutputField(desc="Urgency level, e.g., High, Medium, Low.")
+
+
 class DocumentMetadataSignature(dspy.Signature):
     detailed_analysis: str = dspy.InputField(
         desc="Detailed analysis of the medical document."
@@ -136,10 +168,13 @@ class DocumentMetadataSignature(dspy.Signature):
         desc="List of unique, high-value findings or entities."
     )
     actions: list = dspy.OutputField(
-        desc="List of actions, each as a dict with description, start_date, duration, end_date, is_outdated, outdated_reason."
+        desc="List of actions, each as a dict with description, start_date, duration, end_date (only if explicitly stated)."
     )
     medications: list = dspy.OutputField(
-        desc="List of medications, each as a dict with name, dosage, frequency, start_date, duration, end_date, is_outdated, outdated_reason."
+        desc="List of medications, each as a dict with name, dosage, frequency, start_date, duration, end_date (only if explicitly stated)."
+    )
+    lab_tests: list = dspy.OutputField(
+        desc="List of lab tests, each as a dict with date, investigation, result, unit, reference_range."
     )
     urgency: str = dspy.OutputField(desc="Urgency level, e.g., High, Medium, Low.")
     summary: str = dspy.OutputField(desc="Short summary of the document.")
@@ -149,3 +184,60 @@ class DocumentMetadataSignature(dspy.Signature):
     reason: str = dspy.OutputField(
         desc="Reason why the document is not a medical document, if applicable."
     )
+
+
+# Summary sections for section-parallel generation: (output field, per-item signature, shape).
+# "one" sections produce a single dict, "many" a list of dicts, "text" a plain string.
+SUMMARY_SECTIONS = (
+    ("patient", PatientSignature, "one"),
+    ("summary", None, "text"),
+    ("primaryAlert", PrimaryAlertSignature, "one"),
+    ("chronicConditions", ChronicConditionSignature, "many"),
+    ("historyTimeline", HistoryTimelineSignature, "many"),
+    ("labTests", LabTestSignature, "many"),
+    ("medications", MedicationSignature, "many"),
+    ("doctors", DoctorSignature, "many"),
+    ("emergencyContacts", EmergencyContactSignature, "many"),
+)
+# Raw course fields the deterministic post-processing needs on top of MedicationSignature
+_SECTION_EXTRA_FIELDS = {
+    "medications": "start_date, duration and end_date (only if explicitly stated) as written",
+}
+_HISTORY_DESC = "Combined analysis and medical history for the patient."
+
+
+def section_signature(name: str, item_signature, shape: str):
+    """Signature that extracts one summary section from the patient's medical history."""
+    if shape == "one":
+        return item_signature.prepend(
+            "medical_history", dspy.InputField(desc=_HISTORY_DESC), str
+        ).with_instructions(
+            f"From the patient's medical history, extract the {name} section."
+        )
+    if shape == "text":
+        return dspy.make_signature(
+            {
+                "medical_history": (str, dspy.InputField(desc=_HISTORY_DESC)),
+                name: (
+                    str,
+                    dspy.OutputField(desc="Short overall summary of the patient."),
+                ),
+            },
+            f"From the patient's medical history, write the {name} section.",
+        )
+    keys = ", ".join(
+        f"{field} ({info.json_schema_extra['desc'].rstrip('.')})"
+        for field, info in item_signature.output_fields.items()
+    )
+    if name in _SECTION_EXTRA_FIELDS:
+        keys += ", plus " + _SECTION_EXTRA_FIELDS[name]
+    return dspy.make_signature(
+        {
+            "medical_history": (str, dspy.InputField(desc=_HISTORY_DESC)),
+            name: (
+                List[Dict[str, Any]],
+                dspy.OutputField(desc=f"List of dicts with keys: {keys}."),
+            ),
+        },
+        f"From the patient's medical history, extract every {name} entry, in any order.",
+    )
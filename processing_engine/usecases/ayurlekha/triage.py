@@ -0,0 +1,95 @@
+"""
+Cheap urgency pre-pass over pending records, so the scheduler can order work before the full analysis.
+
+Urgency comes from, in order: an earlier metadata extraction of the same record (entity store), the
+record's kind/category and file name, and optionally (URGENCY_PREPASS=lm) a single-field image
+classification with UrgencyTriageSignature, which defaults to plain Predict and can be pointed at a small
+model through the "UrgencyTriage" inference profile.
+"""
+
+import os
+from datetime import datetime
+import dspy
+from processing_engine.common.inference_profiles import make_predictor
+from processing_engine.common.logger import get_logger
+from processing_engine.common.scheduler import PRIORITY_CLASSES, priority_class
+from processing_engine.usecases.ayurlekha.signatures import UrgencyTriageSignature
+
+logger = get_logger("ayurlekha.triage")
+
+HIGH_KEYWORDS = (
+    "discharge",
+    "emergency",
+    "casualty",
+    "icu",
+    "admission",
+    "critical",
+    "biopsy",
+    "histopath",
+)
+LOW_KEYWORDS = ("prescription", "invoice", "bill", "receipt", "insurance")
+
+
+def heuristic_urgency(record: dict):
+    """Urgency guessed from the record's kind/category and file name, or None if nothing matches."""
+    text = " ".join(
+        str(record.get(field) or "")
+        for field in ("kind", "category", "document_type", "file_name")
+    )
+    text = (text + " " + os.path.basename(record.get("file_url") or "")).lower()
+    if any(word in text for word in HIGH_KEYWORDS):
+        return "High"
+    if any(word in text for word in LOW_KEYWORDS):
+        return "Low"
+    return None
+
+
+def record_timestamp(record: dict) -> float:
+    """Upload time of a record as a POSIX timestamp (0 when unknown)."""
+    try:
+        return datetime.fromisoformat(
+            str(record.get("created_at")).replace("Z", "+00:00")
+        ).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class UrgencyTriage:
+    """Per-record urgency estimates; `mode` is "heuristic", "lm" or "off"."""
+
+    def __init__(self, mode: str = "heuristic", image_path=None):
+        self.mode = mode
+        # record -> context manager yielding the local path of its document, used by the LM pre-pass
+        self.image_path = image_path
+        self.predictor = (
+            make_predictor("UrgencyTriage", UrgencyTriageSignature, default="predict")
+            if mode == "lm"
+            else None
+        )
+
+    def urgency(self, record: dict, known: dict = None):
+        if self.mode == "off":
+            return None
+        urgency = (known or {}).get(record["id"]) or heuristic_urgency(record)
+        if urgency is None and self.predictor is not None:
+            try:
+                with self.image_path(record) as path:
+                    image = dspy.Image.from_file(path)
+                urgency = self.predictor(document_image=image).urgency
+            except Exception as e:
+                logger.error(f"[triage] Pre-pass failed for record {record['id']}: {e}")
+        return urgency
+
+    def plan(self, patient: dict, records, known: dict = None) -> dict:
+        """Scheduler arguments for one patient's pending records: priority class, recency and cost."""
+        classes = [priority_class(self.urgency(rec, known)) for rec in records]
+        flagged = bool(patient.get("priority"))
+        return {
+            "priority": (
+                "high"
+                if flagged
+                else min(classes, key=PRIORITY_CLASSES.index, default="medium")
+            ),
+            "recency": max((record_timestamp(rec) for rec in records), default=0.0),
+            "cost": max(1, len(records)),
+        }